@@ -0,0 +1,217 @@
+import argparse
+import contextlib
+import csv
+import io
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import profiling
+import uc_parsing
+
+"""
+Cleans every raw sheet under raw_data/ at once.
+
+Each (semester, type) pair is its own job in a process pool, so backfilling every
+semester after a parsing rule changes takes about as long as the biggest file
+instead of the sum of all of them.
+
+Files follow the same names as the site_update notebook:
+    raw_data/<sem>_<type>_raw.csv       -> clean_data/<sem>_<type>_cleaned.csv
+                                        + raw_data/<sem>_<type>_bad_rows.csv
+
+Run from src/:
+    python batch_clean.py
+    python batch_clean.py --semesters f24 s24 --workers 2 --engine columnar
+    python batch_clean.py --profile profile.json   # time every cleaning step (see profiling.py)
+    python batch_clean.py --profile profile.json --trace-memory   # and their peak memory
+"""
+
+SHEET_TYPES = ["video_games", "board_games", "table_games", "occupancy"]
+
+SRC_FOLDER = os.path.dirname(os.path.abspath(__file__))
+RAW_DATA_FOLDER = os.path.join(SRC_FOLDER, "..", "raw_data")
+CLEAN_DATA_FOLDER = os.path.join(SRC_FOLDER, "..", "clean_data")
+
+#f23_table_games_raw.csv -> ("f23", "table_games")
+RAW_FILE_PATTERN = re.compile(r"^([a-z]+\d{2})_(" + "|".join(SHEET_TYPES) + r")_raw\.csv$")
+
+
+def semester_year(semester: str) -> int:
+    """The year of a semester name like 'f23' or 's24' (2023, 2024)."""
+    return 2000 + int(semester[-2:])
+
+
+def find_raw_files(raw_data_folder: str = RAW_DATA_FOLDER, semesters=None, types=None) -> list[tuple[str, str]]:
+    """
+    Returns every (semester, type) pair that has a raw file in raw_data_folder,
+    optionally only for the given semesters / types.
+    """
+    jobs = []
+    for file_name in sorted(os.listdir(raw_data_folder)):
+        match = RAW_FILE_PATTERN.match(file_name)
+        if not match:
+            continue
+        semester, type = match.groups()
+        if semesters and semester not in semesters:
+            continue
+        if types and type not in types:
+            continue
+        jobs.append((semester, type))
+    return jobs
+
+
+def file_paths(semester: str, type: str, raw_data_folder: str = RAW_DATA_FOLDER,
+               clean_data_folder: str = CLEAN_DATA_FOLDER) -> tuple[str, str, str]:
+    """(raw, bad rows, cleaned) file paths for one sheet."""
+    raw_filepath = os.path.join(raw_data_folder, f"{semester}_{type}_raw.csv")
+    bad_filepath = os.path.join(raw_data_folder, f"{semester}_{type}_bad_rows.csv")
+    clean_filepath = os.path.join(clean_data_folder, f"{semester}_{type}_cleaned.csv")
+    return raw_filepath, bad_filepath, clean_filepath
+
+
+def count_rows(file_path: str) -> int:
+    """Number of data rows (not counting the header) in a CSV file, 0 if it doesn't exist."""
+    if not os.path.exists(file_path):
+        return 0
+    with open(file_path, mode='r', newline='') as file:
+        return max(sum(1 for _ in csv.reader(file)) - 1, 0)
+
+
+def clean_one(semester: str, type: str, raw_data_folder: str = RAW_DATA_FOLDER,
+              clean_data_folder: str = CLEAN_DATA_FOLDER, engine: str = "rows",
+              id_store_filepath: str | None = None, typed_output: bool = False, profile: bool = False,
+              trace_memory: bool = False) -> dict:
+    """
+    Cleans one sheet (this runs inside a worker process).
+
+    All the printing the cleaning steps do is captured, so the workers don't talk over
+    each other. It's returned as "log" and only shown if the file fails.
+    With profile=True, the timed stages (see profiling.py) are returned as "profile",
+    with each one's peak memory too if trace_memory.
+    """
+    raw_filepath, bad_filepath, clean_filepath = file_paths(semester, type, raw_data_folder, clean_data_folder)
+    result = {"semester": semester, "type": type, "rows_in": count_rows(raw_filepath),
+              "rows_out": 0, "bad_rows": 0, "seconds": 0.0, "error": None, "log": "", "profile": []}
+    if profile:
+        profiling.enable(trace_memory=trace_memory)
+
+    log = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            if type == "occupancy":
+                uc_parsing.clean_occupancy(raw_filepath, bad_filepath, clean_filepath, semester_year(semester),
+                                           engine=engine, typed_output=typed_output)
+            else:
+                uc_parsing.clean_games(raw_filepath, bad_filepath, clean_filepath, semester_year(semester), type,
+                                       engine=engine, id_store_filepath=id_store_filepath, typed_output=typed_output)
+    except Exception:
+        result["error"] = traceback.format_exc(limit=3)
+    result["seconds"] = time.perf_counter() - start
+    result["log"] = log.getvalue()
+    result["profile"] = profiling.take_records()
+
+    if result["error"] is None:
+        result["rows_out"] = count_rows(clean_filepath)
+        result["bad_rows"] = count_rows(bad_filepath)
+    return result
+
+
+def print_summary(results: list[dict], wall_seconds: float) -> None:
+    """Prints one line per file: rows in/out/bad and how long it took."""
+    print(f"{'File':<24} {'Rows in':>9} {'Rows out':>9} {'Bad':>7} {'Seconds':>8}  Status")
+    for result in sorted(results, key=lambda r: (r["semester"], r["type"])):
+        name = f"{result['semester']}_{result['type']}"
+        status = "ok" if result["error"] is None else "FAILED"
+        print(f"{name:<24} {result['rows_in']:>9} {result['rows_out']:>9} {result['bad_rows']:>7} "
+              f"{result['seconds']:>8.2f}  {status}")
+    print(f"{len(results)} files in {wall_seconds:.2f}s wall time "
+          f"({sum(r['seconds'] for r in results):.2f}s of cleaning)")
+
+
+def clean_all(raw_data_folder: str = RAW_DATA_FOLDER,
+              clean_data_folder: str = CLEAN_DATA_FOLDER,
+              semesters=None,
+              types=None,
+              max_workers: int | None = None,
+              engine: str = "rows",
+              id_store_filepath: str | None = None,
+              typed_output: bool = False,
+              profile_filepath: str | None = None,
+              trace_memory: bool = False,
+              ) -> list[dict]:
+    """
+    Cleans every raw sheet in raw_data_folder in parallel and prints a summary table.
+
+    semesters / types (list[str]): only clean these (default: everything found).
+    max_workers (int): size of the process pool. Defaults to the number of CPUs,
+        and never more than the number of files.
+    engine (str): passed on to clean_games / clean_occupancy.
+    id_store_filepath (str): optional anonymization store shared by every file (see uc_anon.py).
+    typed_output (bool): also write the typed Parquet copies (see uc_typed.py).
+    profile_filepath (str): time every cleaning step in every worker, print them as a tree and
+        save them to this .json / .csv / .folded file (see profiling.py).
+    trace_memory (bool): with profile_filepath, also record each step's peak memory (slower).
+
+    Returns one dict per file with rows_in, rows_out, bad_rows, seconds and error.
+    """
+    jobs = find_raw_files(raw_data_folder, semesters, types)
+    if not jobs:
+        print("No raw files found in:", raw_data_folder)
+        return []
+
+    os.makedirs(clean_data_folder, exist_ok=True)
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(jobs)))
+    print(f"Cleaning {len(jobs)} files with {max_workers} workers...")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(clean_one, semester, type, raw_data_folder, clean_data_folder, engine,
+                                   id_store_filepath, typed_output, profile_filepath is not None, trace_memory)
+                   for semester, type in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["error"] is not None:
+                print(f"\n{result['semester']}_{result['type']} failed:")
+                print(result["log"])
+                print(result["error"])
+    wall_seconds = time.perf_counter() - start
+
+    print_summary(results, wall_seconds)
+    if profile_filepath:
+        stage_records = [record for result in results for record in result["profile"]]
+        print()
+        profiling.print_summary(stage_records)
+        profiling.save_report(profile_filepath, stage_records)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean every raw sheet in raw_data/ in parallel.")
+    parser.add_argument("--raw-data", default=RAW_DATA_FOLDER, help="folder with the <sem>_<type>_raw.csv files")
+    parser.add_argument("--clean-data", default=CLEAN_DATA_FOLDER, help="folder to write the cleaned CSVs to")
+    parser.add_argument("--semesters", nargs="*", help="only these semesters, e.g. f23 s24")
+    parser.add_argument("--types", nargs="*", choices=SHEET_TYPES, help="only these sheet types")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--engine", default="rows", choices=["rows", "columnar", "streaming", "fused", "incremental"])
+    parser.add_argument("--typed", action="store_true", help="also write typed Parquet copies to clean_data/typed/")
+    parser.add_argument("--id-store", default=None, help="anonymization store for stable patron IDs, e.g. ../raw_data/anon_ids.sqlite")
+    parser.add_argument("--profile", default=None, help="time every cleaning step and save the report here (.json, .csv or .folded)")
+    parser.add_argument("--trace-memory", action="store_true", help="with --profile, also record each step's peak memory (slower)")
+    args = parser.parse_args()
+    if args.trace_memory and not args.profile:
+        parser.error("--trace-memory needs --profile")
+
+    results = clean_all(args.raw_data, args.clean_data, args.semesters, args.types, args.workers, args.engine, args.id_store,
+                        args.typed, args.profile, args.trace_memory)
+    if any(result["error"] is not None for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import sheets_to_csv
+
+"""
+Downloads the rental spreadsheets of every rec-center location at once, from a manifest.
+
+Each location keeps its own spreadsheet (and a new one every semester), so instead of
+sheets_to_csv's single SPREADSHEET_ID, a JSON manifest lists them:
+
+    [
+        {"spreadsheet_id": "1AbC...", "location": "union_central", "semester": "f24"},
+        {"spreadsheet_id": "1XyZ...", "location": "north_rec", "semester": "f24",
+         "tabs": ["Occupancy", "Table Games"]},
+        {"spreadsheet_id": "1OlD...", "location": "union_central", "semester": "s24"}
+    ]
+
+semester defaults to the current one (sheets_to_csv.get_current_semester) and tabs to
+every page in sheets_to_csv.PAGES. Each location gets its own folder, laid out like raw_data/:
+    raw_data/<location>/<sem>_<type>_raw.csv
+so batch_clean.py --raw-data ../raw_data/<location> cleans it.
+
+Each spreadsheet is its own job in a thread pool. The jobs mostly wait on the network,
+so a refresh of every site takes about as long as the slowest spreadsheet instead of the
+sum of all of them. The login happens once, and the threads all share one API client and
+its credentials, each sending its requests over its own connection (see build_sheets).
+
+Run from src/:
+    python batch_fetch.py --manifest ../sheets_manifest.json
+    python batch_fetch.py --manifest ../sheets_manifest.json --locations north_rec --incremental
+"""
+
+#a location is a folder name
+LOCATION_PATTERN = re.compile(r"^[a-z0-9_]+$")
+SEMESTER_PATTERN = re.compile(r"^[a-z]+\d{2}$")
+
+
+def load_manifest(manifest_filepath: str) -> list[dict]:
+    """
+    Reads a manifest (see above) and fills in the defaults. Every entry gets spreadsheet_id,
+    location, semester and tabs. Raises ValueError for an entry that's missing something or
+    would write over another one's files.
+    """
+    with open(manifest_filepath, "r") as file:
+        entries = json.load(file)
+
+    manifest = []
+    seen = set()
+    for number, entry in enumerate(entries, start=1):
+        if not entry.get("spreadsheet_id") or not entry.get("location"):
+            raise ValueError(f"Manifest entry {number} needs a spreadsheet_id and a location")
+        location = entry["location"]
+        semester = entry.get("semester") or sheets_to_csv.get_current_semester()
+        tabs = entry.get("tabs") or list(sheets_to_csv.PAGES)
+        if not LOCATION_PATTERN.match(location):
+            raise ValueError(f"Manifest entry {number}: location '{location}' should be lowercase letters, digits and _")
+        if not SEMESTER_PATTERN.match(semester):
+            raise ValueError(f"Manifest entry {number}: '{semester}' isn't a semester like f24 or s25")
+        unknown_tabs = [tab for tab in tabs if tab not in sheets_to_csv.PAGES]
+        if unknown_tabs:
+            raise ValueError(f"Manifest entry {number}: unknown tabs {unknown_tabs} (known: {list(sheets_to_csv.PAGES)})")
+        if (location, semester) in seen:
+            raise ValueError(f"Manifest entry {number}: {location} {semester} is listed twice")
+        seen.add((location, semester))
+        manifest.append({"spreadsheet_id": entry["spreadsheet_id"], "location": location,
+                         "semester": semester, "tabs": tabs})
+    return manifest
+
+
+def output_files(entry: dict, raw_data_folder: str = sheets_to_csv.RAW_DATA_FOLDER) -> dict[str, str]:
+    """Page name -> raw_data/<location>/<sem>_<type>_raw.csv for a manifest entry's tabs."""
+    folder = os.path.join(raw_data_folder, entry["location"])
+    return {tab: os.path.join(folder, f"{entry['semester']}_{sheets_to_csv.PAGES[tab]}_raw.csv")
+            for tab in entry["tabs"]}
+
+
+def fetch_one(sheets, entry: dict, raw_data_folder: str = sheets_to_csv.RAW_DATA_FOLDER,
+              incremental: bool = False, page_rows: int | None = None) -> dict:
+    """
+    Downloads one manifest entry's tabs (this runs in a worker thread).
+
+    sheets: from sheets_to_csv.build_sheets(thread_safe=True), shared by every thread.
+    incremental / page_rows: like sheets_to_csv.main's incremental and paged.
+
+    Returns the entry with "tabs" (page name -> what happened, see fetch_pages_incremental),
+    "seconds" and "error" (None, or the traceback if it failed, or which tabs failed with page_rows).
+    """
+    result = {"spreadsheet_id": entry["spreadsheet_id"], "location": entry["location"],
+              "semester": entry["semester"], "tabs": {}, "seconds": 0.0, "error": None}
+    start = time.perf_counter()
+    try:
+        pages = output_files(entry, raw_data_folder)
+        os.makedirs(os.path.dirname(next(iter(pages.values()))), exist_ok=True)
+        if incremental:
+            result["tabs"] = sheets_to_csv.fetch_pages_incremental(sheets, entry["spreadsheet_id"], pages, page_rows)
+        else:
+            result["tabs"] = sheets_to_csv.fetch_pages_full(sheets, entry["spreadsheet_id"], pages, page_rows)
+        failed = [tab for tab, outcome in result["tabs"].items() if outcome == "failed"]
+        if failed:
+            result["error"] = f"{', '.join(failed)} failed. Run again to carry on from the last rows that were saved."
+    except Exception:
+        result["error"] = traceback.format_exc(limit=3)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def print_summary(results: list[dict], wall_seconds: float) -> None:
+    """Prints one line per spreadsheet: what happened to each tab and how long it took."""
+    print(f"{'Location':<20} {'Semester':<9} {'Seconds':>8}  Status")
+    for result in sorted(results, key=lambda r: (r["location"], r["semester"])):
+        if result["error"] is None:
+            status = "ok  " + ", ".join(f"{tab}: {outcome}" for tab, outcome in result["tabs"].items())
+        else:
+            status = "FAILED"
+        print(f"{result['location']:<20} {result['semester']:<9} {result['seconds']:>8.2f}  {status}")
+    print(f"{len(results)} spreadsheets in {wall_seconds:.2f}s wall time "
+          f"({sum(r['seconds'] for r in results):.2f}s of fetching)")
+
+
+def fetch_all(manifest_filepath: str,
+              raw_data_folder: str = sheets_to_csv.RAW_DATA_FOLDER,
+              locations=None,
+              semesters=None,
+              max_workers: int = 8,
+              endpoint: str | None = None,
+              incremental: bool = False,
+              page_rows: int | None = None,
+              ) -> list[dict]:
+    """
+    Downloads every spreadsheet in the manifest in parallel and prints a summary table.
+
+    locations / semesters (list[str]): only fetch these (default: everything in the manifest).
+    max_workers (int): most spreadsheets fetched at the same time. The Sheets API allows a
+        limited number of reads per minute per user, so more isn't always faster.
+    endpoint (str): fetch from a stand-in for the Sheets API instead (see sheets_stub.py).
+    incremental (bool): only fetch the rows added since the last run (see fetch_pages_incremental).
+    page_rows (int): fetch whole tabs this many rows at a time (see export_paged).
+
+    Returns one dict per spreadsheet with location, semester, tabs, seconds and error.
+    """
+    manifest = [entry for entry in load_manifest(manifest_filepath)
+                if (not locations or entry["location"] in locations)
+                and (not semesters or entry["semester"] in semesters)]
+    if not manifest:
+        print("No spreadsheets to fetch in:", manifest_filepath)
+        return []
+
+    # log in once, here: the threads can't ask for a login
+    sheets = sheets_to_csv.build_sheets(endpoint, thread_safe=True)
+    max_workers = max(1, min(max_workers, len(manifest)))
+    print(f"Fetching {len(manifest)} spreadsheets with {max_workers} threads...")
+
+    results = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(fetch_one, sheets, entry, raw_data_folder, incremental, page_rows)
+                   for entry in manifest]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["error"] is not None:
+                print(f"\n{result['location']} {result['semester']} ({result['spreadsheet_id']}) failed:")
+                print(result["error"])
+    wall_seconds = time.perf_counter() - start
+
+    print_summary(results, wall_seconds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download every location's spreadsheets in a manifest in parallel.")
+    parser.add_argument("--manifest", required=True, help="JSON list of {spreadsheet_id, location, semester, tabs}")
+    parser.add_argument("--raw-data", default=sheets_to_csv.RAW_DATA_FOLDER, help="folder to write the <location>/ folders to")
+    parser.add_argument("--locations", nargs="*", help="only these locations")
+    parser.add_argument("--semesters", nargs="*", help="only these semesters, e.g. f23 s24")
+    parser.add_argument("--workers", type=int, default=8, help="most spreadsheets fetched at the same time")
+    parser.add_argument("--endpoint", default=None, help="a Sheets API stand-in to fetch from instead (see sheets_stub.py)")
+    parser.add_argument("--incremental", action="store_true", help="only fetch the rows added since the last run")
+    parser.add_argument("--paged", action="store_true", help="fetch whole tabs --page-rows rows at a time")
+    parser.add_argument("--page-rows", type=int, default=sheets_to_csv.PAGE_ROWS, help="rows per request with --paged")
+    args = parser.parse_args()
+
+    results = fetch_all(args.manifest, args.raw_data, args.locations, args.semesters, args.workers, args.endpoint,
+                        args.incremental, args.page_rows if args.paged else None)
+    if any(result["error"] is not None for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import uc_incremental
+import uc_parsing
+import update_viz
+from batch_clean import SHEET_TYPES, file_paths, semester_year
+from uc_synthetic import write_semester
+from viz_aggregates import AGGREGATE_FOLDER_NAME
+
+"""
+Times the cleaning steps and the charts on synthetic sheets of growing size (see uc_synthetic.py).
+
+For each size (rows per sheet) it:
+- writes a seeded synthetic raw sheet of every type (kept in benchmarks/data/ for the next run)
+- times every step of the row engine (read_csv, remove_empty_columns, ..., save_csv) one by one,
+  and the whole clean_games / clean_occupancy call for each --engines
+- times every update_viz chart: loading the cleaned file, the summary tables, the figure and
+  writing the HTML, with the in-memory caches cleared first so each chart pays for its own loading
+and records the rows after each step and the peak memory (tracemalloc) of everything it times.
+
+Memory is measured in a second pass, since tracemalloc slows Python down a lot and would
+throw off the timings. --no-memory skips that pass.
+
+Every run is appended to benchmarks/history.json (with the git commit and the machine), and
+each timing is compared with the previous run: anything SLOWDOWN_THRESHOLD times slower is
+reported as a regression (--check exits with 1 when there is one).
+
+Run from src/:
+    python benchmark.py
+    python benchmark.py --sizes 1e3 1e5 1e6 --engines rows columnar fused
+    python benchmark.py --semester f24 --types table_games --no-charts
+"""
+
+SRC_FOLDER = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_FOLDER = os.path.join(SRC_FOLDER, "..", "benchmarks")
+HISTORY_FILEPATH = os.path.join(BENCHMARK_FOLDER, "history.json")
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+#the engines whose whole clean_games run can be timed ("incremental" is timed from scratch, see bench_cleaning)
+ENGINES = ["rows", "columnar", "streaming", "fused", "incremental"]
+#a timing this many times slower than in the previous run is a regression
+SLOWDOWN_THRESHOLD = 1.25
+#timings shorter than this are mostly noise, so they're never called regressions
+MIN_COMPARED_SECONDS = 0.05
+
+
+def _measure(function, trace_memory: bool):
+    """
+    Runs function() with its printing thrown away.
+    Returns (its result, seconds, peak MB above what was allocated before, or None without trace_memory).
+    """
+    with open(os.devnull, mode='w') as devnull, contextlib.redirect_stdout(devnull):
+        if not trace_memory:
+            start = time.perf_counter()
+            result = function()
+            return result, time.perf_counter() - start, None
+
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            result = function()
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result, seconds, (peak - baseline) / 2**20
+
+
+def _record(results: list[dict], kind: str, size: int, type: str, stage: str, trace_memory: bool, function):
+    """Measures function() and adds (or fills in the memory of) its entry in results. Returns function's result."""
+    result, seconds, peak_mb = _measure(function, trace_memory)
+    entry = next((entry for entry in results
+                  if (entry["kind"], entry["size"], entry["type"], entry["stage"]) == (kind, size, type, stage)), None)
+    if entry is None:
+        entry = {"kind": kind, "size": size, "type": type, "stage": stage, "seconds": seconds, "peak_mb": None,
+                 "rows": len(result) if isinstance(result, list) else None}
+        results.append(entry)
+    if trace_memory:
+        entry["peak_mb"] = round(peak_mb, 2)
+    else:
+        entry["seconds"] = round(seconds, 4)
+    return result
+
+
+def _bench_steps(results: list[dict], size: int, type: str, raw_filepath: str, clean_filepath: str, steps: list,
+                 trace_memory: bool) -> None:
+    # separate from bench_cleaning so the rows are let go of before the engines run
+    uc_parsing.diagnostics.clear()
+    data = _record(results, "step", size, type, "read_csv", trace_memory, lambda: uc_parsing.read_csv(raw_filepath))
+    for name, step in steps:
+        data = _record(results, "step", size, type, name, trace_memory, lambda: step(data))
+    _record(results, "step", size, type, "save_csv", trace_memory, lambda: uc_parsing.save_csv(data, clean_filepath))
+
+
+def bench_cleaning(results: list[dict], size: int, semester: str, type: str, raw_data_folder: str,
+                   clean_data_folder: str, engines: list[str], trace_memory: bool) -> None:
+    """Times each row-engine step for one sheet, then each engine's whole run."""
+    raw_filepath, bad_filepath, clean_filepath = file_paths(semester, type, raw_data_folder, clean_data_folder)
+    year = semester_year(semester)
+    if type == "occupancy":
+        steps = uc_parsing.occupancy_steps(raw_filepath, bad_filepath, year)
+    else:
+        steps = uc_parsing.games_steps(raw_filepath, bad_filepath, year, type, uc_parsing.DEFAULT_NUM_COLUMNS[type])
+
+    _bench_steps(results, size, type, raw_filepath, clean_filepath, steps, trace_memory)
+
+    for engine in engines:
+        if engine == "incremental":
+            # with a checkpoint left by an earlier run (or the timing pass) it would only check
+            # the file hasn't changed and time a no-op, so it always starts from scratch
+            for file_path in [uc_incremental.checkpoint_path(raw_filepath), bad_filepath, clean_filepath]:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+        if type == "occupancy":
+            _record(results, "clean", size, type, f"clean_occupancy[{engine}]", trace_memory,
+                    lambda: uc_parsing.clean_occupancy(raw_filepath, bad_filepath, clean_filepath, year, engine=engine))
+        else:
+            _record(results, "clean", size, type, f"clean_games[{engine}]", trace_memory,
+                    lambda: uc_parsing.clean_games(raw_filepath, bad_filepath, clean_filepath, year, type, engine=engine))
+
+
+def bench_charts(results: list[dict], size: int, semester: str, types: list[str], clean_data_folder: str,
+                 output_folder: str, trace_memory: bool) -> None:
+    """Times every chart whose data is in clean_data_folder, each from a cold start."""
+    update_viz.SHOW_FIGURES = False
+    os.makedirs(output_folder, exist_ok=True)
+    charts = []
+    for name, spec in update_viz.CHART_REGISTRY.items():
+        chart_types = spec["type"] if isinstance(spec["type"], list) else [spec["type"]]
+        if not all(type in types for type in chart_types):
+            continue
+        if spec["across_semesters"]:
+            filepath = clean_data_folder
+        else:
+            filepath = file_paths(semester, spec["type"], clean_data_folder=clean_data_folder)[2]
+        charts.append((name, spec, "+".join(chart_types), filepath))
+    if not charts:
+        return
+
+    # build one chart untimed first, so plotly's one-off setup (validators, templates,
+    # the plotly.js bundle) isn't counted against whichever chart happens to be first
+    _measure(lambda: update_viz._make_chart(charts[0][1], charts[0][3], os.path.join(output_folder, semester)), False)
+
+    for name, spec, type, filepath in charts:
+        # start cold, like a fresh run of update_viz: no parsed files, no saved summary tables
+        update_viz.clear_dataset_cache()
+        shutil.rmtree(os.path.join(clean_data_folder, AGGREGATE_FOLDER_NAME), ignore_errors=True)
+        _record(results, "chart", size, type, name, trace_memory,
+                lambda: update_viz._make_chart(spec, filepath, os.path.join(output_folder, semester)))
+    update_viz.clear_dataset_cache()
+
+
+def synthetic_folder(data_folder: str, semester: str, size: int, seed: int) -> str:
+    return os.path.join(data_folder, f"{semester}_seed{seed}", str(size))
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, semester: str = "f23", types=SHEET_TYPES, engines=("rows",), seed: int = 0,
+                   charts: bool = True, trace_memory: bool = True, data_folder: str | None = None,
+                   regenerate: bool = False) -> list[dict]:
+    """
+    Runs every benchmark at every size and returns the timings, one dict per step/engine/chart:
+    {"kind": "step" | "clean" | "chart", "size", "type", "stage", "seconds", "peak_mb", "rows"}.
+
+    The synthetic sheets are kept in data_folder (default benchmarks/data/) and reused
+    by later runs with the same semester, size and seed (regenerate=True rewrites them).
+    A semester with "f24" in its name gets f24's AM/PM times.
+    """
+    data_folder = data_folder or os.path.join(BENCHMARK_FOLDER, "data")
+    results = []
+    for size in sizes:
+        folder = synthetic_folder(data_folder, semester, size, seed)
+        raw_data_folder, clean_data_folder = os.path.join(folder, "raw"), os.path.join(folder, "clean")
+        missing = [type for type in types if regenerate or not os.path.exists(file_paths(semester, type, raw_data_folder)[0])]
+        if missing:
+            print(f"Writing {size:,}-row synthetic sheets for {', '.join(missing)}...")
+            write_semester(raw_data_folder, semester, size, missing, seed)
+        os.makedirs(clean_data_folder, exist_ok=True)
+
+        # timings first, then the same again under tracemalloc for the peak memory
+        for trace in [False, True] if trace_memory else [False]:
+            for type in types:
+                print(f"{size:>10,} rows: cleaning {type}{' (memory)' if trace else ''}...")
+                bench_cleaning(results, size, semester, type, raw_data_folder, clean_data_folder, list(engines), trace)
+            if charts:
+                print(f"{size:>10,} rows: charts{' (memory)' if trace else ''}...")
+                bench_charts(results, size, semester, types, clean_data_folder, os.path.join(folder, "viz"), trace)
+    return results
+
+
+def git_commit() -> str | None:
+    """The short hash of the checked out commit (with "-dirty" if there are uncommitted changes), None outside git."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SRC_FOLDER, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=SRC_FOLDER,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_history(history_filepath: str = HISTORY_FILEPATH) -> list[dict]:
+    if not os.path.exists(history_filepath):
+        return []
+    with open(history_filepath, mode='r') as file:
+        return json.load(file)
+
+
+def save_run(run: dict, history_filepath: str = HISTORY_FILEPATH) -> None:
+    """Appends a run to the history file (written to a temp file first, so a crash can't cut it short)."""
+    history = load_history(history_filepath) + [run]
+    os.makedirs(os.path.dirname(os.path.abspath(history_filepath)), exist_ok=True)
+    temp_path = f"{history_filepath}.tmp"
+    with open(temp_path, mode='w') as file:
+        json.dump(history, file, indent=1)
+    os.replace(temp_path, history_filepath)
+
+
+def find_regressions(run: dict, previous: dict | None, threshold: float = SLOWDOWN_THRESHOLD) -> list[tuple[dict, float]]:
+    """
+    (entry, how many times slower) for every timing of run that's at least threshold times
+    slower than the same timing in previous. Only runs on the same machine are compared.
+    """
+    if previous is None or previous.get("machine") != run["machine"]:
+        return []
+    before = {(entry["kind"], entry["size"], entry["type"], entry["stage"]): entry for entry in previous["results"]}
+    regressions = []
+    for entry in run["results"]:
+        old = before.get((entry["kind"], entry["size"], entry["type"], entry["stage"]))
+        if old is None or max(old["seconds"], entry["seconds"]) < MIN_COMPARED_SECONDS:
+            continue
+        slowdown = entry["seconds"] / max(old["seconds"], 1e-9)
+        if slowdown >= threshold:
+            regressions.append((entry, slowdown))
+    return regressions
+
+
+def print_report(run: dict, previous: dict | None) -> None:
+    """One line per timing, with the change since the previous run on this machine."""
+    compared = previous is not None and previous.get("machine") == run["machine"]
+    before = {(entry["kind"], entry["size"], entry["type"], entry["stage"]): entry
+              for entry in previous["results"]} if compared else {}
+
+    print(f"\n{'Size':>10} {'Type':<36} {'Stage':<40} {'Rows':>9} {'Seconds':>9} {'Peak MB':>8} {'vs last':>8}")
+    for entry in run["results"]:
+        old = before.get((entry["kind"], entry["size"], entry["type"], entry["stage"]))
+        change = f"{entry['seconds'] / old['seconds'] - 1:+.0%}" if old and old["seconds"] > 0 else ""
+        rows = "" if entry["rows"] is None else entry["rows"]
+        peak_mb = "" if entry["peak_mb"] is None else f"{entry['peak_mb']:.1f}"
+        print(f"{entry['size']:>10,} {entry['type']:<36} {entry['stage']:<40} {rows:>9} "
+              f"{entry['seconds']:>9.3f} {peak_mb:>8} {change:>8}")
+    if previous is not None and not compared:
+        print("(the previous run was on a different machine, so nothing is compared)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the cleaning steps and charts on synthetic sheets.")
+    parser.add_argument("--sizes", nargs="*", type=float, default=DEFAULT_SIZES, help="rows per sheet, e.g. 1e3 1e5 1e7")
+    parser.add_argument("--semester", default="f23", help="semester to name the sheets after (f24 gets AM/PM times)")
+    parser.add_argument("--types", nargs="*", choices=SHEET_TYPES, default=SHEET_TYPES, help="only these sheet types")
+    parser.add_argument("--engines", nargs="*", choices=ENGINES, default=["rows"], help="engines to time whole runs of")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-charts", action="store_true", help="only time the cleaning")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--regenerate", action="store_true", help="rewrite the synthetic sheets even if they exist")
+    parser.add_argument("--history", default=HISTORY_FILEPATH, help="JSON file the runs are appended to")
+    parser.add_argument("--check", action="store_true", help="exit with 1 if anything got slower than last time")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes]
+    run = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "machine": f"{platform.node()} {platform.machine()} {os.cpu_count()} CPUs",
+        "python": platform.python_version(),
+        "semester": args.semester,
+        "seed": args.seed,
+        "sizes": sizes,
+    }
+    start = time.perf_counter()
+    run["results"] = run_benchmarks(sizes, args.semester, args.types, args.engines, args.seed,
+                                    not args.no_charts, not args.no_memory, regenerate=args.regenerate)
+    run["seconds"] = round(time.perf_counter() - start, 2)
+
+    history = load_history(args.history)
+    previous = history[-1] if history else None
+    print_report(run, previous)
+    save_run(run, args.history)
+    print(f"\nBenchmarks took {run['seconds']:.1f}s, saved to {args.history}")
+
+    regressions = find_regressions(run, previous)
+    for entry, slowdown in regressions:
+        print(f"REGRESSION: {entry['stage']} ({entry['type']}, {entry['size']:,} rows) is {slowdown:.2f}x slower than last run")
+    if regressions and args.check:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import csv
+import itertools
+import json
+import threading
+import time
+import tracemalloc
+
+"""
+Opt-in timing of every stage of the pipeline: the cleaning steps and the charts.
+
+It's off by default, and then profiling.stage() costs next to nothing. To see where a
+refresh spends its time:
+
+    import profiling
+    profiling.enable()                    # trace_memory=True for the peak memory too (slower)
+    uc_parsing.clean_games(...)           # or run_all_visualizations(...), ...
+    profiling.print_summary()
+    profiling.save_report("profile.json") # or .csv, or .folded for flame graph tools
+
+(batch_clean.py and viz_render.py take --profile profile.json and do all of that,
+collecting the stages from every worker process.)
+
+Each stage records its wall time, CPU time, the rows going in and out (when it knows them)
+and, with trace_memory, the tracemalloc peak while it ran. Stages nest: a record's "stack"
+is like "clean_games f24_table_games_raw.csv;anonymize_rows", the folded-stack format
+flame graph tools (flamegraph.pl, speedscope) read, and print_summary draws the same tree.
+
+What is timed:
+- clean_games / clean_occupancy: the whole call, and for the row engine read_csv,
+  every step and save_csv
+- update_viz charts: the whole chart, split into load, aggregate, build and write_html
+"""
+
+ENABLED = False
+TRACE_MEMORY = False
+
+#every finished stage, in the order they finished (see REPORT_FIELDS)
+records = []
+REPORT_FIELDS = ["stack", "name", "depth", "start", "wall_seconds", "cpu_seconds", "rows_in", "rows_out", "peak_mb"]
+
+#each thread has its own stack of open stages
+_local = threading.local()
+#numbers the stages in the order they start
+_start_counter = itertools.count()
+
+
+def enable(trace_memory: bool = False) -> None:
+    """Starts recording stages. trace_memory also records peak memory, but makes everything slower."""
+    global ENABLED, TRACE_MEMORY
+    ENABLED = True
+    TRACE_MEMORY = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable() -> None:
+    global ENABLED, TRACE_MEMORY
+    if TRACE_MEMORY and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    ENABLED = TRACE_MEMORY = False
+
+
+def take_records() -> list[dict]:
+    """Returns the records so far and forgets them (how the worker processes hand theirs back)."""
+    taken = records[:]
+    records.clear()
+    return taken
+
+
+class _Stage:
+    __slots__ = ("record", "parent", "start_wall", "start_cpu", "start_memory", "peak_memory")
+
+    def __init__(self, name: str, rows_in: int | None):
+        self.record = {"name": name, "rows_in": rows_in, "rows_out": None}
+
+    def __enter__(self) -> dict:
+        stack = _local.__dict__.setdefault("stack", [])
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        self.record["stack"] = ";".join(stage.record["name"] for stage in stack)
+        self.record["depth"] = len(stack) - 1
+        self.record["start"] = next(_start_counter)
+        if TRACE_MEMORY and tracemalloc.is_tracing():
+            # tracemalloc only has one peak, so the parent keeps the peak so far before it's reset
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent.peak_memory = max(self.parent.peak_memory, peak)
+            tracemalloc.reset_peak()
+            self.start_memory = self.peak_memory = current
+        self.start_cpu = time.process_time()
+        self.start_wall = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc_info) -> bool:
+        self.record["wall_seconds"] = time.perf_counter() - self.start_wall
+        self.record["cpu_seconds"] = time.process_time() - self.start_cpu
+        self.record["peak_mb"] = None
+        if TRACE_MEMORY and tracemalloc.is_tracing():
+            self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+            self.record["peak_mb"] = (self.peak_memory - self.start_memory) / 2**20
+            if self.parent is not None:
+                self.parent.peak_memory = max(self.parent.peak_memory, self.peak_memory)
+        _local.stack.pop()
+        records.append(self.record)
+        return False
+
+
+class _NoStage:
+    """What stage() returns while profiling is off."""
+    def __enter__(self) -> dict:
+        return {}
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str, rows_in: int | None = None):
+    """
+    Times the code in a with block as a stage, nested in whatever stage is open:
+
+        with profiling.stage("anonymize_rows", rows_in=len(data)) as record:
+            data = anonymize_rows(data)
+            record["rows_out"] = len(data)
+
+    name shouldn't contain ";" (it separates the stages in "stack").
+    """
+    if not ENABLED:
+        return _NO_STAGE
+    return _Stage(name, rows_in)
+
+
+def summarize(stage_records: list[dict] | None = None) -> list[dict]:
+    """
+    The records added up per stack (a chart or step that ran several times is one line with
+    its count), in tree order: each stage right after its parent, in the order they started.
+    """
+    stage_records = records if stage_records is None else stage_records
+    totals = {}
+    for record in stage_records:
+        total = totals.setdefault(record["stack"], {
+            "stack": record["stack"], "name": record["name"], "depth": record["depth"], "count": 0,
+            "wall_seconds": 0.0, "cpu_seconds": 0.0, "rows_in": None, "rows_out": None, "peak_mb": None})
+        total["count"] += 1
+        total["wall_seconds"] += record["wall_seconds"]
+        total["cpu_seconds"] += record["cpu_seconds"]
+        for field in ["rows_in", "rows_out"]:
+            if record.get(field) is not None:
+                total[field] = (total[field] or 0) + record[field]
+        if record.get("peak_mb") is not None:
+            total["peak_mb"] = max(total["peak_mb"] or 0.0, record["peak_mb"])
+
+    # a stage is listed by when it (then each of its parents) first started. Records from
+    # different worker processes can have the same start number, so the name breaks ties
+    first_start = {}
+    for record in stage_records:
+        first_start[record["stack"]] = min(first_start.get(record["stack"], record["start"]), record["start"])
+
+    def tree_order(total):
+        parts = total["stack"].split(";")
+        prefixes = [";".join(parts[:i + 1]) for i in range(len(parts))]
+        return [(first_start.get(prefix, 0), prefix) for prefix in prefixes]
+    return sorted(totals.values(), key=tree_order)
+
+
+def print_summary(stage_records: list[dict] | None = None, width: int = 30, min_share: float = 0.0) -> None:
+    """
+    Prints the stages as an indented tree (flame graph style): wall and CPU time, runs,
+    rows in/out, peak memory, and a bar for each stage's share of the total wall time.
+    Stages under min_share of the total (e.g. 0.01) are left out.
+    """
+    totals = summarize(stage_records)
+    if not totals:
+        print("No stages recorded (call profiling.enable() first).")
+        return
+    total_seconds = sum(total["wall_seconds"] for total in totals if total["depth"] == 0) or 1e-9
+
+    print(f"{'Stage':<56} {'Wall s':>8} {'CPU s':>8} {'Runs':>5} {'Rows in':>9} {'Rows out':>9} {'Peak MB':>8}  Share")
+    for total in totals:
+        share = total["wall_seconds"] / total_seconds
+        if share < min_share:
+            continue
+        name = ("  " * total["depth"] + total["name"])[:56]
+        rows_in = "" if total["rows_in"] is None else total["rows_in"]
+        rows_out = "" if total["rows_out"] is None else total["rows_out"]
+        peak_mb = "" if total["peak_mb"] is None else f"{total['peak_mb']:.1f}"
+        bar = "█" * round(share * width)
+        print(f"{name:<56} {total['wall_seconds']:>8.3f} {total['cpu_seconds']:>8.3f} {total['count']:>5} "
+              f"{rows_in:>9} {rows_out:>9} {peak_mb:>8}  {bar} {share:.0%}")
+
+
+def save_report(file_path: str, stage_records: list[dict] | None = None) -> None:
+    """
+    Saves every stage record as JSON (if file_path ends in .json) or CSV, like uc_parsing.save_diagnostics.
+    A .folded file gets one "stack self-time-in-microseconds" line per stage instead, for flame graph tools.
+    """
+    stage_records = records if stage_records is None else stage_records
+    if file_path.endswith(".json"):
+        with open(file_path, mode='w') as outfile:
+            json.dump({"records": stage_records, "summary": summarize(stage_records)}, outfile, indent=2)
+    elif file_path.endswith(".folded"):
+        totals = summarize(stage_records)
+        self_seconds = {total["stack"]: total["wall_seconds"] for total in totals}
+        for total in totals:
+            parent = total["stack"].rpartition(";")[0]
+            if parent in self_seconds:
+                self_seconds[parent] -= total["wall_seconds"]
+        with open(file_path, mode='w') as outfile:
+            for stack, seconds in self_seconds.items():
+                outfile.write(f"{stack} {max(round(seconds * 1e6), 0)}\n")
+    else:
+        with open(file_path, mode='w', newline='') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(stage_records)
+    print("Profile saved to:", file_path)
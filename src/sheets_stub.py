@@ -0,0 +1,316 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+"""
+A local stand-in for the Google Sheets API that serves fixture CSVs, so sheets_to_csv.py
+can be tested and timed without a Google account, the network or real student data.
+
+It answers the read calls sheets_to_csv makes, with the same JSON as the real API:
+    GET /v4/spreadsheets/<id>/values/<range>
+    GET /v4/spreadsheets/<id>/values:batchGet?ranges=<range>&ranges=<range>...
+    GET /v4/spreadsheets/<id>   (the tabs' titles and sizes, for paged exports)
+A range is a tab name, optionally with A1 rows/columns ("Table Games", "'Table Games'!A2:Z",
+"Occupancy!A100:D200"). Like the real API, trailing empty cells and rows are left out.
+
+latency (seconds) is added to every request, to see what the number of round trips costs.
+error_rate makes that share of requests fail with a 429 or 503, and fail_next() makes the next
+requests fail, to test the retries and resuming of paged exports.
+Every request is counted in requests_served, and the size of the answers in bytes_served.
+
+Serve the synthetic sheets (see uc_synthetic.py) from src/:
+    python uc_synthetic.py --rows 10000
+    python sheets_stub.py --raw-data ../raw_data/synthetic --semester f23 --latency 0.3
+then in another terminal:
+    python sheets_to_csv.py --endpoint http://127.0.0.1:8765 --spreadsheet-id stub --raw-data /tmp/stub_raw
+
+To serve every spreadsheet in a batch_fetch.py manifest, each with the fixtures of its semester:
+    python sheets_stub.py --raw-data ../raw_data/synthetic --manifest ../sheets_manifest.json --latency 0.3
+    python batch_fetch.py --manifest ../sheets_manifest.json --endpoint http://127.0.0.1:8765 --raw-data /tmp/stub_raw
+
+Or from Python:
+    with SheetsStub({"stub": tabs_from_raw_folder("../raw_data/synthetic", "f23")}) as stub:
+        sheets_to_csv.main("stub", endpoint=stub.url)
+"""
+
+DEFAULT_PORT = 8765
+
+#a real sheet has some empty rows below the data, and they count in its row count
+EMPTY_GRID_ROWS = 100
+
+#status code -> the API's error status and message for the errors the stub can fake
+FAKE_ERRORS = {
+    429: ("RESOURCE_EXHAUSTED", "Quota exceeded for quota metric 'Read requests'."),
+    500: ("INTERNAL", "Internal error encountered."),
+    503: ("UNAVAILABLE", "The service is currently unavailable."),
+}
+
+#'Table Games'!A2:Z10 -> tab, first column, first row, last column, last row (all but the tab optional)
+RANGE_PATTERN = re.compile(r"^(?:'((?:[^']|'')+)'|([^!]+))(?:!([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?)?$")
+
+
+def tabs_from_raw_folder(raw_data_folder: str, semester: str) -> dict[str, str]:
+    """
+    Tab name -> fixture CSV for the tabs in sheets_to_csv.PAGES, using the
+    <semester>_<type>_raw.csv files in raw_data_folder (tabs without a file are left out).
+    """
+    from sheets_to_csv import PAGES
+
+    tabs = {}
+    for page_name, clean_name in PAGES.items():
+        file_path = os.path.join(raw_data_folder, f"{semester}_{clean_name}_raw.csv")
+        if os.path.exists(file_path):
+            tabs[page_name] = file_path
+    return tabs
+
+
+def spreadsheets_from_manifest(raw_data_folder: str, manifest_filepath: str) -> dict[str, dict[str, str]]:
+    """
+    Spreadsheet id -> {tab name -> fixture CSV} for every entry in a batch_fetch.py manifest,
+    using the fixtures of the entry's semester (see tabs_from_raw_folder) for the tabs it lists.
+    """
+    from batch_fetch import load_manifest
+
+    spreadsheets = {}
+    for entry in load_manifest(manifest_filepath):
+        tabs = tabs_from_raw_folder(raw_data_folder, entry["semester"])
+        spreadsheets[entry["spreadsheet_id"]] = {tab: tabs[tab] for tab in entry["tabs"] if tab in tabs}
+    return spreadsheets
+
+
+def column_index(letters: str) -> int:
+    """A -> 0, Z -> 25, AA -> 26"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def column_letters(index: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def parse_range(a1_range: str) -> tuple[str, int, int | None, int, int | None]:
+    """
+    "'Table Games'!B2:D10" -> ("Table Games", first row 1, last row 10, first column 1, last column 4),
+    rows/columns counted from 0 and the ends exclusive (None: to the end). Raises ValueError if it isn't a range.
+    """
+    match = RANGE_PATTERN.match(a1_range)
+    if not match:
+        raise ValueError(f"Unable to parse range: {a1_range}")
+    quoted_tab, tab, first_column, first_row, last_column, last_row = match.groups()
+    tab = quoted_tab.replace("''", "'") if quoted_tab is not None else tab
+    return (tab,
+            int(first_row) - 1 if first_row else 0,
+            int(last_row) if last_row else None,
+            column_index(first_column) if first_column else 0,
+            column_index(last_column) + 1 if last_column else None)
+
+
+def trim(rows: list[list[str]]) -> list[list[str]]:
+    """Drops trailing empty cells from each row and trailing empty rows, like the Sheets API."""
+    trimmed = []
+    for row in rows:
+        end = len(row)
+        while end and row[end - 1] == "":
+            end -= 1
+        trimmed.append(row[:end])
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class SheetsStub:
+    """
+    Serves spreadsheets made of fixture CSVs on 127.0.0.1.
+
+    spreadsheets: spreadsheet id -> {tab name -> CSV file path}
+    port: 0 picks a free port (see url)
+    latency: seconds to wait before answering each request
+    error_rate: share of requests (0 to 1) that fail with a 429 or 503 instead
+    seed: for the random errors
+
+    Use it as a context manager (or start() / stop()); it serves from a background thread.
+    The CSVs are read again on every request, so a test can append rows between fetches.
+    """
+    def __init__(self, spreadsheets: dict[str, dict[str, str]], port: int = 0, latency: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.spreadsheets = spreadsheets
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests_served = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._next_errors = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(self))
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> "SheetsStub":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "SheetsStub":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def fail_next(self, *status_codes: int) -> None:
+        """The next requests fail with these status codes (429, 500 or 503), one each, in order."""
+        with self._lock:
+            self._next_errors.extend(status_codes)
+
+    def _fake_error(self) -> int | None:
+        # the status code this request should fail with, if any
+        with self._lock:
+            if self._next_errors:
+                return self._next_errors.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self._random.choice([429, 503])
+        return None
+
+    def metadata(self, spreadsheet_id: str) -> dict:
+        """The API's Spreadsheet for spreadsheets.get: each tab's title and grid size."""
+        sheets = []
+        for index, (tab, file_path) in enumerate(self.spreadsheets[spreadsheet_id].items()):
+            with open(file_path, mode='r', newline='') as file:
+                num_rows = num_columns = 0
+                for row in csv.reader(file):
+                    num_rows += 1
+                    num_columns = max(num_columns, len(row))
+            sheets.append({"properties": {"sheetId": index, "title": tab, "index": index, "sheetType": "GRID",
+                                          "gridProperties": {"rowCount": num_rows + EMPTY_GRID_ROWS,
+                                                             "columnCount": max(num_columns, 1)}}})
+        return {"spreadsheetId": spreadsheet_id, "sheets": sheets}
+
+    def value_range(self, spreadsheet_id: str, a1_range: str) -> dict:
+        """The API's ValueRange for one range. Raises KeyError / ValueError like the API's 404 / 400."""
+        tabs = self.spreadsheets[spreadsheet_id]
+        tab, first_row, last_row, first_column, last_column = parse_range(a1_range)
+        if tab not in tabs:
+            raise ValueError(f"Unable to parse range: {a1_range}")
+
+        with open(tabs[tab], mode='r', newline='') as file:
+            # only the rows asked for are kept, so a paged export of a big tab doesn't hold all of it
+            rows = [row[first_column:last_column] for row in itertools.islice(csv.reader(file), first_row, last_row)]
+        rows = trim(rows)
+
+        # the API answers with the range it actually covered
+        width = max(map(len, rows), default=0)
+        last_column_letter = column_letters(first_column + max(width, 1) - 1)
+        covered = f"'{tab}'!{column_letters(first_column)}{first_row + 1}:{last_column_letter}{first_row + max(len(rows), 1)}"
+        value_range = {"range": covered, "majorDimension": "ROWS"}
+        if rows:
+            value_range["values"] = rows  # the API leaves "values" out of an empty range
+        return value_range
+
+
+def _make_handler(stub: SheetsStub):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(stub.latency)
+            with stub._lock:
+                stub.requests_served += 1
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            # /v4/spreadsheets/<id>, /v4/spreadsheets/<id>/values/<range> or /v4/spreadsheets/<id>/values:batchGet
+            parts = url.path.split("/")
+            if len(parts) < 4 or parts[1:3] != ["v4", "spreadsheets"]:
+                return self._error(404, "NOT_FOUND", "Unknown endpoint.")
+            spreadsheet_id = unquote(parts[3])
+            if spreadsheet_id not in stub.spreadsheets:
+                return self._error(404, "NOT_FOUND", "Requested entity was not found.")
+            fake_error = stub._fake_error()
+            if fake_error is not None:
+                return self._error(fake_error, *FAKE_ERRORS[fake_error])
+            try:
+                if len(parts) == 4:
+                    body = stub.metadata(spreadsheet_id)
+                elif parts[4] == "values:batchGet":
+                    ranges = query.get("ranges", [])
+                    body = {"spreadsheetId": spreadsheet_id,
+                            "valueRanges": [stub.value_range(spreadsheet_id, a1_range) for a1_range in ranges]}
+                elif parts[4] == "values" and len(parts) == 6:
+                    body = stub.value_range(spreadsheet_id, unquote(parts[5]))
+                else:
+                    return self._error(404, "NOT_FOUND", "Unknown endpoint.")
+            except ValueError as error:
+                return self._error(400, "INVALID_ARGUMENT", str(error))
+            self._send(200, body)
+
+        def _error(self, code: int, status: str, message: str):
+            self._send(code, {"error": {"code": code, "message": message, "status": status}})
+
+        def _send(self, code: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            with stub._lock:
+                stub.bytes_served += len(data)
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            print(f"Sheets stub: {format % args}")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fixture CSVs as a local Google Sheets API.")
+    parser.add_argument("--raw-data", default=os.path.join("..", "raw_data", "synthetic"),
+                        help="folder with <semester>_<type>_raw.csv fixtures")
+    parser.add_argument("--semester", default="f23", help="which semester's fixtures to serve")
+    parser.add_argument("--spreadsheet-id", default="stub", help="the id to serve them as")
+    parser.add_argument("--manifest", default=None, help="serve every spreadsheet in this batch_fetch.py manifest instead")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail with a 429 or 503")
+    args = parser.parse_args()
+
+    if args.manifest:
+        spreadsheets = spreadsheets_from_manifest(args.raw_data, args.manifest)
+        print(f"Serving {len(spreadsheets)} spreadsheets from {args.manifest}")
+    else:
+        tabs = tabs_from_raw_folder(args.raw_data, args.semester)
+        if not tabs:
+            raise SystemExit(f"No {args.semester}_<type>_raw.csv files in {args.raw_data}")
+        spreadsheets = {args.spreadsheet_id: tabs}
+        print(f"Serving {', '.join(tabs)} as spreadsheet '{args.spreadsheet_id}'")
+    stub = SheetsStub(spreadsheets, args.port, args.latency, args.error_rate)
+    print(f"at {stub.url} (Ctrl+C to stop)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,30 @@
+import argparse
 import os
 import csv
+import itertools
+import json
+import threading
+from collections import deque
 
-
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from datetime import datetime
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]   # This is the perminssions of the application (we asking google for permission)
 
 SPREADSHEET_ID = "YOUR_SPREADSHEET_ID_HERE"   # private google sheets ID here
 
+RAW_DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "raw_data")
+
+#an incremental fetch asks for this many already pulled rows again, to check they weren't edited
+OVERLAP_ROWS = 5
+#the last column an incremental fetch asks for (the sheets have 10 or fewer)
+LAST_COLUMN = "Z"
+
+#rows asked for at a time by a paged export (see export_paged)
+PAGE_ROWS = 5000
+#a request that's rate limited (429), hits a server error (5xx) or loses its connection is tried again
+#this many times by googleapiclient (execute(num_retries=...)), waiting a random time up to 2, 4, 8, ... seconds in between
+MAX_RETRIES = 6
+
 
 # Page (Sheet) names to process
 PAGES = {
@@ -39,7 +51,11 @@ def get_current_semester():
         return f"f{year}"  # Fall
 
 
-def main():
+def get_credentials():
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     credentials = None
     if os.path.exists("tokens.json"):
         credentials = Credentials.from_authorized_user_file("tokens.json", SCOPES)   # loading credentials from the token file to not have to do it multiple times
@@ -51,27 +67,378 @@ def main():
             credentials = flow.run_local_server(port=0)
         with open("tokens.json", "w") as token:   # creating the token JSON file that did not exist before
             token.write(credentials.to_json())
+    return credentials
+
+
+def build_sheets(endpoint: str | None = None, credentials=None, thread_safe: bool = False):
+    """
+    The Google Sheets spreadsheets() resource.
+
+    endpoint: base URL of a stand-in for the API, like "http://127.0.0.1:8765" (see sheets_stub.py).
+        No login is needed for it.
+    credentials: from get_credentials() (default: log in now).
+    thread_safe: make a resource that many threads can use at once (see batch_fetch.py). An httplib2
+        connection can't be shared between threads, so each thread sends its requests over its own,
+        but they all use this one resource and the same credentials.
+    """
+    from googleapiclient.discovery import build
+    from googleapiclient.http import HttpRequest, build_http
+
+    if endpoint:
+        new_http = build_http
+    else:
+        from google_auth_httplib2 import AuthorizedHttp
+        credentials = credentials or get_credentials()
+
+        def new_http():
+            return AuthorizedHttp(credentials, http=build_http())
+
+    local = threading.local()
+
+    def thread_request(http, *args, **kwargs):
+        # the same request, sent over this thread's connection
+        if not hasattr(local, "http"):
+            local.http = new_http()
+        return HttpRequest(local.http, *args, **kwargs)
+
+    service = build("sheets", "v4", http=new_http(), requestBuilder=thread_request if thread_safe else HttpRequest,
+                    client_options={"api_endpoint": endpoint} if endpoint else None, static_discovery=True)
+    return service.spreadsheets()
+
+
+def fetch_ranges(sheets, spreadsheet_id: str, ranges: list[str]) -> list[list[list[str]]]:
+    """
+    The rows of every A1 range in one values.batchGet call (one round trip, however many there are),
+    in the same order as ranges. A range with no data gives no rows.
+    """
+    if not ranges:
+        return []
+    response = sheets.values().batchGet(spreadsheetId=spreadsheet_id, ranges=list(ranges)).execute(num_retries=MAX_RETRIES)
+    # the value ranges come back in the order the ranges were asked for
+    return [value_range.get("values", []) for value_range in response.get("valueRanges", [])]
+
+
+def fetch_pages(sheets, spreadsheet_id: str, page_names: list[str]) -> dict[str, list[list[str]]]:
+    """Every page's rows in one values.batchGet call. Returns page name -> rows, empty for a page with no data."""
+    return dict(zip(page_names, fetch_ranges(sheets, spreadsheet_id, list(page_names))))
+
+
+def _fetch_errors() -> tuple:
+    # what a request can still fail with once its retries run out: an HTTP error, or httplib2's or the network's
+    from googleapiclient.errors import HttpError
+    from httplib2 import HttpLib2Error
+    return (HttpError, HttpLib2Error, OSError)
+
+
+def a1_range(page_name: str, first_row: int = 1, last_row: int | None = None) -> str:
+    """
+    The A1 range from first_row to last_row (default: the end) of a page,
+    e.g. 'Board & Card Games'!A120:Z or 'Occupancy'!A1:Z5000
+    """
+    return "'{}'!A{}:{}{}".format(page_name.replace("'", "''"), first_row, LAST_COLUMN,
+                                  "" if last_row is None else last_row)
+
+
+def write_page(values: list[list[str]], output_file: str) -> None:
+    """
+    Writes a page's rows to a CSV file.
+
+    The API leaves out empty cells at the end of a row, so the rows are padded back to the
+    same width first: the CSV has the sheet's columns on every row, like a download from Sheets.
+    """
+    width = max(map(len, values), default=0)
+    with open(output_file, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerows(row + [""] * (width - len(row)) for row in values)
+
+
+def _trimmed(row: list[str]) -> list[str]:
+    # a row as the API sends it: no empty cells at the end
+    end = len(row)
+    while end and row[end - 1] == "":
+        end -= 1
+    return row[:end]
+
+
+def fetch_state_path(output_file: str) -> str:
+    """raw_data/f24_table_games_raw.csv -> raw_data/f24_table_games_fetch.json"""
+    if output_file.endswith("_raw.csv"):
+        return output_file[:-len("_raw.csv")] + "_fetch.json"
+    return output_file + ".fetch.json"
+
+
+def load_fetch_state(output_file: str) -> dict | None:
+    """What the last fetch of this file pulled ({"spreadsheet_id", "page", "rows", "width"}), None if unknown."""
+    state_path = fetch_state_path(output_file)
+    if not os.path.exists(state_path) or not os.path.exists(output_file):
+        return None
+    try:
+        with open(state_path, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_fetch_state(output_file: str, spreadsheet_id: str, page_name: str, rows: int, width: int) -> None:
+    state_path = fetch_state_path(output_file)
+    with open(state_path + ".tmp", "w") as file:
+        json.dump({"spreadsheet_id": spreadsheet_id, "page": page_name, "rows": rows, "width": width}, file)
+    os.replace(state_path + ".tmp", state_path)
+
+
+def _tail(output_file: str, num_rows: int) -> tuple[int, list[list[str]]]:
+    """(number of rows in a CSV file, its last num_rows rows as the API would send them)"""
+    count = 0
+    last_rows = deque(maxlen=num_rows)
+    with open(output_file, "r", newline="") as file:
+        for row in csv.reader(file):
+            count += 1
+            last_rows.append(_trimmed(row))
+    return count, list(last_rows)
+
+
+def fetch_pages_incremental(sheets, spreadsheet_id: str, pages: dict[str, str],
+                            page_rows: int | None = None) -> dict[str, str]:
+    """
+    Brings each page's CSV up to date by only fetching the rows added since the last fetch.
+
+    pages: page name -> output file.
+    page_rows: fetch the pages that have to be fetched whole page_rows rows at a time (export_paged).
+
+    For a page fetched before, it asks for the rows from OVERLAP_ROWS before the end of what
+    it already has (A{n+1-OVERLAP_ROWS}:Z). If those overlap rows still match the file, the
+    rows after them are appended to it. If they don't (someone edited or deleted a recent row),
+    or the page was never fetched, or the file doesn't match what was fetched, the whole page is
+    fetched again and the file rewritten. Every page's range goes in one batchGet, and the pages
+    that have to be fetched again in a second one.
+
+    Returns page name -> what happened: "full" (new or rewritten), "+N rows", or with page_rows
+    "failed" (see fetch_pages_full).
+    """
+    delta_ranges = {}   # page name -> (first row asked for, the file's rows from there, width)
+    full_pages = []
+    for page_name, output_file in pages.items():
+        state = load_fetch_state(output_file)
+        if state is None or state["spreadsheet_id"] != spreadsheet_id or state["page"] != page_name:
+            full_pages.append(page_name)
+            continue
+        first_row = max(1, state["rows"] - OVERLAP_ROWS + 1)
+        num_rows, overlap = _tail(output_file, state["rows"] - first_row + 1)
+        if num_rows != state["rows"]:
+            full_pages.append(page_name)  # the file changed since it was fetched
+            continue
+        delta_ranges[page_name] = (first_row, overlap, state["width"])
+
+    outcomes = {}
+    fetched = fetch_ranges(sheets, spreadsheet_id, [a1_range(page_name, first_row)
+                                                    for page_name, (first_row, _, _) in delta_ranges.items()])
+    for (page_name, (first_row, overlap, width)), values in zip(delta_ranges.items(), fetched):
+        new_rows = values[len(overlap):]
+        if [_trimmed(row) for row in values[:len(overlap)]] != overlap or any(len(row) > width for row in new_rows):
+            print(f"'{page_name}' changed before row {first_row + len(overlap)}, fetching all of it again.")
+            full_pages.append(page_name)
+            continue
+        output_file = pages[page_name]
+        with open(output_file, "a", newline="") as file:
+            csv.writer(file).writerows(row + [""] * (width - len(row)) for row in new_rows)
+        save_fetch_state(output_file, spreadsheet_id, page_name, first_row - 1 + len(overlap) + len(new_rows), width)
+        outcomes[page_name] = f"+{len(new_rows)} rows"
+
+    outcomes.update(fetch_pages_full(sheets, spreadsheet_id,
+                                     {page_name: pages[page_name] for page_name in full_pages}, page_rows))
+    return outcomes
+
+
+def fetch_pages_full(sheets, spreadsheet_id: str, pages: dict[str, str], page_rows: int | None = None) -> dict[str, str]:
+    """
+    Fetches every page whole and writes it to its CSV (pages: page name -> output file), saving
+    the fetch state for the next incremental run. All the pages are fetched in one batchGet,
+    or with page_rows, each one page_rows rows at a time (export_paged).
+
+    Returns page name -> "full", or "empty" for a page with no data (its file is left alone).
+    With page_rows, a page whose export fails is "failed" and the others still go ahead;
+    fetching it again carries on after the last rows that were saved.
+    """
+    outcomes = {}
+    if page_rows:
+        fetch_errors = _fetch_errors()
+        for page_name, output_file in pages.items():
+            try:
+                rows = export_paged(sheets, spreadsheet_id, page_name, output_file, page_rows)
+            except fetch_errors as e:
+                print(f"'{page_name}' failed: {e}")
+                outcomes[page_name] = "failed"
+                continue
+            outcomes[page_name] = "full" if rows else "empty"
+        return outcomes
+
+    for page_name, values in fetch_pages(sheets, spreadsheet_id, list(pages)).items():
+        if not values:
+            outcomes[page_name] = "empty"
+            continue
+        write_page(values, pages[page_name])
+        save_fetch_state(pages[page_name], spreadsheet_id, page_name, len(values), max(map(len, values)))
+        outcomes[page_name] = "full"
+    return outcomes
+
+
+def sheet_row_count(sheets, spreadsheet_id: str, page_name: str) -> int:
+    """How many rows a page has (empty ones at the bottom too), from the spreadsheet's metadata."""
+    request = sheets.get(spreadsheetId=spreadsheet_id, fields="sheets.properties(title,gridProperties.rowCount)")
+    for sheet in request.execute(num_retries=MAX_RETRIES).get("sheets", []):
+        if sheet["properties"]["title"] == page_name:
+            return sheet["properties"]["gridProperties"]["rowCount"]
+    raise ValueError(f"There is no page named '{page_name}' in spreadsheet {spreadsheet_id}")
+
+
+def _load_progress(progress_path: str) -> dict | None:
+    try:
+        with open(progress_path, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_progress(progress_path: str, progress: dict) -> None:
+    with open(progress_path + ".tmp", "w") as file:
+        json.dump(progress, file)
+    os.replace(progress_path + ".tmp", progress_path)
+
+
+def _repad(file_path: str, width: int) -> None:
+    # pads every row of a CSV file to width, one row at a time
+    with open(file_path, "r", newline="") as infile, open(file_path + ".tmp", "w", newline="") as outfile:
+        csv.writer(outfile).writerows(row + [""] * (width - len(row)) for row in csv.reader(infile))
+    os.replace(file_path + ".tmp", file_path)
+
+
+def export_paged(sheets, spreadsheet_id: str, page_name: str, output_file: str, page_rows: int = PAGE_ROWS) -> int:
+    """
+    Exports a page too big to fetch in one go (the archive spreadsheets), page_rows rows per request.
+
+    Each window of rows (A1:Z5000, A5001:Z10000, ... up to the page's row count) is appended to
+    output_file + ".part" as soon as it arrives, so only one window is ever in memory. After each
+    window, how far the export got is saved to output_file + ".export.json". Requests that are rate
+    limited, hit a server error or lose their connection are tried again (MAX_RETRIES); if one
+    still fails, running the export again carries on after the last window that was saved.
+
+    When it's done the file replaces output_file, with the same rows a full fetch (write_page)
+    would give, and the fetch state is saved so --incremental runs can carry on from it.
+
+    Returns the number of rows written (0 if the page has no data; then nothing is written).
+    """
+    part_file = output_file + ".part"
+    progress_path = output_file + ".export.json"
+    progress = _load_progress(progress_path)
+    if (progress is not None and os.path.exists(part_file)
+            and progress["spreadsheet_id"] == spreadsheet_id and progress["page"] == page_name):
+        # anything after the last saved window is from the run that failed
+        with open(part_file, "r+b") as file:
+            file.truncate(progress["bytes"])
+        print(f"'{page_name}': carrying on from row {progress['next_row']} ({progress['rows']} rows already saved)")
+    else:
+        # rows: rows written so far, blank_rows: empty rows at the end of the windows so far (not written yet)
+        progress = {"spreadsheet_id": spreadsheet_id, "page": page_name, "next_row": 1, "rows": 0,
+                    "blank_rows": 0, "width": 0, "repad": False, "bytes": 0}
+        open(part_file, "w").close()
+
+    row_count = sheet_row_count(sheets, spreadsheet_id, page_name)
+    with open(part_file, "a", newline="") as file:
+        writer = csv.writer(file)
+        while progress["next_row"] <= row_count:
+            first_row = progress["next_row"]
+            last_row = min(first_row + page_rows - 1, row_count)
+            request = sheets.values().get(spreadsheetId=spreadsheet_id, range=a1_range(page_name, first_row, last_row))
+            values = request.execute(num_retries=MAX_RETRIES).get("values", [])
+
+            if values:
+                width = max(progress["width"], max(map(len, values)))
+                if width > progress["width"] and progress["rows"]:
+                    progress["repad"] = True  # the rows already written are narrower, they're padded at the end
+                # the API leaves out the empty rows at the end of a range, so the ones at the end
+                # of the windows before this one only go in now that there's data after them
+                writer.writerows(itertools.repeat([""] * width, progress["blank_rows"]))
+                writer.writerows(row + [""] * (width - len(row)) for row in values)
+                progress["rows"] += progress["blank_rows"] + len(values)
+                progress["blank_rows"] = 0
+                progress["width"] = width
+            progress["blank_rows"] += last_row - first_row + 1 - len(values)
+            progress["next_row"] = last_row + 1
+
+            file.flush()
+            progress["bytes"] = os.fstat(file.fileno()).st_size
+            _save_progress(progress_path, progress)
+
+    if progress["repad"]:
+        _repad(part_file, progress["width"])
+    if progress["rows"]:
+        os.replace(part_file, output_file)
+        save_fetch_state(output_file, spreadsheet_id, page_name, progress["rows"], progress["width"])
+    else:
+        os.remove(part_file)
+    os.remove(progress_path)
+    return progress["rows"]
+
+
+def main(spreadsheet_id: str = SPREADSHEET_ID, endpoint: str | None = None, semester: str | None = None,
+         raw_data_folder: str = RAW_DATA_FOLDER, incremental: bool = False, paged: bool = False,
+         page_rows: int = PAGE_ROWS):
+    """
+    Downloads every page in PAGES to raw_data/<semester>_<type>_raw.csv.
+
+    endpoint: fetch from a stand-in for the Sheets API instead (see sheets_stub.py)
+    semester: default is the current one (get_current_semester)
+    incremental: only fetch the rows added since the last run and append them
+        (see fetch_pages_incremental). The first run is a full fetch.
+    paged: export each page page_rows rows at a time, writing them as they come
+        (see export_paged). For pages too big to fetch at once; a page that fails doesn't stop
+        the others, and running it again carries on where it stopped.
+    """
+    fetch_errors = _fetch_errors()
 
     try:
         # Build the Google Sheets service
-        service = build("sheets", "v4", credentials=credentials)
-        sheets = service.spreadsheets()
+        sheets = build_sheets(endpoint)
 
         # Get current semester abbreviation (e.g., f23)
-        semester = get_current_semester()
+        semester = semester or get_current_semester()
 
         # Ensure the 'raw_data' folder exists
-        raw_data_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "raw_data")
         if not os.path.exists(raw_data_folder):
             os.makedirs(raw_data_folder)
 
-        # Process each page (sheet) and export to its own CSV
+        if incremental:
+            print(f"Fetching new rows of: {', '.join(PAGES)}")
+            output_files = {page_name: os.path.join(raw_data_folder, f"{semester}_{clean_name}_raw.csv")
+                            for page_name, clean_name in PAGES.items()}
+            outcomes = fetch_pages_incremental(sheets, spreadsheet_id, output_files, page_rows if paged else None)
+            for page_name, outcome in outcomes.items():
+                print(f"{page_name}: {outcome} -> {output_files[page_name]}")
+            if "failed" in outcomes.values():
+                print("Run again to carry on from the last rows that were saved.")
+            return
+
+        if paged:
+            for page_name, clean_name in PAGES.items():
+                output_file = os.path.join(raw_data_folder, f"{semester}_{clean_name}_raw.csv")
+                print(f"Exporting page: {page_name} ({page_rows} rows at a time)")
+                try:
+                    rows = export_paged(sheets, spreadsheet_id, page_name, output_file, page_rows)
+                except fetch_errors as e:
+                    # the other pages can still be exported, and this one carries on from here next time
+                    print(f"'{page_name}' failed: {e}")
+                    print("Run again to carry on from the last rows that were saved.")
+                    continue
+                print(f"{rows} rows exported to {output_file}" if rows else f"No data found in '{page_name}'.")
+            return
+
+        # Fetch every page (sheet) at once, then export each to its own CSV
+        print(f"Fetching pages: {', '.join(PAGES)}")
+        pages = fetch_pages(sheets, spreadsheet_id, list(PAGES))
+
         for page_name, clean_name in PAGES.items():
             print(f"Processing page: {page_name}")
-
-            # Fetch all data in the specified sheet
-            results = sheets.values().get(spreadsheetId=SPREADSHEET_ID, range=page_name).execute() 
-            values = results.get("values", [])
+            values = pages.get(page_name, [])
 
             if not values:
                 print(f"No data found in '{page_name}'.")
@@ -81,15 +448,23 @@ def main():
             output_file = os.path.join(raw_data_folder, f"{semester}_{clean_name}_raw.csv")
 
             # Write data to the CSV file
-            with open(output_file, "w", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerows(values)
+            write_page(values, output_file)
+            save_fetch_state(output_file, spreadsheet_id, page_name, len(values), max(map(len, values)))
 
-            print(f"Data exported to {output_file}")  
-    except HttpError as e:
+            print(f"Data exported to {output_file}")
+    except fetch_errors as e:
         print(e)
 
-    
+
 if __name__ == "__main__":
-    main()
-     
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download the rental spreadsheet's pages to raw_data/.")
+    parser.add_argument("--spreadsheet-id", default=SPREADSHEET_ID)
+    parser.add_argument("--endpoint", default=None, help="a Sheets API stand-in to fetch from instead, e.g. http://127.0.0.1:8765 (see sheets_stub.py)")
+    parser.add_argument("--semester", default=None, help="semester to name the files after (default: the current one)")
+    parser.add_argument("--raw-data", default=RAW_DATA_FOLDER, help="folder to write the <sem>_<type>_raw.csv files to")
+    parser.add_argument("--incremental", action="store_true", help="only fetch the rows added since the last run and append them")
+    parser.add_argument("--paged", action="store_true", help="export big pages a window of rows at a time, carrying on after a failure")
+    parser.add_argument("--page-rows", type=int, default=PAGE_ROWS, help="rows per request with --paged")
+    args = parser.parse_args()
+
+    main(args.spreadsheet_id, args.endpoint, args.semester, args.raw_data, args.incremental, args.paged, args.page_rows)
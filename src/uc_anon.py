@@ -0,0 +1,175 @@
+import hmac
+import os
+import secrets
+import sqlite3
+import tempfile
+
+"""
+Persistent anonymization IDs.
+
+anonymize_rows numbers patrons 1, 2, 3... in the order they show up in one file, so the
+same person gets a different "Unique ID" in every semester (and after every re-sort).
+AnonStore gives each (name, student ID) pair one ID that stays the same across runs and
+semesters:
+- the pair is hashed with HMAC-SHA256 and a local secret key, so the store can't be
+  reversed by hashing every possible student ID without the key
+- the store is a SQLite table of digest -> integer ID, keyed on the digest, so a lookup
+  is one index probe however many patrons there are. IDs are handed out in order of
+  first sighting.
+- the raw names and IDs are never written anywhere, only the digests
+- ids() looks up a whole batch of keys at once, and every digest seen is cached in memory
+
+Keep the key file secret and out of git. Without it, the store's IDs can't be matched
+to new rows (a new key means starting over with new IDs).
+
+Use clean_games(..., id_store_filepath="../raw_data/anon_ids.sqlite").
+"""
+
+#how many digests go in one "WHERE digest IN (...)" (SQLite's variable limit is 999 on old versions)
+LOOKUP_CHUNK = 500
+
+
+def _read_secret(secret_filepath: str) -> bytes:
+    with open(secret_filepath, mode='rb') as file:
+        secret = file.read()
+    if len(secret) < 16:
+        raise ValueError(f"Anonymization key in {secret_filepath} is too short.")
+    return secret
+
+
+def load_or_create_secret(secret_filepath: str) -> bytes:
+    """
+    Reads the HMAC key, making a new random one (readable only by us) if it doesn't exist yet.
+
+    batch_clean's workers can all get here at once on the first run. The new key is written
+    and synced to a temp file first, then linked into place: the link either makes the whole
+    key appear at once or fails because another worker's key got there first, and then that
+    one is used. No worker can read a half-written key.
+    """
+    if os.path.exists(secret_filepath):
+        return _read_secret(secret_filepath)
+
+    secret = secrets.token_bytes(32)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(secret_filepath)), suffix=".tmp")  # mode 0o600
+    try:
+        with os.fdopen(fd, mode='wb') as file:
+            file.write(secret)
+            file.flush()
+            os.fsync(file.fileno())
+        os.link(temp_path, secret_filepath)
+    except FileExistsError:
+        return _read_secret(secret_filepath)
+    finally:
+        os.remove(temp_path)
+    print("Created new anonymization key:", secret_filepath)
+    return secret
+
+
+class AnonStore:
+    """
+    (name, student ID) -> stable integer ID, backed by a SQLite file.
+
+    store_filepath (str): the SQLite file (created if missing).
+    secret_filepath (str): the HMAC key. Defaults to store_filepath + ".key".
+
+    Works as a context manager. New IDs are committed as soon as they're handed out, so
+    batch_clean's workers, which share the store, only wait on each other for that insert.
+    """
+    def __init__(self, store_filepath: str, secret_filepath: str | None = None):
+        self.store_filepath = store_filepath
+        # keyed once; digest() copies it instead of hashing the key again for every patron
+        self._hmac = hmac.new(load_or_create_secret(secret_filepath or store_filepath + ".key"), digestmod="sha256")
+        self.cache = {}
+        self.new_ids = 0
+
+        # timeout: batch_clean's workers share the store, and wait their turn to write
+        self.connection = sqlite3.connect(store_filepath, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA cache_size=-65536")  # 64MB
+        # digest is the primary key of a WITHOUT ROWID table: one B-tree, no separate index
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS ids (digest BLOB PRIMARY KEY, id INTEGER NOT NULL) WITHOUT ROWID")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS counter (next_id INTEGER NOT NULL)")
+        self.connection.execute("INSERT INTO counter SELECT 1 WHERE NOT EXISTS (SELECT * FROM counter)")
+        self.connection.execute("CREATE TEMP TABLE lookup (digest BLOB)")
+
+    def digest(self, key: tuple[str, str]) -> bytes:
+        name, student_id = key
+        # \x1f (unit separator) can't be typed into a sheet cell, so ("a b", "c") != ("a", "b c")
+        mac = self._hmac.copy()
+        mac.update(f"{name}\x1f{student_id}".encode("utf-8"))
+        return mac.digest()
+
+    def ids(self, keys: list[tuple[str, str]]) -> list[int]:
+        """Stable IDs for a batch of (name, student ID) keys, adding any new ones."""
+        digests = [self.digest(key) for key in keys]
+        missing = list(dict.fromkeys(digest for digest in digests if digest not in self.cache))
+        if missing:
+            self._fetch(missing)  # outside a transaction: reads don't block the other workers
+            new = [digest for digest in missing if digest not in self.cache]
+            if new:
+                self._insert(new)
+        return [self.cache[digest] for digest in digests]
+
+    def _insert(self, new: list[bytes]) -> None:
+        # the write lock is only held from here to the commit, and no other worker can take these numbers
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._fetch(new)  # another worker may have added some since the lookup
+            new = [digest for digest in new if digest not in self.cache]
+            first_id = self.connection.execute("SELECT next_id FROM counter").fetchone()[0]
+            rows = [(digest, id_) for id_, digest in enumerate(new, start=first_id)]
+            self.connection.executemany("INSERT INTO ids (digest, id) VALUES (?, ?)", rows)
+            self.connection.execute("UPDATE counter SET next_id = ?", (first_id + len(new),))
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.cache.update(rows)
+        self.new_ids += len(new)
+
+    def id(self, key: tuple[str, str]) -> int:
+        """Stable ID for one key (a dict lookup once it has been seen)."""
+        digest = self.digest(key)
+        try:
+            return self.cache[digest]
+        except KeyError:
+            return self.ids([key])[0]
+
+    def _fetch(self, digests: list[bytes]) -> None:
+        if len(digests) <= LOOKUP_CHUNK:
+            placeholders = ",".join("?" * len(digests))
+            query = f"SELECT digest, id FROM ids WHERE digest IN ({placeholders})"
+            self.cache.update(self.connection.execute(query, digests))
+            return
+        if len(digests) * 8 >= self._size():
+            # looking up a big share of the store: one pass over the table beats random lookups
+            wanted = set(digests)
+            self.cache.update(row for row in self.connection.execute("SELECT digest, id FROM ids") if row[0] in wanted)
+            return
+        # big batches: one join instead of thousands of small queries
+        self.connection.execute("DELETE FROM lookup")
+        self.connection.executemany("INSERT INTO lookup (digest) VALUES (?)", ((d,) for d in digests))
+        self.cache.update(self.connection.execute(
+            "SELECT ids.digest, ids.id FROM lookup JOIN ids ON ids.digest = lookup.digest"))
+
+    def _size(self) -> int:
+        return self.connection.execute("SELECT next_id - 1 FROM counter").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._size()
+
+    def commit(self) -> None:
+        if self.connection.in_transaction:
+            self.connection.execute("COMMIT")
+
+    def close(self) -> None:
+        self.commit()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,494 @@
+import csv
+
+import numpy as np
+import pandas as pd
+
+from uc_dates import DateParser
+from uc_parsing import warn
+from uc_times import CLOCK_STRINGS, TIME_COLUMNS, NOON, MINUTES_PER_DAY, parse_clock, parse_am_pm, minutes_of
+
+"""
+Columnar version of the cleaning steps in uc_parsing.py.
+
+clean_games / clean_occupancy walk a list of rows one at a time. The functions here do
+the same steps as column operations on pandas/NumPy arrays instead:
+- the date fill-down is a forward-fill
+- "Time In"/"Time Out" are parsed to integer hours/minutes once per unique value
+- bad rows are boolean masks
+- the AM/PM "is_it_afternoon_yet" flag is a running max within each run of dates
+
+The frame index is kept through every step (index 0 is sheet row 2), so warnings
+point at the row of the original sheet. The output CSVs are byte-for-byte the same
+as the row engine's. Don't call these directly,
+use clean_games(..., engine="columnar") or clean_occupancy(..., engine="columnar").
+"""
+
+
+def read_raw_columns(file_path: str, min_columns: int) -> tuple[list[str], pd.DataFrame]:
+    """
+    Reads a raw sheet into (header, frame).
+
+    Every cell is read as a string (no NaN, no type guessing) and the frame has integer
+    column labels 0..n-1, so positions line up with the row engine's row[i].
+    Short rows are padded with "" and ghost columns past the ones we need are not read.
+    """
+    with open(file_path, mode='r', newline='') as infile:
+        header = next(csv.reader(infile), [])
+
+    width = max(min_columns, 1)
+    frame = pd.read_csv(
+        file_path,
+        header=0,
+        names=range(width),
+        usecols=range(width),
+        dtype=str,
+        na_filter=False,
+        keep_default_na=False,
+        skip_blank_lines=False,
+        index_col=False,
+    )
+    return header, frame
+
+
+def save_frame_csv(header: list[str], frame: pd.DataFrame, file_path: str) -> None:
+    """Writes header + frame rows with csv.writer, so quoting matches save_csv exactly."""
+    columns = [frame[column].to_numpy(dtype=object) for column in frame.columns]
+    with open(file_path, mode='w', newline='') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(header)
+        writer.writerows(zip(*columns))
+
+
+def _map_unique(values: pd.Series, func) -> pd.Series:
+    """Applies func once per distinct value instead of once per row."""
+    codes, uniques = pd.factorize(values, sort=False)
+    mapped = np.array([func(value) for value in uniques] + [None], dtype=object)
+    return pd.Series(mapped[codes], index=values.index)
+
+
+def _minutes(values: pd.Series, parse=parse_clock) -> np.ndarray:
+    """
+    Parses time strings to an int64 array of minutes since midnight, with -1 where parse fails.
+    """
+    codes, uniques = pd.factorize(values, sort=False)
+    parsed = [parse(value) for value in uniques] + [None]
+    table = np.array([-1 if minutes is None else minutes for minutes in parsed], dtype=np.int64)
+    return table[codes]
+
+
+#every "HH:MM" string, indexed by minutes since midnight
+_CLOCK_STRINGS = np.array(CLOCK_STRINGS, dtype=object)
+
+
+def _format_clock(minutes: np.ndarray) -> np.ndarray:
+    """Formats minutes back to zero-padded HH:MM strings (a table lookup), "" where invalid."""
+    valid = minutes >= 0
+    return np.where(valid, _CLOCK_STRINGS[np.where(valid, minutes, 0)], "")
+
+
+def _to_pm(minutes: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """uc_times.to_pm on the rows where mask is set."""
+    return np.where(mask, (minutes + NOON) % MINUTES_PER_DAY, minutes)
+
+
+def _source_rows(frame: pd.DataFrame) -> np.ndarray:
+    """The sheet row each frame row came from (the header is sheet row 1)."""
+    return frame.index.to_numpy() + 2
+
+
+def _run_ids(dates: pd.Series) -> pd.Series:
+    """Numbers each run of equal consecutive dates (the 'new day' reset in fix_time_disparity)."""
+    return (dates != dates.shift()).cumsum()
+
+
+def _flag_before(trigger: np.ndarray, runs: pd.Series) -> np.ndarray:
+    """
+    Vectorized is_it_afternoon_yet: True if any earlier row of the same day triggered it.
+    """
+    seen = pd.Series(trigger.astype(np.int8), index=runs.index).groupby(runs.to_numpy()).cummax()
+    return seen.groupby(runs.to_numpy()).shift(fill_value=0).to_numpy().astype(bool)
+
+
+def _between(values: np.ndarray, low: int, high: int) -> np.ndarray:
+    return (low <= values) & (values <= high)
+
+
+def resolve_board_game_notes_column(header: list[str], frame: pd.DataFrame) -> pd.DataFrame:
+    """Columnar resolve_board_game_notes_column."""
+    try:
+        game_index = header.index("Game")
+        notes_index = header.index("Notes")
+    except ValueError as e:
+        raise ValueError("Required columns 'Game' or 'Notes' are missing.") from e
+
+    game = frame[game_index].str.strip().str.lower()
+    notes = frame[notes_index].str.strip()
+    mask = game.isin(["other", "other (specify in notes)"]) & (notes != "")
+    frame.loc[mask, game_index] = notes[mask]
+    return frame
+
+
+def fill_game_column(header: list[str], frame: pd.DataFrame) -> pd.DataFrame:
+    """Columnar fill_game_column."""
+    try:
+        game_index = header.index("Game")
+    except ValueError as e:
+        raise ValueError("Required column 'Game' is missing.") from e
+
+    frame.loc[frame[game_index].str.strip() == "", game_index] = "Unspecified"
+    return frame
+
+
+def fill_and_standardize_date_column(header: list[str], frame: pd.DataFrame, year: int, column: int = 0) -> pd.DataFrame:
+    """
+    Columnar fill_and_standardize_date_column.
+
+    Each distinct date string is parsed once, unrecognized dates drop their row,
+    and the fill-down is a forward-fill.
+    """
+    raw = frame[column].str.strip()
+    present = raw != ""
+    parser = DateParser(year)
+    parser.detect_format(raw.iloc[:1000])
+    parsed = _map_unique(raw, lambda value: parser.parse(value) if value else None)
+
+    unrecognized = present & parsed.isna()
+    for row_num, raw_date in zip(_source_rows(frame[unrecognized]), raw[unrecognized]):
+        warn("unrecognized_date", row_num, f"Unrecognized date format: '{raw_date}' at Row {row_num}, skipping row.",
+             column=header[column], value=raw_date)
+
+    keep = ~unrecognized.to_numpy()
+    filled = parsed[keep].ffill()
+    if len(filled) and filled.isna().any():
+        raise ValueError("Missing date and nothing to fill down from.")
+
+    frame = frame[keep].copy()
+    frame[column] = filled.to_numpy(dtype=object)
+    return frame
+
+
+def remove_bad_rows(header: list[str], frame: pd.DataFrame, filepath: str) -> pd.DataFrame:
+    """Columnar remove_bad_rows. Saves the bad rows to filepath and returns the good ones."""
+    try:
+        time_in_index = header.index("Time In")
+        time_out_index = header.index("Time Out")
+    except ValueError as e:
+        raise ValueError("One or more required columns ('Game', 'Time In', 'Time Out') are missing.") from e
+
+    good = ((frame[time_in_index].str.strip() != "") & (frame[time_out_index].str.strip() != "")).to_numpy()
+
+    save_frame_csv(header, frame[~good], filepath)
+    print("Bad rows saved to:", filepath)
+    return frame[good]
+
+
+def remove_bad_rows_occupancy(header: list[str], frame: pd.DataFrame, filepath: str) -> pd.DataFrame:
+    """Columnar remove_bad_rows_occupancy: a row is bad if ANY cell is empty."""
+    good = np.ones(len(frame), dtype=bool)
+    for column in frame.columns:
+        good &= (frame[column].str.strip() != "").to_numpy()
+
+    save_frame_csv(header, frame[~good], filepath)
+    print(f"Bad rows saved to: {filepath}")
+    return frame[good]
+
+
+def anonymize_rows(header: list[str], frame: pd.DataFrame, id_store=None) -> tuple[list[str], pd.DataFrame]:
+    """
+    Columnar anonymize_rows. Unique IDs are numbered by first appearance, like the row engine,
+    or come from id_store (one bulk lookup of the distinct patrons).
+    """
+    name_codes, names = pd.factorize(frame[1].str.strip(), sort=False)
+    id_codes, student_ids = pd.factorize(frame[2].str.strip(), sort=False)
+    # one integer per (name, id) pair, then renumber pairs by first appearance
+    codes, pairs = pd.factorize(id_codes.astype(np.int64) * (len(names) + 1) + name_codes, sort=False)
+
+    if id_store is None:
+        unique_ids = codes + 1
+    else:
+        pairs = np.asarray(pairs)
+        keys = list(zip(names[pairs % (len(names) + 1)], student_ids[pairs // (len(names) + 1)]))
+        unique_ids = np.array(id_store.ids(keys), dtype=np.int64)[codes]
+
+    new_header = [header[0]] + ["Unique ID"] + header[3:]
+    columns = [frame[0].to_numpy(dtype=object), unique_ids.astype(str).astype(object)]
+    columns += [frame[i].to_numpy(dtype=object) for i in frame.columns[3:]]
+    return new_header, pd.DataFrame(dict(enumerate(columns)), index=frame.index)
+
+
+def check_invalid_times(frame: pd.DataFrame) -> None:
+    """Columnar check_invalid_times (columns 3 and 4, just like the row engine)."""
+    print("Rows with invalid time formats. These should be removed from the dataset:")
+    time_in = _minutes(frame[3].str.strip())
+    time_out = _minutes(frame[4].str.strip())
+    positions = np.flatnonzero((time_in < 0) | (time_out < 0))
+    if not len(positions):
+        return
+    # pull the flagged rows out once: every row is flagged on a video games sheet before f24
+    rows = frame.iloc[positions].to_numpy(dtype=object)
+    rows[:, 1] = [int(unique_id) for unique_id in rows[:, 1]]
+    row_nums = frame.index[positions] + 2
+    print("\n".join(f"Row {row_num}: {row}" for row_num, row in zip(row_nums, rows.tolist())))
+
+
+def fix_time_disparity(header: list[str], frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Columnar fix_time_disparity.
+
+    The per-row afternoon flag becomes: "did any earlier valid row of the same day have a
+    Time In of 1-9 or 13-23". That is a running max per run of dates, shifted by one.
+    """
+    try:
+        time_in_index = header.index("Time In")
+        time_out_index = header.index("Time Out")
+    except ValueError as e:
+        raise ValueError("Required columns 'Time In' or 'Time Out' are missing.") from e
+
+    time_in = frame[time_in_index].str.strip()
+    time_out = frame[time_out_index].str.strip()
+    minutes_in = _minutes(time_in)
+    minutes_out = _minutes(time_out)
+    valid = (minutes_in >= 0) & (minutes_out >= 0)
+
+    source_rows = _source_rows(frame)
+    for position in np.flatnonzero(~valid):
+        row_num, time_in_str, time_out_str = source_rows[position], time_in.iloc[position], time_out.iloc[position]
+        bad_column, bad_time = ("Time In", time_in_str) if minutes_in[position] < 0 else ("Time Out", time_out_str)
+        warn("invalid_time", row_num, f"Invalid time at Row {row_num}: Time In = '{time_in_str}', Time Out = '{time_out_str}'",
+             column=bad_column, value=bad_time)
+
+    hour_in, hour_out = minutes_in // 60, minutes_out // 60
+    trigger = valid & (_between(hour_in, 1, 9) | _between(hour_in, 13, 23))
+    afternoon = _flag_before(trigger, _run_ids(frame[0]))
+
+    minutes_in = _to_pm(minutes_in, afternoon | _between(hour_in, 1, 9))
+    minutes_out = _to_pm(minutes_out, afternoon | trigger | _between(hour_out, 1, 9))
+
+    frame = frame.copy()
+    frame[time_in_index] = _format_clock(minutes_in)
+    frame[time_out_index] = _format_clock(minutes_out)
+    return frame[valid]
+
+
+def fix_time_disparity_occupancy(header: list[str], frame: pd.DataFrame) -> pd.DataFrame:
+    """Columnar fix_time_disparity_occupancy. Only hours 1-9 switch the day to afternoon."""
+    try:
+        time_index = header.index("Time")
+    except ValueError as e:
+        raise ValueError("Required column 'Time' is missing.") from e
+
+    time = frame[time_index].str.strip()
+    minutes = _minutes(time)
+    valid = minutes >= 0
+
+    source_rows = _source_rows(frame)
+    for position in np.flatnonzero(~valid):
+        row_num, time_str = source_rows[position], time.iloc[position]
+        warn("invalid_time", row_num, f"Invalid time at Row {row_num}: Time = '{time_str}'", column="Time", value=time_str)
+
+    trigger = valid & _between(minutes // 60, 1, 9)
+    afternoon = _flag_before(trigger, _run_ids(frame[0]))
+
+    frame = frame.copy()
+    frame[time_index] = _format_clock(_to_pm(minutes, afternoon | trigger))
+    return frame[valid]
+
+
+def _time_columns(header: list[str]) -> list[str]:
+    return [col for col in TIME_COLUMNS if col in header]
+
+
+def flag_out_of_range_am_pm_times(header: list[str], frame: pd.DataFrame) -> None:
+    """Columnar flag_out_of_range_am_pm_times (prints only)."""
+    time_columns = _time_columns(header)
+    if not time_columns:
+        print("No valid time columns ('Time In', 'Time Out', 'Time') found.")
+        return
+
+    print("Flagged rows with times between 1:00 AM and 9:00 AM:")
+    flagged = {}
+    for col in time_columns:
+        stripped = frame[header.index(col)].str.strip()
+        early = _between(_minutes(stripped, parse_am_pm), 60, 9 * 60 - 1)
+        flagged[col] = (stripped, early)
+
+    source_rows = _source_rows(frame)
+    any_early = np.logical_or.reduce([early for _, early in flagged.values()])
+    for position in np.flatnonzero(any_early):
+        for col in time_columns:
+            stripped, early = flagged[col]
+            if early[position]:
+                row_num, time = source_rows[position], stripped.iloc[position]
+                warn("out_of_range_am_pm_time", row_num, f"Row {row_num}: {col} = '{time}'", column=col, value=time)
+
+
+def convert_am_pm_times_to_military(header: list[str], frame: pd.DataFrame) -> pd.DataFrame:
+    """Columnar convert_am_pm_times_to_military. Invalid times are left as they were."""
+    time_columns = _time_columns(header)
+    if not time_columns:
+        raise ValueError("No valid time columns ('Time', 'Time In', 'Time Out') found.")
+
+    frame = frame.copy()
+    invalid = np.zeros(len(frame), dtype=bool)
+    converted = {}
+    for col in time_columns:
+        col_index = header.index(col)
+        stripped = frame[col_index].str.strip()
+        converted[col] = (col_index, stripped, _minutes(stripped, parse_am_pm))
+        invalid |= converted[col][2] < 0
+
+    # the row engine prints these row by row, column by column
+    source_rows = _source_rows(frame)
+    for position in np.flatnonzero(invalid):
+        for col in time_columns:
+            _, stripped, military = converted[col]
+            if military[position] < 0:
+                row_num, time = source_rows[position], stripped.iloc[position]
+                warn("invalid_am_pm_time", row_num, f"Invalid time skipped at Row {row_num}: {time}", column=col, value=time)
+
+    for col in time_columns:
+        col_index, _, military = converted[col]
+        ok = military >= 0
+        frame.loc[ok, col_index] = _format_clock(military[ok])
+    return frame
+
+
+def add_duration_column(header: list[str], frame: pd.DataFrame) -> tuple[list[str], pd.DataFrame]:
+    """
+    Columnar add_duration_column. Times that don't parse as %H:%M give a duration of 0.
+    """
+    try:
+        time_in_index = header.index("Time In")
+        time_out_index = header.index("Time Out")
+    except ValueError as e:
+        raise ValueError("Required columns 'Time In' or 'Time Out' are missing.") from e
+
+    start = _minutes(frame[time_in_index], minutes_of)
+    end = _minutes(frame[time_out_index], minutes_of)
+    duration = np.where((start >= 0) & (end >= 0), end - start, 0)
+
+    frame = frame.copy()
+    frame[len(frame.columns)] = duration.astype(str).astype(object)
+    return header + ["Duration (minutes)"], frame
+
+
+def fill_table_numbers(header: list[str], frame: pd.DataFrame) -> pd.DataFrame:
+    """Columnar fill_table_numbers."""
+    table_game_to_table_number = {
+        "Air Hockey": "4",
+        "Foosball": "5",
+        "Shuffleboard": "6",
+    }
+
+    try:
+        table_game_index = header.index("Table Game")
+        table_number_index = header.index("Pool Table #")
+    except ValueError as e:
+        raise ValueError("Required columns 'Table Game' or 'Table #' are missing.") from e
+
+    table_game = frame[table_game_index].str.strip()
+    missing = (frame[table_number_index].str.strip() == "").to_numpy()
+    defaults = table_game.map(table_game_to_table_number)
+    fill = missing & defaults.notna().to_numpy()
+    pool = missing & (table_game == "Pool").to_numpy()
+
+    for row_num in _source_rows(frame)[pool]:
+        warn("missing_pool_table", row_num, f"Missing Pool table number at Row {row_num}", column=header[table_number_index])
+
+    frame = frame.copy()
+    frame.loc[fill, table_number_index] = defaults[fill]
+    frame.loc[pool, table_number_index] = "0"
+    return frame
+
+
+def fill_game_by_pool_table_number(header: list[str], frame: pd.DataFrame) -> pd.DataFrame:
+    """Columnar fill_game_by_pool_table_number."""
+    try:
+        table_game_index = header.index("Table Game")
+        pool_table_index = header.index("Pool Table #")
+    except ValueError as e:
+        raise ValueError("Required columns 'Table Game' or 'Pool Table #' are missing.") from e
+
+    mask = (frame[table_game_index].str.strip() == "") & frame[pool_table_index].str.strip().isin(["1", "2", "3"])
+    frame.loc[mask, table_game_index] = "Pool"
+    return frame
+
+
+def _print_first_rows(header: list[str], frame: pd.DataFrame) -> None:
+    print("Parsing complete! First 5 rows:")
+    print(header)
+    for row in frame.head(4).itertuples(index=False, name=None):
+        print(list(row))
+
+
+def clean_games_columnar(raw_filepath, bad_filepath, clean_filepath, year, type, num_columns, id_store=None):
+    """
+    Same steps as uc_parsing.clean_games, run on columns.
+    num_columns has already been defaulted by clean_games.
+    """
+    with open(raw_filepath, mode='r', newline='') as infile:
+        header = next(csv.reader(infile), [])
+
+    width = num_columns
+    if type == "board_games" and "Notes" in header:
+        width = max(width, header.index("Notes") + 1)
+    header, frame = read_raw_columns(raw_filepath, width)
+
+    print("Parsing CSV at:", raw_filepath)
+
+    #extra step for board games
+    if type == "board_games":
+        frame = resolve_board_game_notes_column(header, frame)
+
+    #extra step for video games
+    if type == "video_games":
+        frame = fill_game_column(header, frame)
+
+    header = header[:num_columns]
+    frame = frame[list(range(num_columns))]
+    frame = fill_and_standardize_date_column(header, frame, year)
+    frame = remove_bad_rows(header, frame, bad_filepath)
+    header, frame = anonymize_rows(header, frame, id_store)
+
+    #fall 2024 handles time differently. it actually has am/pm specified
+    if "f24" in raw_filepath:
+        flag_out_of_range_am_pm_times(header, frame)
+        frame = convert_am_pm_times_to_military(header, frame)
+    else:
+        check_invalid_times(frame)
+        frame = fix_time_disparity(header, frame)
+
+    header, frame = add_duration_column(header, frame)
+
+    #extra steps for table games
+    if type == "table_games":
+        frame = fill_table_numbers(header, frame)
+        frame = fill_game_by_pool_table_number(header, frame)
+
+    _print_first_rows(header, frame)
+
+    save_frame_csv(header, frame, clean_filepath)
+    print("Cleaned CSV saved to:", clean_filepath)
+
+
+def clean_occupancy_columnar(raw_filepath, bad_filepath, clean_filepath, year):
+    """Same steps as uc_parsing.clean_occupancy, run on columns."""
+    header, frame = read_raw_columns(raw_filepath, 4) #occupancy has 4 columns
+    header = header[:4]
+
+    print("Parsing CSV at:", raw_filepath)
+    frame = remove_bad_rows_occupancy(header, frame, bad_filepath)
+
+    #fall 2024 handles times differently. AM/PM is actually specified
+    if "f24" in raw_filepath:
+        flag_out_of_range_am_pm_times(header, frame)
+        frame = convert_am_pm_times_to_military(header, frame)
+    else:
+        frame = fix_time_disparity_occupancy(header, frame)
+
+    frame = fill_and_standardize_date_column(header, frame, year, column=1)
+
+    _print_first_rows(header, frame)
+
+    save_frame_csv(header, frame, clean_filepath)
+    print("Cleaned CSV saved to:", clean_filepath)
@@ -0,0 +1,164 @@
+from collections import Counter
+from datetime import datetime
+
+"""
+Date parsing for the cleaning steps.
+
+standardize_date tries each of DATE_FORMATS in order with strptime. The sheets only
+use a handful of date strings, each repeated on many rows, so DateParser wraps it with:
+- a cache of raw string -> 'YYYY-MM-DD' (or None), year typo fix included
+- a fast path: the dominant format of the file is tried first, and the full
+  cascade only runs for strings that don't match it
+- hit/miss counters, so we can see how well the cache is doing
+"""
+
+DATE_FORMATS = [
+    "%m/%d/%Y",       # ex: 8/24/2024
+    "%m/%d/%y",       # ex: 8/24/24
+    "%m/%d",          # ex: 8/24 — assume the given year
+]
+
+#years that are really a typo for 202X (2013 -> 2023)
+TYPO_YEARS = {2013, 2014, 2015, 2016}
+
+
+def _strptime(raw_date: str, fmt: str, year: int) -> datetime:
+    if fmt == "%m/%d":
+        return datetime.strptime(f"{raw_date}/{year}", "%m/%d/%Y")
+    return datetime.strptime(raw_date, fmt)
+
+
+def standardize_date(raw_date: str, year: int) -> str | None:
+    """
+    Converts one non-empty date cell to 'YYYY-MM-DD', or returns None if no format matches.
+
+    Accepts multiple formats like '8/24', '8/24/24', '8/24/2024'.
+    Used by fill_and_standardize_date_column and the other engines.
+    """
+    parsed = None
+    for fmt in DATE_FORMATS:
+        try:
+            parsed = _strptime(raw_date, fmt, year)
+
+            #🩹 Fix bad year entries like 2013 or 2014 → 2023 or 2024
+            if parsed.year in TYPO_YEARS:
+                corrected_year = (year // 10) * 10 + (parsed.year % 10)
+                parsed = parsed.replace(year=corrected_year)
+
+            break
+        except ValueError:
+            continue
+    if parsed is None:
+        return None
+    return parsed.strftime("%Y-%m-%d")
+
+
+def _parse_one_format(raw_date: str, fmt: str, year: int) -> str | None:
+    """
+    Tries a single format (with the year typo fix). Returns None on any failure,
+    in which case the caller falls back to the full standardize_date cascade.
+    """
+    try:
+        parsed = _strptime(raw_date, fmt, year)
+        if parsed.year in TYPO_YEARS:
+            parsed = parsed.replace(year=(year // 10) * 10 + (parsed.year % 10))
+    except ValueError:
+        return None
+    return parsed.strftime("%Y-%m-%d")
+
+
+def matching_format(raw_date: str, year: int) -> str | None:
+    """The first format in DATE_FORMATS that raw_date parses with, or None."""
+    for fmt in DATE_FORMATS:
+        if _parse_one_format(raw_date, fmt, year) is not None:
+            return fmt
+    return None
+
+
+class DateParser:
+    """
+    Memoized standardize_date for one file.
+
+    year (int): year to assume when a date doesn't have one.
+    sample_size (int): how many distinct date strings to look at before picking the
+        dominant format. detect_format() can also be called up front with a sample.
+
+    The formats can't match the same string (they differ in how many year digits
+    they take), so trying the dominant one first gives the same answer as the cascade.
+    """
+    def __init__(self, year: int, sample_size: int = 50):
+        self.year = year
+        self.sample_size = sample_size
+        self.fast_format = None
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.fast_path_hits = 0
+        self._format_counts = Counter()
+
+    def detect_format(self, raw_dates) -> str | None:
+        """
+        Picks the most common format among a sample of raw date cells (empty cells are skipped).
+        """
+        counts = Counter()
+        for raw_date in raw_dates:
+            raw_date = raw_date.strip()
+            if raw_date:
+                fmt = matching_format(raw_date, self.year)
+                if fmt is not None:
+                    counts[fmt] += 1
+                    if sum(counts.values()) >= self.sample_size:
+                        break
+        if counts:
+            self.fast_format = counts.most_common(1)[0][0]
+        return self.fast_format
+
+    def parse(self, raw_date: str) -> str | None:
+        """Same result as standardize_date(raw_date, year), cached."""
+        try:
+            result = self.cache[raw_date]
+            self.hits += 1
+            return result
+        except KeyError:
+            pass
+
+        self.misses += 1
+        result = None
+        if self.fast_format is not None:
+            result = _parse_one_format(raw_date, self.fast_format, self.year)
+            if result is not None:
+                self.fast_path_hits += 1
+
+        if result is None:
+            result = standardize_date(raw_date, self.year)
+            if self.fast_format is None:
+                self._learn(raw_date)
+
+        self.cache[raw_date] = result
+        return result
+
+    def _learn(self, raw_date: str) -> None:
+        # no sample was given up front: pick the dominant format from the first few dates we see
+        fmt = matching_format(raw_date, self.year)
+        if fmt is not None:
+            self._format_counts[fmt] += 1
+        if sum(self._format_counts.values()) >= self.sample_size:
+            self.fast_format = self._format_counts.most_common(1)[0][0]
+
+    def stats(self) -> dict:
+        """Cache and fast path counters."""
+        lookups = self.hits + self.misses
+        return {
+            "lookups": lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "fast_format": self.fast_format,
+            "fast_path_hits": self.fast_path_hits,
+            "distinct_dates": len(self.cache),
+        }
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"Date cache: {stats['lookups']} lookups, {stats['hit_rate']:.1%} hits, "
+                f"{stats['distinct_dates']} distinct dates, fast format {stats['fast_format']!r}")
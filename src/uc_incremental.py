@@ -0,0 +1,192 @@
+import csv
+import hashlib
+import json
+import locale
+import os
+from itertools import chain
+
+from uc_parsing import SheetRow
+from uc_streaming import game_stages, occupancy_stages, run_stages
+
+"""
+Incremental cleaning for the append-only rental sheets.
+
+The sheets only ever get new rows at the bottom, so after the first full run we only
+need to clean the rows added since. Each run saves a checkpoint with:
+- how many raw rows (and bytes) were processed, and a sha256 of those bytes (the "prefix")
+- the raw header row and the settings the file was cleaned with
+- the size of the clean and bad-row files it wrote
+- the state of every streaming stage: the fill-down date, the is_it_afternoon_yet flag,
+  the anonymize ID map (unless an AnonStore is used), ... (see Stage.state in uc_streaming.py)
+
+The next run checks the prefix hash. If it still matches, only the new rows go through
+the stages (restored from the checkpoint) and get appended to the clean and bad-row
+files. If anything before that point changed (someone fixed an old row, the sheet was
+re-sorted, the settings changed), it falls back to a full rebuild. So does a clean or
+bad-row file that isn't the size the checkpoint says: another engine rewrote it, or a run
+crashed after appending but before saving its checkpoint, and appending would repeat rows.
+
+The output is the same as a full run of the streaming engine.
+
+The checkpoint holds the real names and IDs (the anonymize map), so it goes next to the
+raw file in raw_data/, never in clean_data/.
+
+Use clean_games(..., engine="incremental") or clean_occupancy(..., engine="incremental").
+"""
+
+CHECKPOINT_VERSION = 2
+
+
+def checkpoint_path(raw_filepath: str) -> str:
+    """raw_data/f24_table_games_raw.csv -> raw_data/f24_table_games_checkpoint.json"""
+    if raw_filepath.endswith("_raw.csv"):
+        return raw_filepath[:-len("_raw.csv")] + "_checkpoint.json"
+    return raw_filepath + ".checkpoint.json"
+
+
+def load_checkpoint(file_path: str) -> dict | None:
+    if not os.path.exists(file_path):
+        return None
+    try:
+        with open(file_path, mode='r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(checkpoint: dict, file_path: str) -> None:
+    # write to a temp file first so a crash can't leave half a checkpoint behind
+    temp_path = file_path + ".tmp"
+    with open(temp_path, mode='w') as file:
+        json.dump(checkpoint, file)
+    os.replace(temp_path, file_path)
+
+
+def _prefix_matches(rawfile, digest, num_bytes: int, expected_hash: str) -> bool:
+    """Hashes the first num_bytes of rawfile into digest and checks it against the checkpoint."""
+    remaining = num_bytes
+    while remaining > 0:
+        chunk = rawfile.read(min(remaining, 1 << 20))
+        if not chunk:
+            return False  # the file got shorter
+        digest.update(chunk)
+        remaining -= len(chunk)
+    return digest.hexdigest() == expected_hash
+
+
+def _stale_reason(checkpoint, settings, stage_names, bad_filepath, clean_filepath) -> str | None:
+    """Why the checkpoint can't be used (None if it can, apart from the prefix hash)."""
+    if checkpoint is None:
+        return "no checkpoint"
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        return "checkpoint is from an older version"
+    if checkpoint["settings"] != settings or checkpoint["stages"] != stage_names:
+        return "cleaning settings changed"
+    if not os.path.exists(clean_filepath) or not os.path.exists(bad_filepath):
+        return "output files are missing"
+    if (os.path.getsize(clean_filepath) != checkpoint["clean_bytes"]
+            or os.path.getsize(bad_filepath) != checkpoint["bad_bytes"]):
+        return "output files changed since the last run"
+    return None
+
+
+def _clean_incremental(raw_filepath, bad_filepath, clean_filepath, settings, make_stages, checkpoint_filepath=None) -> None:
+    checkpoint_filepath = checkpoint_filepath or checkpoint_path(raw_filepath)
+    checkpoint = load_checkpoint(checkpoint_filepath)
+    stage_names = [type(stage).__name__ for stage in make_stages(None)]
+    reason = _stale_reason(checkpoint, settings, stage_names, bad_filepath, clean_filepath)
+    encoding = locale.getpreferredencoding(False)  # what open() uses in read_csv / sheets_to_csv
+
+    print("Parsing CSV at:", raw_filepath)
+    with open(raw_filepath, mode='rb') as rawfile:
+        digest = hashlib.sha256()
+        if reason is None and not _prefix_matches(rawfile, digest, checkpoint["prefix_bytes"], checkpoint["prefix_hash"]):
+            reason = "earlier rows were edited"
+        if reason is not None:
+            print(f"Full rebuild ({reason}).")
+            rawfile.seek(0)
+            digest = hashlib.sha256()
+            checkpoint = None
+
+        num_bytes = checkpoint["prefix_bytes"] if checkpoint else 0
+
+        def lines():
+            nonlocal num_bytes
+            for line in rawfile:
+                digest.update(line)
+                num_bytes += len(line)
+                yield line.decode(encoding)
+
+        reader = csv.reader(lines())
+        if checkpoint:
+            header, rows_done = checkpoint["header"], checkpoint["rows_processed"]
+        else:
+            header, rows_done = next(reader, None), 1  # the header is row 1
+            if header is None:
+                raise ValueError(f"{raw_filepath} is empty.")
+
+        mode = 'a' if checkpoint else 'w'
+        with open(bad_filepath, mode=mode, newline='') as badfile, \
+             open(clean_filepath, mode=mode, newline='') as outfile:
+            stages = make_stages(csv.writer(badfile))
+            if checkpoint:
+                for stage, saved in zip(stages, checkpoint["states"]):
+                    stage.restore(saved)
+
+            last_row = rows_done
+
+            def new_rows():
+                nonlocal last_row
+                for row in reader:
+                    last_row += 1
+                    yield SheetRow(row, last_row)
+
+            rows = run_stages(chain([SheetRow(header, 1)], new_rows()), stages)
+
+            writer = csv.writer(outfile)
+            clean_header = next(rows)
+            if not checkpoint:
+                writer.writerow(clean_header)
+            num_written = 0
+            for row in rows:
+                writer.writerow(row)
+                num_written += 1
+
+    save_checkpoint({
+        "version": CHECKPOINT_VERSION,
+        "settings": settings,
+        "stages": stage_names,
+        "header": list(header),
+        "rows_processed": last_row,
+        "prefix_bytes": num_bytes,
+        "prefix_hash": digest.hexdigest(),
+        "clean_bytes": os.path.getsize(clean_filepath),
+        "bad_bytes": os.path.getsize(bad_filepath),
+        "states": [stage.state() for stage in stages],
+    }, checkpoint_filepath)
+
+    print(f"Cleaned {last_row - rows_done} new raw rows, {num_written} rows {'appended to' if checkpoint else 'saved to'}: {clean_filepath}")
+    print("Checkpoint saved to:", checkpoint_filepath)
+
+
+def clean_games_incremental(raw_filepath, bad_filepath, clean_filepath, year, type, num_columns, id_store=None,
+                            checkpoint_filepath=None):
+    """
+    Same steps as uc_parsing.clean_games, but only on the rows added since the last run.
+    num_columns has already been defaulted by clean_games.
+    """
+    am_pm = "f24" in raw_filepath
+    settings = {"sheet": type, "year": year, "num_columns": num_columns, "am_pm": am_pm,
+                "id_store": os.path.abspath(id_store.store_filepath) if id_store is not None else None}
+    _clean_incremental(raw_filepath, bad_filepath, clean_filepath, settings,
+                       lambda bad_writer: game_stages(type, year, num_columns, am_pm, bad_writer, id_store),
+                       checkpoint_filepath)
+
+
+def clean_occupancy_incremental(raw_filepath, bad_filepath, clean_filepath, year, checkpoint_filepath=None):
+    """Same steps as uc_parsing.clean_occupancy, but only on the rows added since the last run."""
+    am_pm = "f24" in raw_filepath
+    settings = {"sheet": "occupancy", "year": year, "am_pm": am_pm}
+    _clean_incremental(raw_filepath, bad_filepath, clean_filepath, settings,
+                       lambda bad_writer: occupancy_stages(year, am_pm, bad_writer),
+                       checkpoint_filepath)
@@ -1,5 +1,15 @@
+import contextlib
 import csv
-from datetime import datetime
+import difflib
+import io
+import json
+import os
+import tempfile
+
+import profiling
+from uc_dates import DateParser
+from uc_times import (TIME_COLUMNS, clock, parse_clock, parse_am_pm, minutes_of,
+                      fix_afternoon_times, fix_afternoon_time, is_early_morning)
 
 #This file contains clean_games, which cleans the data for the
 #video game, table game, and board game spreadsheets.
@@ -43,46 +53,189 @@ Steps for cleaning occupancy
 '''
 
 #helper functions for reading and writing to csv
+class SheetRow(list):
+    """
+    A row that remembers which row of the original sheet it came from (the header is row 1).
+
+    Rows get dropped and rebuilt as they go through the steps, so the position of a row
+    in the list stops matching the sheet. source_row is what warnings should point at.
+    """
+    __slots__ = ("source_row",)
+
+    def __init__(self, cells, source_row: int):
+        super().__init__(cells)
+        self.source_row = source_row
+
+
+def source_row(row, fallback: int) -> int:
+    """The sheet row a row came from, or fallback for plain lists."""
+    return getattr(row, "source_row", fallback)
+
+
+def carry_source_row(new_row: list, old_row: list) -> list:
+    """Gives new_row the same source_row as old_row. For steps that build new row lists."""
+    if isinstance(old_row, SheetRow):
+        return SheetRow(new_row, old_row.source_row)
+    return new_row
+
+
 def read_csv(file_path):
     with open(file_path, mode='r', newline='') as infile:
-        return list(csv.reader(infile))
+        return [SheetRow(row, row_num) for row_num, row in enumerate(csv.reader(infile), start=1)]
 
 def save_csv(data, file_path):
     with open(file_path, mode='w', newline='') as outfile:
         writer = csv.writer(outfile)
         writer.writerows(data)
 
-def clean_occupancy(raw_filepath,bad_filepath,clean_filepath,year):
+
+#warnings from the current clean_games / clean_occupancy run
+#each one is a dict with kind, source_row, column, value and message
+diagnostics = []
+DIAGNOSTIC_FIELDS = ["kind", "source_row", "column", "value", "message"]
+
+def warn(kind: str, row_num: int, message: str, column: str = "", value: str = "") -> None:
+    """
+    Prints a warning about one sheet row and records it in diagnostics.
+
+    kind is one of "invalid_time", "unrecognized_date", "missing_pool_table",
+    "out_of_range_am_pm_time" or "invalid_am_pm_time".
+    """
+    print(message)
+    diagnostics.append({"kind": kind, "source_row": int(row_num), "column": column, "value": value, "message": message})
+
+def save_diagnostics(file_path: str) -> None:
+    """Saves the recorded warnings as JSON (if file_path ends in .json) or CSV."""
+    if file_path.endswith(".json"):
+        with open(file_path, mode='w') as outfile:
+            json.dump(diagnostics, outfile, indent=2)
+    else:
+        with open(file_path, mode='w', newline='') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=DIAGNOSTIC_FIELDS)
+            writer.writeheader()
+            writer.writerows(diagnostics)
+    print("Diagnostics saved to:", file_path)
+
+
+def diff_csv_files(expected_filepath: str, actual_filepath: str, max_lines: int = 20) -> list[str]:
+    """The unified diff between two CSV files (empty if they are the same), cut to max_lines."""
+    with open(expected_filepath, mode='r', newline='') as expected, open(actual_filepath, mode='r', newline='') as actual:
+        diff = difflib.unified_diff(expected.readlines(), actual.readlines(),
+                                    fromfile=expected_filepath, tofile=actual_filepath, n=0)
+        return [line.rstrip("\r\n") for _, line in zip(range(max_lines), diff)]
+
+
+def verify_against_rows(bad_filepath: str, clean_filepath: str, run_rows) -> None:
+    """
+    The check behind verify=True: runs the step-by-step row engine into a temp folder
+    (run_rows(bad_filepath, clean_filepath)) and diffs its CSVs against the ones just written.
+    Raises RuntimeError with the first differences if they don't match.
+    """
+    saved_diagnostics = list(diagnostics)
+    with tempfile.TemporaryDirectory() as temp_folder:
+        expected_bad = os.path.join(temp_folder, "bad_rows.csv")
+        expected_clean = os.path.join(temp_folder, "cleaned.csv")
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_rows(expected_bad, expected_clean)
+        differences = diff_csv_files(expected_clean, clean_filepath) + diff_csv_files(expected_bad, bad_filepath)
+    diagnostics[:] = saved_diagnostics
+
+    if differences:
+        print("\n".join(differences))
+        raise RuntimeError(f"{clean_filepath} doesn't match the step-by-step row engine (diff above).")
+    print("Verified: same output as the step-by-step row engine.")
+
+
+def clean_occupancy(raw_filepath,bad_filepath,clean_filepath,year,engine="rows",diagnostics_filepath=None,verify=False,
+                    typed_output=False):
     """
     A simpler version of the clean_games function below
 
     Occupancy is simpler to clean and structured differently from the other tables,
     so we use a different function to clean it
-    """
 
-    data = read_csv(raw_filepath)
+    engine (str): "rows" (default) runs the list-of-rows steps in this file,
+        "columnar" runs the same steps on pandas columns (see uc_columnar.py),
+        "streaming" runs them one row at a time without loading the file (see uc_streaming.py).
+        "incremental" streams only the rows added since the last run and appends them (see uc_incremental.py).
+        "fused" runs every step on a row in a single loop (see run_fused in uc_streaming.py).
+
+    diagnostics_filepath (str): optional .json or .csv file to save every warning to,
+        with the sheet row it came from.
+
+    verify (bool): also run the step-by-step row engine and diff the two outputs
+        (raises RuntimeError if they differ). Doubles the run time.
+
+    typed_output (bool): also write a typed Parquet copy for the charts (see uc_typed.py).
+    """
+    with profiling.stage(f"clean_occupancy {os.path.basename(raw_filepath)}"):
+        diagnostics.clear()
+
+        if engine == "columnar":
+            from uc_columnar import clean_occupancy_columnar
+            clean_occupancy_columnar(raw_filepath, bad_filepath, clean_filepath, year)
+        elif engine == "streaming":
+            from uc_streaming import clean_occupancy_streaming
+            clean_occupancy_streaming(raw_filepath, bad_filepath, clean_filepath, year)
+        elif engine == "fused":
+            from uc_streaming import clean_occupancy_streaming
+            clean_occupancy_streaming(raw_filepath, bad_filepath, clean_filepath, year, fused=True)
+        elif engine == "incremental":
+            from uc_incremental import clean_occupancy_incremental
+            clean_occupancy_incremental(raw_filepath, bad_filepath, clean_filepath, year)
+        else:
+            clean_occupancy_rows(raw_filepath, bad_filepath, clean_filepath, year)
+
+        if verify:
+            with profiling.stage("verify"):
+                verify_against_rows(bad_filepath, clean_filepath,
+                                    lambda bad, clean: clean_occupancy_rows(raw_filepath, bad, clean, year))
 
-    print("Parsing CSV at:", raw_filepath)
-    data = remove_empty_columns(data, 4) #occupancy has 4 columns
-    data = remove_bad_rows_occupancy(data, bad_filepath)
+        if typed_output:
+            from uc_typed import write_typed
+            with profiling.stage("typed_output"):
+                write_typed(clean_filepath)
+
+        if diagnostics_filepath:
+            save_diagnostics(diagnostics_filepath)
+
+def occupancy_steps(raw_filepath, bad_filepath, year) -> list[tuple[str, object]]:
+    """
+    The row engine's steps for an occupancy sheet, in order, as (name, step) pairs.
+    Each step takes the rows and returns the new rows. (benchmark.py times them one by one)
+    """
+    steps = [("remove_empty_columns", lambda data: remove_empty_columns(data, 4)), #occupancy has 4 columns
+             ("remove_bad_rows_occupancy", lambda data: remove_bad_rows_occupancy(data, bad_filepath))]
 
     #fall 2024 handles times differently. AM/PM is actually specified
     if "f24" in raw_filepath:
-        flag_out_of_range_am_pm_times(data)
-        data = convert_am_pm_times_to_military(data)
+        steps += [("flag_out_of_range_am_pm_times", _in_place(flag_out_of_range_am_pm_times)),
+                  ("convert_am_pm_times_to_military", convert_am_pm_times_to_military)]
     else:
-        data = fix_time_disparity_occupancy(data)
-    
-    data = fill_and_standardize_date_column(data, year, column=1) #occupancy is always 2024
+        steps.append(("fix_time_disparity_occupancy", fix_time_disparity_occupancy))
+
+    #occupancy is always 2024
+    steps.append(("fill_and_standardize_date_column", lambda data: fill_and_standardize_date_column(data, year, column=1)))
+    return steps
+
+def clean_occupancy_rows(raw_filepath,bad_filepath,clean_filepath,year):
+    """The row engine for clean_occupancy."""
+    data = read_rows(raw_filepath)
+
+    print("Parsing CSV at:", raw_filepath)
+    data = run_steps(data, occupancy_steps(raw_filepath, bad_filepath, year))
 
     print("Parsing complete! First 5 rows:")
     for i in range(5):
         print(data[i])
 
-    save_csv(data, clean_filepath)
+    save_rows(data, clean_filepath)
     print("Cleaned CSV saved to:", clean_filepath)
     pass
 
+#how many real columns each sheet has (clean_games' num_columns when it isn't given)
+DEFAULT_NUM_COLUMNS = {"video_games": 8, "board_games": 6, "table_games": 7}
+
 #main function to call to clean a file
 def clean_games(raw_filepath,
                 bad_filepath,
@@ -90,6 +243,11 @@ def clean_games(raw_filepath,
                 year,
                 type,
                 num_columns = -1,
+                engine = "rows",
+                diagnostics_filepath = None,
+                id_store_filepath = None,
+                verify = False,
+                typed_output = False,
                ):
     """
     Runs all of the parsing steps
@@ -105,55 +263,154 @@ def clean_games(raw_filepath,
         Columns after this are removed.
     
     fix_notes_column is an extra step for the board game table.
+
+    engine (str): "rows" (default) runs the list-of-rows steps in this file.
+        "columnar" runs the same steps as column operations with pandas/NumPy
+        (see uc_columnar.py). It writes the exact same CSVs, just faster on big sheets.
+        "streaming" passes rows from the raw file to the output files one at a time,
+        so memory stays flat however long the sheet is (see uc_streaming.py).
+        "incremental" is the streaming engine, but it only cleans the rows added since the
+        last run and appends them. It rebuilds from scratch if earlier rows were edited
+        (see uc_incremental.py).
+        "fused" compiles the steps for the sheet type into one loop: each row goes through
+        every step and is written out before the next row is read (see run_fused in uc_streaming.py).
+
+    diagnostics_filepath (str): optional .json or .csv file to save every warning
+        (invalid times, unrecognized dates, missing Pool table numbers...) to,
+        with the sheet row it came from.
+
+    id_store_filepath (str): optional anonymization store (see uc_anon.py), most likely
+        "../raw_data/anon_ids.sqlite". With it, each patron's "Unique ID" is the same in
+        every run and every semester, instead of 1, 2, 3... in order of first rental.
+
+    verify (bool): also run the step-by-step row engine on the same file and diff the
+        two outputs (raises RuntimeError if they differ). Doubles the run time.
+
+    typed_output (bool): also write a typed Parquet copy (real dates, integer minutes and
+        durations, dictionary-encoded game names) to clean_data/typed/, which the charts
+        read instead of the CSV. Needs pyarrow (see uc_typed.py).
     """
     #defaults for num columns if not specified
     if num_columns == -1:
-        match type:
-            case "video_games":
-                num_columns = 8
-            case "board_games":
-                num_columns = 6
-            case "table_games":
-                num_columns = 7
+        num_columns = DEFAULT_NUM_COLUMNS.get(type, num_columns)
 
-    data = read_csv(raw_filepath)
+    with profiling.stage(f"clean_games {os.path.basename(raw_filepath)}"):
+        diagnostics.clear()
 
-    print("Parsing CSV at:", raw_filepath)
+        id_store = None
+        if id_store_filepath:
+            from uc_anon import AnonStore
+            id_store = AnonStore(id_store_filepath)
+
+        try:
+            if engine == "columnar":
+                from uc_columnar import clean_games_columnar
+                clean_games_columnar(raw_filepath, bad_filepath, clean_filepath, year, type, num_columns, id_store)
+            elif engine == "streaming":
+                from uc_streaming import clean_games_streaming
+                clean_games_streaming(raw_filepath, bad_filepath, clean_filepath, year, type, num_columns, id_store)
+            elif engine == "fused":
+                from uc_streaming import clean_games_streaming
+                clean_games_streaming(raw_filepath, bad_filepath, clean_filepath, year, type, num_columns, id_store, fused=True)
+            elif engine == "incremental":
+                from uc_incremental import clean_games_incremental
+                clean_games_incremental(raw_filepath, bad_filepath, clean_filepath, year, type, num_columns, id_store)
+            else:
+                clean_games_rows(raw_filepath, bad_filepath, clean_filepath, year, type, num_columns, id_store)
+
+            if verify:
+                with profiling.stage("verify"):
+                    verify_against_rows(bad_filepath, clean_filepath,
+                                        lambda bad, clean: clean_games_rows(raw_filepath, bad, clean, year, type, num_columns, id_store))
+        finally:
+            if id_store is not None:
+                id_store.close()
+                print(f"Anonymization store: {id_store.new_ids} new patrons added to {id_store_filepath}")
+
+        if typed_output:
+            from uc_typed import write_typed
+            with profiling.stage("typed_output"):
+                write_typed(clean_filepath)
+
+        if diagnostics_filepath:
+            save_diagnostics(diagnostics_filepath)
+
+def read_rows(raw_filepath):
+    """read_csv for the row engine, as a profiling stage."""
+    with profiling.stage("read_csv") as record:
+        data = read_csv(raw_filepath)
+        record["rows_out"] = len(data)
+    return data
+
+def save_rows(data, clean_filepath):
+    """save_csv for the row engine, as a profiling stage."""
+    with profiling.stage("save_csv", rows_in=len(data)):
+        save_csv(data, clean_filepath)
+
+def run_steps(data, steps):
+    """Runs (name, step) pairs from games_steps / occupancy_steps on the rows, each as a profiling stage."""
+    for name, step in steps:
+        with profiling.stage(name, rows_in=len(data)) as record:
+            data = step(data)
+            record["rows_out"] = len(data)
+    return data
+
+def _in_place(step):
+    """Turns a step that only checks/changes the rows in place into one that returns them."""
+    def run(data):
+        step(data)
+        return data
+    return run
+
+def games_steps(raw_filepath, bad_filepath, year, type, num_columns, id_store=None) -> list[tuple[str, object]]:
+    """
+    The row engine's steps for a games sheet, in order, as (name, step) pairs.
+    Each step takes the rows and returns the new rows. (benchmark.py times them one by one)
+    """
+    steps = []
 
     #extra step for board games
     if type == "board_games":
-        data = resolve_board_game_notes_column(data)
+        steps.append(("resolve_board_game_notes_column", resolve_board_game_notes_column))
     
     #extra step for video games
     if type == "video_games":
-        data = fill_game_column(data)
+        steps.append(("fill_game_column", fill_game_column))
 
-    data = remove_empty_columns(data, num_columns)
-    # data = fill_date_column(data)
-    data = fill_and_standardize_date_column(data, year)
-    data = remove_bad_rows(data, bad_filepath)
-    data = anonymize_rows(data)
+    steps += [("remove_empty_columns", lambda data: remove_empty_columns(data, num_columns)),
+              # ("fill_date_column", fill_date_column),
+              ("fill_and_standardize_date_column", lambda data: fill_and_standardize_date_column(data, year)),
+              ("remove_bad_rows", lambda data: remove_bad_rows(data, bad_filepath)),
+              ("anonymize_rows", lambda data: anonymize_rows(data, id_store))]
 
     #fall 2024 handles time differently. it actually has am/pm specified
     if "f24" in raw_filepath:
-        flag_out_of_range_am_pm_times(data)
-        data = convert_am_pm_times_to_military(data)
+        steps += [("flag_out_of_range_am_pm_times", _in_place(flag_out_of_range_am_pm_times)),
+                  ("convert_am_pm_times_to_military", convert_am_pm_times_to_military)]
     else:
-        check_invalid_times(data)
-        data = fix_time_disparity(data)
+        steps += [("check_invalid_times", _in_place(check_invalid_times)),
+                  ("fix_time_disparity", fix_time_disparity)]
     
-    data = add_duration_column(data)
+    steps.append(("add_duration_column", add_duration_column))
 
     #extra steps for table games
     if type == "table_games":
-        data = fill_table_numbers(data)
-        data = fill_game_by_pool_table_number(data)
+        steps += [("fill_table_numbers", fill_table_numbers),
+                  ("fill_game_by_pool_table_number", fill_game_by_pool_table_number)]
+    return steps
+
+def clean_games_rows(raw_filepath, bad_filepath, clean_filepath, year, type, num_columns, id_store=None):
+    """The row engine for clean_games. num_columns has already been defaulted."""
+    data = read_rows(raw_filepath)
+
+    print("Parsing CSV at:", raw_filepath)
+    data = run_steps(data, games_steps(raw_filepath, bad_filepath, year, type, num_columns, id_store))
 
     print("Parsing complete! First 5 rows:")
     for i in range(5):
         print(data[i])
 
-    save_csv(data, clean_filepath)
+    save_rows(data, clean_filepath)
     print("Cleaned CSV saved to:", clean_filepath)
 
 
@@ -197,7 +454,7 @@ def remove_empty_columns(data: list[list[str]], end_index:int) -> list[list[str]
     This is "step 1" in the original parsing
     """
     header = data[0][:end_index]  # Keep only the first end_index+1 columns
-    rows = [row[:end_index] for row in data[1:]]  # Same for data rows
+    rows = [carry_source_row(row[:end_index], row) for row in data[1:]]  # Same for data rows
     return [header] + rows
 
 
@@ -238,42 +495,27 @@ def fill_and_standardize_date_column(data: list[list[str]], year: int, column: i
     header = data[0]
     rows = data[1:]
 
-    date_formats = [
-        "%m/%d/%Y",       # ex: 8/24/2024
-        "%m/%d/%y",       # ex: 8/24/24
-        "%m/%d",          # ex: 8/24 — assume the given year
-    ]
+    #most rows repeat a handful of date strings, so parse each one once (see uc_dates.py)
+    parser = DateParser(year)
+    parser.detect_format(row[column] for row in rows[:1000])
 
     current_date_str = None
     filled_rows = []
 
-    for row in rows:
+    for row_num, row in enumerate(rows, start=2):
         raw_date = row[column].strip()
 
         if raw_date:
-            parsed = None
-            for fmt in date_formats:
-                try:
-                    if fmt == "%m/%d":
-                        parsed = datetime.strptime(f"{raw_date}/{year}", "%m/%d/%Y")
-                    else:
-                        parsed = datetime.strptime(raw_date, fmt)
-                    
-                    #🩹 Fix bad year entries like 2013 or 2014 → 2023 or 2024
-                    if parsed.year in {2013, 2014, 2015, 2016}:
-                        corrected_year = (year // 10) * 10 + (parsed.year % 10)
-                        parsed = parsed.replace(year=corrected_year)
-                        
-                    break
-                except ValueError:
-                    continue
+            parsed = parser.parse(raw_date)
             if parsed is None:
                 # raise ValueError(f"Unrecognized date format: '{raw_date}'")
-                print(f"Unrecognized date format: '{raw_date}', skipping row.")
+                row_num = source_row(row, row_num)
+                warn("unrecognized_date", row_num, f"Unrecognized date format: '{raw_date}' at Row {row_num}, skipping row.",
+                     column=header[column], value=raw_date)
                 #dont want to raise an error, it will be removed in the next step anyways
                 #remove_bad_rows runs after this function does
                 continue
-            current_date_str = parsed.strftime("%Y-%m-%d")
+            current_date_str = parsed
         elif current_date_str:
             # fill down
             pass
@@ -283,6 +525,7 @@ def fill_and_standardize_date_column(data: list[list[str]], year: int, column: i
         row[column] = current_date_str
         filled_rows.append(row)
 
+    print(parser.summary())
     return [header] + filled_rows
 
 def remove_bad_rows(data: list[list[str]], filepath:str) -> list[list[str]]:
@@ -323,10 +566,13 @@ def remove_bad_rows(data: list[list[str]], filepath:str) -> list[list[str]]:
     return good_rows
 
 
-def anonymize_rows(data):
+def anonymize_rows(data, id_store=None):
     """
     Replaces 'Name' and 'ID' columns with a unique identifier.
 
+    id_store (AnonStore): optional, gives each patron their stable ID from the store
+        instead of numbering them from 1 in this file (see uc_anon.py).
+
     This is "step 4" in the original parsing
     """
     header = data[0]
@@ -336,6 +582,11 @@ def anonymize_rows(data):
     unique_id_map = {}
     next_unique_id = 1
 
+    if id_store is not None:
+        # one bulk lookup for every patron in the file
+        keys = list(dict.fromkeys((row[1].strip(), row[2].strip()) for row in rows))
+        unique_id_map = dict(zip(keys, id_store.ids(keys)))
+
     new_header = [header[0]] + ["Unique ID"] + header[3:]  # Replace Name and ID
     anonymized_rows = []
 
@@ -349,7 +600,7 @@ def anonymize_rows(data):
             next_unique_id += 1
 
         # Replace Name and ID with Unique ID
-        anonymized_row = [row[0]] + [unique_id_map[key]] + row[3:]
+        anonymized_row = carry_source_row([row[0]] + [unique_id_map[key]] + row[3:], row)
         anonymized_rows.append(anonymized_row)
 
     return [new_header] + anonymized_rows
@@ -358,14 +609,7 @@ def anonymize_rows(data):
 #helper function for the next two functions
 def is_valid_time(time_str: str) -> bool:
         """Checks if the given time string is in the valid HH:MM format."""
-        try:
-            parts = time_str.split(":")
-            if len(parts) != 2:
-                return False
-            hour, minute = map(int, parts)
-            return 0 <= hour < 24 and 0 <= minute < 60
-        except ValueError:
-            return False
+        return parse_clock(time_str) is not None
 
 
 def check_invalid_times(data: list[list[str]]) -> None:
@@ -383,7 +627,7 @@ def check_invalid_times(data: list[list[str]]) -> None:
         time_out = row[4].strip()  # Assuming "Time Out" is the fifth column
 
         if not is_valid_time(time_in) or not is_valid_time(time_out):
-            print(f"Row {row_num}: {row}")
+            print(f"Row {source_row(row, row_num)}: {row}")
 
 
 
@@ -412,7 +656,7 @@ def fix_time_disparity(data: list[list[str]]) -> list[list[str]]:
     previous_date = None  # Track date to reset the afternoon flag when the date changes
 
     adjusted_rows = []
-    for row in rows:
+    for row_num, row in enumerate(rows, start=2):
         date = row[0]  # Assuming the date is in the first column
         time_in = row[time_in_index].strip()
         time_out = row[time_out_index].strip()
@@ -422,26 +666,20 @@ def fix_time_disparity(data: list[list[str]]) -> list[list[str]]:
             is_it_afternoon_yet = False
             previous_date = date
 
-        # Validate "Time In" and "Time Out"
-        if not is_valid_time(time_in) or not is_valid_time(time_out):
-            print(f"Invalid time at Row {rows.index(row) + 2}: Time In = '{time_in}', Time Out = '{time_out}'")
+        # Validate "Time In" and "Time Out" (parsed once, to minutes since midnight)
+        minutes_in = parse_clock(time_in)
+        minutes_out = parse_clock(time_out)
+        if minutes_in is None or minutes_out is None:
+            row_num = source_row(row, row_num)
+            bad_column, bad_time = ("Time In", time_in) if minutes_in is None else ("Time Out", time_out)
+            warn("invalid_time", row_num, f"Invalid time at Row {row_num}: Time In = '{time_in}', Time Out = '{time_out}'",
+                 column=bad_column, value=bad_time)
             continue  # Skip this row entirely if either time is invalid, don't add to adjusted_rows
 
-        # Fix 'Time In'
-        hour_in, minute_in = map(int, time_in.split(':'))
-        if (1 <= hour_in <= 9) or is_it_afternoon_yet:  # Time in the afternoon
-            is_it_afternoon_yet = True  # Update afternoon status
-            hour_in = (hour_in + 12) % 24  # Convert to military time
-        row[time_in_index] = f"{hour_in:02}:{minute_in:02}"
-
-        # Fix 'Time Out'
-        hour_out, minute_out = map(int, time_out.split(':'))
-        if (13 <= hour_in <= 23) or is_it_afternoon_yet:  # Real military time now
-            is_it_afternoon_yet = True  # Afternoon status already set
-            hour_out = (hour_out + 12) % 24  # Convert to military time if necessary
-        elif 1 <= hour_out <= 9:  # Special case for crossing the afternoon line
-            hour_out = (hour_out + 12) % 24
-        row[time_out_index] = f"{hour_out:02}:{minute_out:02}"
+        # Fix 'Time In' and 'Time Out' (see uc_times.fix_afternoon_times)
+        minutes_in, minutes_out, is_it_afternoon_yet = fix_afternoon_times(minutes_in, minutes_out, is_it_afternoon_yet)
+        row[time_in_index] = clock(minutes_in)  # written out as HH:MM by save_csv
+        row[time_out_index] = clock(minutes_out)
 
         # Append the adjusted row
         adjusted_rows.append(row)
@@ -455,15 +693,6 @@ def add_duration_column(data: list[list[str]]) -> list[list[str]]:
 
     This is "step 6" in the original parsing
     """
-    from datetime import datetime
-
-    def calculate_duration_in_minutes(start_time: str, end_time: str) -> int:
-        fmt = "%H:%M"
-        start = datetime.strptime(start_time, fmt)
-        end = datetime.strptime(end_time, fmt)
-        duration = (end - start).total_seconds() / 60
-        return int(duration)
-
     header = data[0]
     rows = data[1:]
 
@@ -479,15 +708,13 @@ def add_duration_column(data: list[list[str]]) -> list[list[str]]:
     updated_rows = []
 
     for row in rows:
-        if row[time_in_index].strip() and row[time_out_index].strip():  # Ensure valid times exist
-            try:
-                duration = calculate_duration_in_minutes(row[time_in_index], row[time_out_index])
-                row.append(duration)
-            except ValueError:
-                # Handle invalid time format gracefully
-                row.append(0)
+        # times are already minutes since midnight, unless an earlier step couldn't read them
+        start = minutes_of(row[time_in_index])
+        end = minutes_of(row[time_out_index])
+        if start is not None and end is not None:
+            row.append(end - start)
         else:
-            row.append(0)  # Default to 0 if times are missing
+            row.append(0)  # Default to 0 if times are missing or invalid
         updated_rows.append(row)
 
     return [updated_header] + updated_rows
@@ -556,7 +783,8 @@ def fill_table_numbers(data: list[list[str]]) -> list[list[str]]:
             if table_game in table_game_to_table_number:
                 row[table_number_index] = table_game_to_table_number[table_game]
             elif table_game == "Pool":
-                print(f"Missing Pool table number at Row {row_num}")
+                row_num = source_row(row, row_num)
+                warn("missing_pool_table", row_num, f"Missing Pool table number at Row {row_num}", column=header[table_number_index])
                 row[table_number_index] = "0"  # Default to 0 for Pool
         updated_rows.append(row)
 
@@ -616,7 +844,7 @@ def fix_time_disparity_occupancy(data: list[list[str]]) -> list[list[str]]:
     previous_date = None  # Track date to reset the afternoon flag when the date changes
 
     adjusted_rows = []
-    for row in rows:
+    for row_num, row in enumerate(rows, start=2):
         date = row[0]  # Assuming the date is in the first column
         time = row[time_index].strip()
 
@@ -626,16 +854,15 @@ def fix_time_disparity_occupancy(data: list[list[str]]) -> list[list[str]]:
             previous_date = date
 
         # Validate "Time"
-        if not is_valid_time(time):
-            print(f"Invalid time at Row {rows.index(row) + 2}: Time = '{time}'")
+        minutes = parse_clock(time)
+        if minutes is None:
+            row_num = source_row(row, row_num)
+            warn("invalid_time", row_num, f"Invalid time at Row {row_num}: Time = '{time}'", column="Time", value=time)
             continue  # Skip this row entirely if the time is invalid
 
         # Fix "Time"
-        hour, minute = map(int, time.split(':'))
-        if (1 <= hour <= 9) or is_it_afternoon_yet:  # Time in the afternoon
-            is_it_afternoon_yet = True  # Update afternoon status
-            hour = (hour + 12) % 24  # Convert to military time
-        row[time_index] = f"{hour:02}:{minute:02}"
+        minutes, is_it_afternoon_yet = fix_afternoon_time(minutes, is_it_afternoon_yet)
+        row[time_index] = clock(minutes)
 
         # Append the adjusted row
         adjusted_rows.append(row)
@@ -675,9 +902,7 @@ def is_valid_am_pm_time(time_str: str) -> bool:
     Checks if the given time string is in a valid 'HH:MM AM/PM' format.
     """
     try:
-        import re
-        pattern = r"^(0?[1-9]|1[0-2]):[0-5][0-9]\s?(AM|PM)$"  # Regex for HH:MM AM/PM
-        return bool(re.match(pattern, time_str.strip().upper()))
+        return parse_am_pm(time_str) is not None
     except Exception:
         return False
 
@@ -686,13 +911,11 @@ def flag_out_of_range_am_pm_times(data: list[list[str]]) -> None:
     """
     Prints any time between 1:00 AM and 9:00 AM, flagging them as possibly incorrect.
     """
-    from datetime import datetime
-
     header = data[0]
     rows = data[1:]
 
     # Find columns: "Time In", "Time Out", or "Time"
-    time_columns = [col for col in ["Time In", "Time Out", "Time"] if col in header]
+    time_columns = [col for col in TIME_COLUMNS if col in header]
     if not time_columns:
         print("No valid time columns ('Time In', 'Time Out', 'Time') found.")
         return
@@ -701,11 +924,11 @@ def flag_out_of_range_am_pm_times(data: list[list[str]]) -> None:
     for row_num, row in enumerate(rows, start=2):
         for col in time_columns:
             time = row[header.index(col)].strip()
-            if is_valid_am_pm_time(time):
-                # Parse time into a datetime object
-                dt = datetime.strptime(time, "%I:%M %p")
-                if 1 <= dt.hour < 9:  # 1 AM to 9 AM
-                    print(f"Row {row_num}: {col} = '{time}'")
+            minutes = parse_am_pm(time)
+            if minutes is not None:
+                if is_early_morning(minutes):  # 1 AM to 9 AM
+                    flagged_row = source_row(row, row_num)
+                    warn("out_of_range_am_pm_time", flagged_row, f"Row {flagged_row}: {col} = '{time}'", column=col, value=time)
 
 
 def convert_am_pm_times_to_military(data: list[list[str]]) -> list[list[str]]:
@@ -713,29 +936,28 @@ def convert_am_pm_times_to_military(data: list[list[str]]) -> list[list[str]]:
     Converts 'Time', 'Time In', and 'Time Out' columns to military (24-hour) format.
     For Fall 2024 onwards, the AM/PM disparity is no longer present.
     """
-    from datetime import datetime
-
     header = data[0]
     rows = data[1:]
 
     # Find columns: "Time In", "Time Out", or "Time"
-    time_columns = [col for col in ["Time In", "Time Out", "Time"] if col in header]
+    time_columns = [col for col in TIME_COLUMNS if col in header]
     if not time_columns:
         raise ValueError("No valid time columns ('Time In', 'Time Out', 'Time') found.")
 
     adjusted_rows = []
-    for row in rows:
-        new_row = row.copy()
+    for row_num, row in enumerate(rows, start=2):
+        new_row = carry_source_row(row.copy(), row)
         for col in time_columns:
             col_index = header.index(col)
             time = new_row[col_index].strip()
 
             # Convert only if valid
-            if is_valid_am_pm_time(time):
-                dt = datetime.strptime(time, "%I:%M %p")  # Parse as AM/PM
-                new_row[col_index] = dt.strftime("%H:%M")  # Format to military time
+            minutes = parse_am_pm(time)
+            if minutes is not None:
+                new_row[col_index] = clock(minutes)  # written out as military time by save_csv
             else:
-                print(f"Invalid time skipped at Row {rows.index(row) + 2}: {time}")
+                row_num = source_row(row, row_num)
+                warn("invalid_am_pm_time", row_num, f"Invalid time skipped at Row {row_num}: {time}", column=col, value=time)
         adjusted_rows.append(new_row)
 
     return [header] + adjusted_rows
@@ -0,0 +1,571 @@
+import csv
+
+from uc_dates import DateParser
+from uc_parsing import SheetRow, carry_source_row, source_row, warn, is_valid_time
+from uc_times import (TIME_COLUMNS, clock, parse_clock, parse_am_pm, minutes_of,
+                      fix_afternoon_times, fix_afternoon_time, is_early_morning)
+
+"""
+Streaming version of the cleaning steps in uc_parsing.py.
+
+Every step is a Stage: a generator that takes rows in and yields cleaned rows out,
+one at a time. The state a step needs to carry from row to row (the current fill-down
+date, the is_it_afternoon_yet flag, the anonymize ID map, ...) lives on the stage object.
+
+Rows go straight from the raw CSV reader, through the stages, into the clean and bad-row
+writers, so the whole sheet is never in memory. Memory stays flat no matter how long
+the sheet is (the only thing that grows is the anonymize ID map, one entry per patron).
+
+Rows come out of the reader as SheetRows, so every warning names the row of the
+original sheet no matter how many rows were dropped before it.
+
+Use clean_games(..., engine="streaming") or clean_occupancy(..., engine="streaming").
+engine="fused" runs the same stages through run_fused, one loop over all the steps.
+The output CSVs are the same as the row engine's.
+"""
+
+
+class Stage:
+    """
+    One cleaning step, one row at a time.
+
+    start(header) gets the header row and returns the header to pass on.
+    process(row) returns the cleaned row, or None to drop the row.
+    finish() runs once the last row has gone through.
+    Calling the stage on an iterable of rows (header first) yields the cleaned rows.
+
+    state() / restore(state) save and reload whatever the stage carries from row to row,
+    as plain JSON values, so a later run can pick up where this one stopped (see uc_incremental.py).
+    """
+    def start(self, header: list[str]) -> list[str]:
+        self.header = header
+        self.row_num = 1  # header is row 1, like the row engine's messages
+        return header
+
+    def process(self, row: list) -> list | None:
+        return row
+
+    def finish(self) -> None:
+        pass
+
+    def state(self) -> dict:
+        return {}
+
+    def restore(self, state: dict) -> None:
+        pass
+
+    def source_row(self, row: list) -> int:
+        """The sheet row for warnings (falls back to the position in this stage's input)."""
+        return source_row(row, self.row_num)
+
+    def __call__(self, rows):
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield self.start(header)
+        for row in rows:
+            self.row_num += 1
+            row = self.process(row)
+            if row is not None:
+                yield row
+        self.finish()
+
+    def _index(self, *columns: str, message: str) -> list[int]:
+        try:
+            return [self.header.index(col) for col in columns]
+        except ValueError as e:
+            raise ValueError(message) from e
+
+
+def run_stages(rows, stages: list[Stage]):
+    """Chains the stages into one generator."""
+    for stage in stages:
+        rows = stage(rows)
+    return rows
+
+
+def run_fused(rows, stages: list[Stage]):
+    """
+    Same rows out as run_stages, but as one loop: each row goes through every stage's
+    process() in order before the next row is read, without a generator per stage
+    handing it along. The starts, warnings and finishes happen in the same order too.
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    for stage in stages:
+        header = stage.start(header)
+    yield header
+
+    processes = [(stage, stage.process) for stage in stages]
+    for row in rows:
+        for stage, process in processes:
+            stage.row_num += 1
+            row = process(row)
+            if row is None:
+                break
+        else:
+            yield row
+
+    for stage in stages:
+        stage.finish()
+
+
+class ResolveBoardGameNotes(Stage):
+    """Streaming resolve_board_game_notes_column."""
+    def start(self, header):
+        header = super().start(header)
+        self.game_index, self.notes_index = self._index(
+            "Game", "Notes", message="Required columns 'Game' or 'Notes' are missing.")
+        return header
+
+    def process(self, row):
+        game = row[self.game_index].strip().lower()
+        if game == "other" or game == "other (specify in notes)":
+            notes_value = row[self.notes_index].strip()
+            if notes_value:
+                row[self.game_index] = notes_value
+        return row
+
+
+class FillGameColumn(Stage):
+    """Streaming fill_game_column."""
+    def start(self, header):
+        header = super().start(header)
+        self.game_index, = self._index("Game", message="Required column 'Game' is missing.")
+        return header
+
+    def process(self, row):
+        if not row[self.game_index].strip():
+            row[self.game_index] = "Unspecified"
+        return row
+
+
+class RemoveEmptyColumns(Stage):
+    """Streaming remove_empty_columns."""
+    def __init__(self, end_index: int):
+        self.end_index = end_index
+
+    def start(self, header):
+        return super().start(header[:self.end_index])
+
+    def process(self, row):
+        return carry_source_row(row[:self.end_index], row)
+
+
+class FillAndStandardizeDates(Stage):
+    """
+    Streaming fill_and_standardize_date_column.
+
+    State: current_date_str, the date being filled down.
+    The DateParser learns the sheet's date format from the first few dates it sees.
+    """
+    def __init__(self, year: int, column: int = 0, current_date_str: str | None = None):
+        self.year = year
+        self.column = column
+        self.current_date_str = current_date_str
+        self.parser = DateParser(year)
+
+    def process(self, row):
+        raw_date = row[self.column].strip()
+
+        if raw_date:
+            parsed = self.parser.parse(raw_date)
+            if parsed is None:
+                row_num = self.source_row(row)
+                warn("unrecognized_date", row_num, f"Unrecognized date format: '{raw_date}' at Row {row_num}, skipping row.",
+                     column=self.header[self.column], value=raw_date)
+                return None
+            self.current_date_str = parsed
+        elif not self.current_date_str:
+            raise ValueError("Missing date and nothing to fill down from.")
+
+        row[self.column] = self.current_date_str
+        return row
+
+    def finish(self):
+        print(self.parser.summary())
+
+    def state(self):
+        return {"current_date_str": self.current_date_str, "fast_format": self.parser.fast_format}
+
+    def restore(self, state):
+        self.current_date_str = state["current_date_str"]
+        self.parser.fast_format = state["fast_format"]
+
+
+class RemoveBadRows(Stage):
+    """
+    Streaming remove_bad_rows. Bad rows are written to bad_writer (a csv.writer) as they come.
+
+    State: header_written, so a resumed run appends to the bad-row file without a second header.
+    """
+    def __init__(self, bad_writer):
+        self.bad_writer = bad_writer
+        self.header_written = False
+
+    def start(self, header):
+        header = super().start(header)
+        self.time_in_index, self.time_out_index = self._index(
+            "Time In", "Time Out",
+            message="One or more required columns ('Game', 'Time In', 'Time Out') are missing.")
+        self._write_header(header)
+        return header
+
+    def _write_header(self, header):
+        if not self.header_written:
+            self.bad_writer.writerow(header)
+            self.header_written = True
+
+    def state(self):
+        return {"header_written": self.header_written}
+
+    def restore(self, state):
+        self.header_written = state["header_written"]
+
+    def process(self, row):
+        if row[self.time_in_index].strip() and row[self.time_out_index].strip():
+            return row
+        self.bad_writer.writerow(row)
+        return None
+
+
+class RemoveBadRowsOccupancy(RemoveBadRows):
+    """Streaming remove_bad_rows_occupancy: a row is bad if ANY cell is empty."""
+    def start(self, header):
+        header = Stage.start(self, header)
+        self._write_header(header)
+        return header
+
+    def process(self, row):
+        if all(cell.strip() for cell in row):
+            return row
+        self.bad_writer.writerow(row)
+        return None
+
+
+class AnonymizeRows(Stage):
+    """
+    Streaming anonymize_rows.
+
+    State: unique_id_map ((name, id) -> number) and next_unique_id.
+    With an id_store (see uc_anon.py) the IDs come from the store instead, and there is
+    no state to save, so the raw names never end up in a checkpoint.
+    """
+    def __init__(self, unique_id_map: dict | None = None, id_store=None):
+        self.unique_id_map = unique_id_map if unique_id_map is not None else {}
+        self.id_store = id_store
+
+    @property
+    def next_unique_id(self) -> int:
+        return len(self.unique_id_map) + 1
+
+    def start(self, header):
+        return super().start([header[0]] + ["Unique ID"] + header[3:])
+
+    def process(self, row):
+        key = (row[1].strip(), row[2].strip())
+        if self.id_store is not None:
+            return carry_source_row([row[0]] + [self.id_store.id(key)] + row[3:], row)
+        if key not in self.unique_id_map:
+            self.unique_id_map[key] = self.next_unique_id
+        return carry_source_row([row[0]] + [self.unique_id_map[key]] + row[3:], row)
+
+    def state(self):
+        if self.id_store is not None:
+            return {}
+        # the numbers are handed out in order, so the keys in order are enough
+        return {"keys": [list(key) for key in self.unique_id_map]}
+
+    def restore(self, state):
+        if "keys" in state:
+            self.unique_id_map = {tuple(key): number for number, key in enumerate(state["keys"], start=1)}
+
+
+class CheckInvalidTimes(Stage):
+    """Streaming check_invalid_times (prints only, columns 3 and 4 like the row engine)."""
+    def start(self, header):
+        print("Rows with invalid time formats. These should be removed from the dataset:")
+        return super().start(header)
+
+    def process(self, row):
+        if not is_valid_time(row[3].strip()) or not is_valid_time(row[4].strip()):
+            print(f"Row {self.source_row(row)}: {row}")
+        return row
+
+
+class FixTimeDisparity(Stage):
+    """
+    Streaming fix_time_disparity.
+
+    State: is_it_afternoon_yet and previous_date (the flag resets when the date changes).
+    """
+    def __init__(self, is_it_afternoon_yet: bool = False, previous_date: str | None = None):
+        self.is_it_afternoon_yet = is_it_afternoon_yet
+        self.previous_date = previous_date
+
+    def start(self, header):
+        header = super().start(header)
+        self.time_in_index, self.time_out_index = self._index(
+            "Time In", "Time Out", message="Required columns 'Time In' or 'Time Out' are missing.")
+        return header
+
+    def process(self, row):
+        date = row[0]
+        time_in = row[self.time_in_index].strip()
+        time_out = row[self.time_out_index].strip()
+
+        if date != self.previous_date:
+            self.is_it_afternoon_yet = False
+            self.previous_date = date
+
+        minutes_in = parse_clock(time_in)
+        minutes_out = parse_clock(time_out)
+        if minutes_in is None or minutes_out is None:
+            row_num = self.source_row(row)
+            bad_column, bad_time = ("Time In", time_in) if minutes_in is None else ("Time Out", time_out)
+            warn("invalid_time", row_num, f"Invalid time at Row {row_num}: Time In = '{time_in}', Time Out = '{time_out}'",
+                 column=bad_column, value=bad_time)
+            return None
+
+        minutes_in, minutes_out, self.is_it_afternoon_yet = fix_afternoon_times(
+            minutes_in, minutes_out, self.is_it_afternoon_yet)
+        row[self.time_in_index] = clock(minutes_in)
+        row[self.time_out_index] = clock(minutes_out)
+        return row
+
+    def state(self):
+        return {"is_it_afternoon_yet": self.is_it_afternoon_yet, "previous_date": self.previous_date}
+
+    def restore(self, state):
+        self.is_it_afternoon_yet = state["is_it_afternoon_yet"]
+        self.previous_date = state["previous_date"]
+
+
+class FixTimeDisparityOccupancy(FixTimeDisparity):
+    """Streaming fix_time_disparity_occupancy (only the "Time" column)."""
+    def start(self, header):
+        header = Stage.start(self, header)
+        self.time_index, = self._index("Time", message="Required column 'Time' is missing.")
+        return header
+
+    def process(self, row):
+        date = row[0]
+        time = row[self.time_index].strip()
+
+        if date != self.previous_date:
+            self.is_it_afternoon_yet = False
+            self.previous_date = date
+
+        minutes = parse_clock(time)
+        if minutes is None:
+            row_num = self.source_row(row)
+            warn("invalid_time", row_num, f"Invalid time at Row {row_num}: Time = '{time}'", column="Time", value=time)
+            return None
+
+        minutes, self.is_it_afternoon_yet = fix_afternoon_time(minutes, self.is_it_afternoon_yet)
+        row[self.time_index] = clock(minutes)
+        return row
+
+
+class _AmPmStage(Stage):
+    def start(self, header):
+        header = super().start(header)
+        self.time_columns = [(col, header.index(col)) for col in TIME_COLUMNS if col in header]
+        return header
+
+
+class FlagOutOfRangeAmPmTimes(_AmPmStage):
+    """Streaming flag_out_of_range_am_pm_times (prints only)."""
+    def start(self, header):
+        header = super().start(header)
+        if not self.time_columns:
+            print("No valid time columns ('Time In', 'Time Out', 'Time') found.")
+        else:
+            print("Flagged rows with times between 1:00 AM and 9:00 AM:")
+        return header
+
+    def process(self, row):
+        for col, col_index in self.time_columns:
+            time = row[col_index].strip()
+            minutes = parse_am_pm(time)
+            if minutes is not None and is_early_morning(minutes):
+                row_num = self.source_row(row)
+                warn("out_of_range_am_pm_time", row_num, f"Row {row_num}: {col} = '{time}'", column=col, value=time)
+        return row
+
+
+class ConvertAmPmTimesToMilitary(_AmPmStage):
+    """Streaming convert_am_pm_times_to_military."""
+    def start(self, header):
+        header = super().start(header)
+        if not self.time_columns:
+            raise ValueError("No valid time columns ('Time In', 'Time Out', 'Time') found.")
+        return header
+
+    def process(self, row):
+        new_row = carry_source_row(row.copy(), row)
+        for col, col_index in self.time_columns:
+            time = new_row[col_index].strip()
+            minutes = parse_am_pm(time)
+            if minutes is not None:
+                new_row[col_index] = clock(minutes)
+            else:
+                row_num = self.source_row(row)
+                warn("invalid_am_pm_time", row_num, f"Invalid time skipped at Row {row_num}: {time}", column=col, value=time)
+        return new_row
+
+
+class AddDurationColumn(Stage):
+    """Streaming add_duration_column."""
+    def start(self, header):
+        super().start(header)
+        self.time_in_index, self.time_out_index = self._index(
+            "Time In", "Time Out", message="Required columns 'Time In' or 'Time Out' are missing.")
+        return header + ["Duration (minutes)"]
+
+    def process(self, row):
+        start = minutes_of(row[self.time_in_index])
+        end = minutes_of(row[self.time_out_index])
+        row.append(end - start if start is not None and end is not None else 0)
+        return row
+
+
+class FillTableNumbers(Stage):
+    """Streaming fill_table_numbers."""
+    table_game_to_table_number = {
+        "Air Hockey": "4",
+        "Foosball": "5",
+        "Shuffleboard": "6",
+    }
+
+    def start(self, header):
+        header = super().start(header)
+        self.table_game_index, self.table_number_index = self._index(
+            "Table Game", "Pool Table #", message="Required columns 'Table Game' or 'Table #' are missing.")
+        return header
+
+    def process(self, row):
+        table_game = row[self.table_game_index].strip()
+        if not row[self.table_number_index].strip():
+            if table_game in self.table_game_to_table_number:
+                row[self.table_number_index] = self.table_game_to_table_number[table_game]
+            elif table_game == "Pool":
+                row_num = self.source_row(row)
+                warn("missing_pool_table", row_num, f"Missing Pool table number at Row {row_num}",
+                     column=self.header[self.table_number_index])
+                row[self.table_number_index] = "0"
+        return row
+
+
+class FillGameByPoolTableNumber(Stage):
+    """Streaming fill_game_by_pool_table_number."""
+    def start(self, header):
+        header = super().start(header)
+        self.table_game_index, self.pool_table_index = self._index(
+            "Table Game", "Pool Table #",
+            message="Required columns 'Table Game' or 'Pool Table #' are missing.")
+        return header
+
+    def process(self, row):
+        if not row[self.table_game_index].strip() and row[self.pool_table_index].strip() in {"1", "2", "3"}:
+            row[self.table_game_index] = "Pool"
+        return row
+
+
+def game_stages(type: str, year: int, num_columns: int, am_pm: bool, bad_writer, id_store=None) -> list[Stage]:
+    """
+    The clean_games steps for one sheet type, in order, as stages.
+
+    am_pm (bool): True for sheets that have AM/PM written out (fall 2024 onwards).
+    id_store (AnonStore): optional stable anonymization IDs (see uc_anon.py).
+    """
+    stages = []
+
+    #extra step for board games
+    if type == "board_games":
+        stages.append(ResolveBoardGameNotes())
+
+    #extra step for video games
+    if type == "video_games":
+        stages.append(FillGameColumn())
+
+    stages += [
+        RemoveEmptyColumns(num_columns),
+        FillAndStandardizeDates(year),
+        RemoveBadRows(bad_writer),
+        AnonymizeRows(id_store=id_store),
+    ]
+
+    if am_pm:
+        stages += [FlagOutOfRangeAmPmTimes(), ConvertAmPmTimesToMilitary()]
+    else:
+        stages += [CheckInvalidTimes(), FixTimeDisparity()]
+
+    stages.append(AddDurationColumn())
+
+    #extra steps for table games
+    if type == "table_games":
+        stages += [FillTableNumbers(), FillGameByPoolTableNumber()]
+
+    return stages
+
+
+def occupancy_stages(year: int, am_pm: bool, bad_writer) -> list[Stage]:
+    """The clean_occupancy steps, in order, as stages."""
+    stages = [RemoveEmptyColumns(4), RemoveBadRowsOccupancy(bad_writer)] #occupancy has 4 columns
+
+    if am_pm:
+        stages += [FlagOutOfRangeAmPmTimes(), ConvertAmPmTimesToMilitary()]
+    else:
+        stages.append(FixTimeDisparityOccupancy())
+
+    stages.append(FillAndStandardizeDates(year, column=1))
+    return stages
+
+
+def _stream(raw_filepath, bad_filepath, clean_filepath, make_stages, runner=run_stages) -> None:
+    """
+    Streams raw_filepath through the stages into clean_filepath and bad_filepath.
+    runner is run_stages, or run_fused for the single-loop version.
+    """
+    with open(raw_filepath, mode='r', newline='') as infile, \
+         open(bad_filepath, mode='w', newline='') as badfile, \
+         open(clean_filepath, mode='w', newline='') as outfile:
+        print("Parsing CSV at:", raw_filepath)
+        writer = csv.writer(outfile)
+        raw_rows = (SheetRow(row, row_num) for row_num, row in enumerate(csv.reader(infile), start=1))
+        rows = runner(raw_rows, make_stages(csv.writer(badfile)))
+
+        print("Parsing complete! First 5 rows:")
+        for i, row in enumerate(rows):
+            if i < 5:
+                print(row)
+            writer.writerow(row)
+
+    print("Bad rows saved to:", bad_filepath)
+    print("Cleaned CSV saved to:", clean_filepath)
+
+
+def clean_games_streaming(raw_filepath, bad_filepath, clean_filepath, year, type, num_columns, id_store=None,
+                          fused=False):
+    """
+    Same steps as uc_parsing.clean_games, streamed row by row.
+    num_columns has already been defaulted by clean_games.
+    fused (bool): run every step on a row in one loop (see run_fused).
+    """
+    #fall 2024 handles time differently. it actually has am/pm specified
+    am_pm = "f24" in raw_filepath
+    _stream(raw_filepath, bad_filepath, clean_filepath,
+            lambda bad_writer: game_stages(type, year, num_columns, am_pm, bad_writer, id_store),
+            run_fused if fused else run_stages)
+
+
+def clean_occupancy_streaming(raw_filepath, bad_filepath, clean_filepath, year, fused=False):
+    """Same steps as uc_parsing.clean_occupancy, streamed row by row (in one loop if fused)."""
+    am_pm = "f24" in raw_filepath
+    _stream(raw_filepath, bad_filepath, clean_filepath,
+            lambda bad_writer: occupancy_stages(year, am_pm, bad_writer),
+            run_fused if fused else run_stages)
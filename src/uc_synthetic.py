@@ -0,0 +1,179 @@
+import argparse
+import csv
+import os
+import random
+from datetime import date, timedelta
+
+from batch_clean import SHEET_TYPES, semester_year
+
+"""
+Seeded generator for fake raw sheets, the same shape as what sheets_to_csv.py pulls
+from Google Sheets, so the cleaning steps and charts can be timed at any size (see benchmark.py).
+
+The quirks of the real sheets are all in there:
+- ghost trailing columns (empty cells past the real columns)
+- the date is only written on the first rental of each day, so it has to be filled down,
+  in a mix of 9/2, 9/2/23 and 9/2/2023, with the odd year typo
+- 12-hour times with no AM/PM ("1:15" means 1:15pm), or "1:15 PM" style times for f24
+- "Other (specify in notes)" board games with the real name in the Notes column
+- Pool rentals with no table number, blank video game names, "2-4" controllers,
+  and a few rows with missing times or junk dates that end up in the bad rows
+
+No real names or IDs are used, so the output is safe to share.
+
+Run from src/:
+    python uc_synthetic.py --rows 100000
+    python uc_synthetic.py --rows 1e6 --semester f24 --types table_games
+"""
+
+VIDEO_GAMES = {
+    "Xbox": ["Minecraft", "Forza Horizon 5", "Madden 22", "Halo Infinite", "FIFA 23"],
+    "Wii": ["Mario Kart", "Mario Party 8", "Wii Sports", "Just Dance"],
+    "Switch": ["Smash Bros", "Splatoon", "Switch game", "Mario Kart 8"],
+}
+BOARD_GAMES = ["Uno", "Sorry", "Jenga", "Chess", "Catan", "Monopoly", "Scrabble", "Other (specify in notes)"]
+NOTES_GAMES = ["Codenames", "Ticket to Ride", "Azul", "Pandemic"]
+TABLE_GAMES = ["Pool", "Pool", "Pool", "Air Hockey", "Foosball", "Shuffleboard"]
+
+HEADERS = {
+    "video_games": ["Date", "Name", "ID", "Console", "Game", "# of Controllers", "Time In", "Time Out", "Notes"],
+    "board_games": ["Date", "Name", "ID", "Game", "Time In", "Time Out", "Notes"],
+    "table_games": ["Date", "Name", "ID", "Table Game", "Time In", "Time Out", "Pool Table #"],
+    "occupancy": ["Day", "Date", "Headcount", "Time"],
+}
+GHOST_COLUMNS = 3
+
+#a semester is about this many open days. Bigger sheets get more rows per day instead of more days
+SEMESTER_DAYS = 110
+#rentals open at noon, occupancy is taken from 7:30 in the morning
+OPENING_TIME = {"occupancy": 7 * 60 + 30}
+DEFAULT_OPENING_TIME = 12 * 60
+
+
+def _clock(minutes: int, am_pm: bool) -> str:
+    """Formats minutes since midnight the way staff type it into the sheet."""
+    hour, minute = divmod(minutes % (24 * 60), 60)
+    if am_pm:
+        suffix = "AM" if hour < 12 else "PM"
+        return f"{(hour - 1) % 12 + 1}:{minute:02} {suffix}"
+    return f"{(hour - 1) % 12 + 1}:{minute:02}"
+
+
+def _date_cell(day: date, rng: random.Random) -> str:
+    """Picks one of the date formats seen in the real sheets."""
+    style = rng.random()
+    if style < 0.6:
+        return f"{day.month}/{day.day}"
+    if style < 0.8:
+        return f"{day.month}/{day.day}/{day.year % 100:02}"
+    if style < 0.95:
+        return f"{day.month}/{day.day}/{day.year}"
+    # the occasional year typo, like 2013 for 2023
+    return f"{day.month}/{day.day}/{day.year - 10}"
+
+
+def semester_start(semester: str) -> date:
+    """First day of a semester like 'f23' (late August) or 's24' (mid January)."""
+    if semester.startswith("f"):
+        return date(semester_year(semester), 8, 24)
+    return date(semester_year(semester), 1, 15)
+
+
+def generate_rows(type: str, num_rows: int, seed: int = 0, am_pm: bool = False, start: date = date(2023, 8, 24)):
+    """
+    Yields raw sheet rows (header first) for one sheet type.
+
+    type should be "video_games", "board_games", "table_games" or "occupancy".
+    am_pm=True writes f24-style "1:15 PM" times.
+    The same seed always gives the same rows. Rows are generated lazily, so
+    1e7-row sheets don't have to fit in memory.
+    """
+    rng = random.Random(seed)
+    yield HEADERS[type] + [""] * GHOST_COLUMNS
+
+    # about 60 rentals (or occupancy records) per day, more once the sheet is longer than a semester
+    per_day = max(60, -(-num_rows // SEMESTER_DAYS))
+    max_step = max(1, min(8, 1380 // per_day))
+    opening_time = OPENING_TIME.get(type, DEFAULT_OPENING_TIME)
+    patrons = max(50, num_rows // 20)
+    day = start
+    clock = opening_time
+    for i in range(num_rows):
+        first_of_day = i % per_day == 0
+        if first_of_day:
+            if i:
+                day += timedelta(days=1)
+            clock = opening_time + rng.randint(0, 20)
+        clock = min(clock + rng.randint(0, max_step), 23 * 60 + 30)
+        time_in = _clock(clock, am_pm)
+        time_out = _clock(min(clock + rng.randint(3, 120), 23 * 60 + 59), am_pm)
+        date_cell = _date_cell(day, rng) if first_of_day else ""
+
+        roll = rng.random()
+        if roll < 0.01:
+            time_out = ""  # still checked out / never returned
+        elif roll < 0.012:
+            time_in = "??"
+        elif roll < 0.013 and not first_of_day:
+            date_cell = "TBD"
+
+        patron = rng.randrange(patrons)
+        name, student_id = f"Patron {patron}", f"{930000000 + patron}"
+
+        if type == "video_games":
+            console = rng.choice(list(VIDEO_GAMES))
+            game = rng.choice(VIDEO_GAMES[console]) if rng.random() > 0.05 else ""
+            controllers = str(rng.randint(1, 4)) if rng.random() > 0.02 else "2-4"
+            row = [date_cell, name, student_id, console, game, controllers, time_in, time_out, ""]
+        elif type == "board_games":
+            game = rng.choice(BOARD_GAMES)
+            notes = rng.choice(NOTES_GAMES) if game.startswith("Other") else ""
+            row = [date_cell, name, student_id, game, time_in, time_out, notes]
+        elif type == "table_games":
+            game = rng.choice(TABLE_GAMES)
+            table = str(rng.randint(1, 3)) if game == "Pool" and rng.random() > 0.05 else ""
+            if game == "Pool" and table and rng.random() < 0.002:
+                game = ""  # the "Table Game" column was left empty but a table was given
+            row = [date_cell, name, student_id, game, time_in, time_out, table]
+        else:
+            row = [day.strftime("%A"), _date_cell(day, rng), str(rng.randint(0, 40)), time_in]
+        yield row + [""] * GHOST_COLUMNS
+
+
+def write_raw_csv(file_path: str, type: str, num_rows: int, seed: int = 0, am_pm: bool = False,
+                  start: date = date(2023, 8, 24)) -> None:
+    """Writes a synthetic raw sheet to file_path."""
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(file_path, mode='w', newline='') as outfile:
+        csv.writer(outfile).writerows(generate_rows(type, num_rows, seed, am_pm, start))
+
+
+def write_semester(raw_data_folder: str, semester: str, num_rows: int, types=SHEET_TYPES, seed: int = 0) -> list[str]:
+    """
+    Writes <semester>_<type>_raw.csv for each type, named like the real files so
+    clean_games / batch_clean.py pick them up. f24 sheets get AM/PM times, like the real ones.
+    Returns the file paths.
+    """
+    file_paths = []
+    for type in types:
+        file_path = os.path.join(raw_data_folder, f"{semester}_{type}_raw.csv")
+        write_raw_csv(file_path, type, num_rows, seed, am_pm="f24" in semester, start=semester_start(semester))
+        file_paths.append(file_path)
+    return file_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write seeded synthetic raw sheets (no real names or IDs).")
+    parser.add_argument("--rows", type=float, default=1000, help="rows per sheet, e.g. 1e5")
+    parser.add_argument("--semester", default="f23", help="semester to name the files after (f24 gets AM/PM times)")
+    parser.add_argument("--types", nargs="*", choices=SHEET_TYPES, default=SHEET_TYPES, help="only these sheet types")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=os.path.join("..", "raw_data", "synthetic"), help="folder to write the raw CSVs to")
+    args = parser.parse_args()
+
+    for file_path in write_semester(args.out, args.semester, int(args.rows), args.types, args.seed):
+        print("Synthetic sheet saved to:", file_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import re
+from functools import lru_cache
+
+"""
+Time parsing for the cleaning steps.
+
+Every "Time In" / "Time Out" / "Time" cell is parsed once into minutes since midnight
+(an int). The AM/PM fixes, the 1-9 AM checks and the durations are then plain integer
+arithmetic on those minutes. The cells are stored as Clock values, which are ints that
+turn back into "HH:MM" strings when csv.writer writes them, so HH:MM formatting only
+happens at save time.
+
+The parsers accept exactly what the old string checks accepted:
+- parse_clock matches is_valid_time (two parts split on ":", int() each, 0-23 and 0-59)
+- parse_military matches datetime.strptime(time_str, "%H:%M")
+- parse_am_pm matches is_valid_am_pm_time + datetime.strptime(time_str, "%I:%M %p")
+  (except that "1:30PM", with no space, is now read as 1:30 PM instead of crashing)
+"""
+
+MINUTES_PER_DAY = 24 * 60
+NOON = 12 * 60
+TIME_COLUMNS = ["Time In", "Time Out", "Time"]
+
+CLOCK_STRINGS = [f"{hour:02}:{minute:02}" for hour in range(24) for minute in range(60)]
+
+
+class Clock(int):
+    """Minutes since midnight that write (and print) themselves as 'HH:MM'."""
+    __slots__ = ()
+
+    def __str__(self):
+        return CLOCK_STRINGS[self]
+
+    def __repr__(self):
+        return repr(CLOCK_STRINGS[self])
+
+
+#one Clock per minute of the day, shared by every row
+CLOCKS = [Clock(minutes) for minutes in range(MINUTES_PER_DAY)]
+
+
+def clock(minutes: int) -> Clock:
+    return CLOCKS[minutes]
+
+
+@lru_cache(maxsize=65536)
+def parse_clock(time_str: str) -> int | None:
+    """Minutes since midnight for a valid 'HH:MM' string (see is_valid_time), else None."""
+    parts = time_str.split(":")
+    if len(parts) != 2:
+        return None
+    try:
+        hour, minute = int(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+    if 0 <= hour < 24 and 0 <= minute < 60:
+        return hour * 60 + minute
+    return None
+
+
+#the regex datetime.strptime builds for "%H:%M"
+_MILITARY = re.compile(r"(2[0-3]|[0-1]\d|\d):([0-5]\d|\d)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=65536)
+def parse_military(time_str: str) -> int | None:
+    """Minutes since midnight if datetime.strptime(time_str, "%H:%M") would accept it, else None."""
+    match = _MILITARY.fullmatch(time_str)
+    if match is None:
+        return None
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+_AM_PM = re.compile(r"^(0?[1-9]|1[0-2]):([0-5][0-9])\s?(AM|PM)$")  # Regex for HH:MM AM/PM
+
+
+@lru_cache(maxsize=65536)
+def parse_am_pm(time_str: str) -> int | None:
+    """Minutes since midnight for an 'HH:MM AM/PM' string, else None."""
+    match = _AM_PM.match(time_str.strip().upper())
+    if match is None:
+        return None
+    hour = int(match.group(1)) % 12
+    if match.group(3) == "PM":
+        hour += 12
+    return hour * 60 + int(match.group(2))
+
+
+def minutes_of(cell) -> int | None:
+    """
+    Minutes since midnight for a time cell: a Clock from an earlier step,
+    or a string that strptime "%H:%M" accepts. None otherwise.
+    """
+    if isinstance(cell, int):
+        return int(cell)
+    if not cell.strip():
+        return None
+    return parse_military(cell)
+
+
+def to_pm(minutes: int) -> int:
+    """Adds 12 hours, wrapping past midnight (the old (hour + 12) % 24)."""
+    return (minutes + NOON) % MINUTES_PER_DAY
+
+
+def fix_afternoon_times(time_in: int, time_out: int, is_it_afternoon_yet: bool) -> tuple[int, int, bool]:
+    """
+    The AM/PM guess from fix_time_disparity for one rental, on minutes.
+
+    A Time In of 1-9 means the afternoon has started (nobody rents at 3am), and once it
+    has, every later time that day is PM too. Returns (time_in, time_out, is_it_afternoon_yet).
+    """
+    if (1 <= time_in // 60 <= 9) or is_it_afternoon_yet:  # Time in the afternoon
+        is_it_afternoon_yet = True
+        time_in = to_pm(time_in)
+
+    if (13 <= time_in // 60 <= 23) or is_it_afternoon_yet:  # Real military time now
+        is_it_afternoon_yet = True
+        time_out = to_pm(time_out)
+    elif 1 <= time_out // 60 <= 9:  # Special case for crossing the afternoon line
+        time_out = to_pm(time_out)
+
+    return time_in, time_out, is_it_afternoon_yet
+
+
+def fix_afternoon_time(time: int, is_it_afternoon_yet: bool) -> tuple[int, bool]:
+    """The AM/PM guess from fix_time_disparity_occupancy for one record. Returns (time, is_it_afternoon_yet)."""
+    if (1 <= time // 60 <= 9) or is_it_afternoon_yet:
+        return to_pm(time), True
+    return time, False
+
+
+def is_early_morning(minutes: int) -> bool:
+    """Between 1:00 AM and 9:00 AM, which is probably a typo."""
+    return 60 <= minutes < 9 * 60
@@ -0,0 +1,169 @@
+import csv
+import os
+import re
+
+from uc_times import parse_clock, TIME_COLUMNS
+
+"""
+Typed, columnar copies of the cleaned CSVs (Parquet, through pyarrow).
+
+save_csv writes plain text, so every chart used to re-read it with pd.read_csv and
+re-guess every type. write_typed writes the same data once more with real types:
+- Date as a date
+- Time In / Time Out / Time as integer minutes since midnight (empty if the time didn't parse)
+- Duration, Unique ID, Headcount and Pool Table # as integers
+- Console, Game, Table Game and Day dictionary-encoded (pandas reads them as categoricals)
+
+The files are partitioned by sheet type and semester:
+    clean_data/typed/<type>/semester=<sem>/data.parquet
+so one semester can be rewritten on its own, and read_typed can load several semesters
+(or only a few columns of them) in one go.
+
+pyarrow is optional. Without it, write_typed prints a note and the charts keep reading
+the CSVs.
+"""
+
+TYPED_DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "clean_data", "typed")
+
+#f24_video_games_cleaned.csv -> ("f24", "video_games")
+CLEAN_FILE_PATTERN = re.compile(r"^([a-z]+\d{2})_(video_games|board_games|table_games|occupancy)_cleaned\.csv$")
+
+INT_COLUMNS = {"Unique ID": "int64", "Duration (minutes)": "int32", "Headcount": "int32", "Head Count": "int32",
+               "Pool Table #": "int16"}
+CATEGORY_COLUMNS = {"Console", "Game", "Table Game", "Day"}
+
+
+def clean_file_parts(clean_filepath: str) -> tuple[str, str] | None:
+    """(semester, type) from a cleaned CSV name like f24_video_games_cleaned.csv, or None."""
+    match = CLEAN_FILE_PATTERN.match(os.path.basename(clean_filepath))
+    return match.groups() if match else None
+
+
+def typed_path(semester: str, type: str, typed_folder: str = TYPED_DATA_FOLDER) -> str:
+    return os.path.join(typed_folder, type, f"semester={semester}", "data.parquet")
+
+
+def typed_path_for(clean_filepath: str) -> str | None:
+    """
+    The typed file next to a cleaned CSV (in clean_data/typed/), or None if the
+    CSV isn't named <sem>_<type>_cleaned.csv.
+    """
+    parts = clean_file_parts(clean_filepath)
+    if parts is None:
+        return None
+    folder = os.path.join(os.path.dirname(os.path.abspath(clean_filepath)), "typed")
+    return typed_path(*parts, typed_folder=folder)
+
+
+def _int_column(pa, pc, column):
+    """Casts a string column to int64, or returns None if any cell isn't an integer."""
+    try:
+        return pc.cast(column, pa.int64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return None
+
+
+def _minutes_column(pa, column):
+    """'HH:MM' strings -> int16 minutes since midnight, parsing each distinct time once."""
+    encoded = column.combine_chunks().dictionary_encode()
+    minutes = pa.array([parse_clock(time) if time is not None else None for time in encoded.dictionary.to_pylist()],
+                       type=pa.int16())
+    return minutes.take(encoded.indices)
+
+
+def to_typed_table(clean_filepath: str):
+    """Reads a cleaned CSV (every cell as text) and returns it as a typed pyarrow Table."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+
+    # read everything as strings first, so no type guessing happens
+    # (empty cells are nulls, like the NaNs pd.read_csv gives)
+    with open(clean_filepath, mode='r', newline='') as file:
+        header = next(csv.reader(file), [])
+    table = pa_csv.read_csv(
+        clean_filepath,
+        convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in header},
+                                              strings_can_be_null=True),
+    )
+
+    columns = {}
+    for name in table.column_names:
+        column = table[name]
+        if name == "Date":
+            column = pc.cast(pc.strptime(column, format="%Y-%m-%d", unit="s"), pa.date32())
+        elif name in TIME_COLUMNS:
+            column = _minutes_column(pa, column)
+        elif name in INT_COLUMNS:
+            as_int = _int_column(pa, pc, column)
+            if as_int is None:
+                print(f"Column '{name}' has non-integer values, keeping it as text.")
+            else:
+                column = pc.cast(as_int, getattr(pa, INT_COLUMNS[name])())
+        elif name in CATEGORY_COLUMNS:
+            column = column.combine_chunks().dictionary_encode()
+        columns[name] = column
+    return pa.table(columns)
+
+
+def write_typed(clean_filepath: str, typed_folder: str | None = None) -> str | None:
+    """
+    Writes the typed Parquet copy of a cleaned CSV and returns its path.
+
+    typed_folder defaults to clean_data/typed next to the CSV. Returns None (and writes
+    nothing) if pyarrow isn't installed or the file name doesn't say the semester and type.
+    """
+    parts = clean_file_parts(clean_filepath)
+    if parts is None:
+        print("Not writing a typed copy: can't tell the semester and type from", clean_filepath)
+        return None
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("pyarrow isn't installed, skipping the typed (Parquet) copy.")
+        return None
+
+    output_path = typed_path(*parts, typed_folder=typed_folder) if typed_folder else typed_path_for(clean_filepath)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    pq.write_table(to_typed_table(clean_filepath), output_path)
+    print("Typed copy saved to:", output_path)
+    return output_path
+
+
+def to_pandas(table, categories: bool = False):
+    """
+    A typed table as a DataFrame. Dates become datetime64.
+
+    categories (bool): keep the dictionary columns as pandas categoricals. Off by default,
+        because groupby and plotly order categoricals differently from plain strings, and
+        the existing charts were written against pd.read_csv's plain strings.
+    """
+    import pyarrow as pa
+
+    if not categories:
+        table = pa.table({name: column.cast(column.type.value_type) if pa.types.is_dictionary(column.type) else column
+                          for name, column in zip(table.column_names, table.columns)})
+    return table.to_pandas(date_as_object=False)
+
+
+def read_typed_file(typed_filepath: str, columns=None, categories: bool = False):
+    """Loads one typed file (only the given columns) as a DataFrame."""
+    import pyarrow.parquet as pq
+
+    return to_pandas(pq.read_table(typed_filepath, columns=columns), categories)
+
+
+def read_typed(type: str, semesters=None, columns=None, typed_folder: str = TYPED_DATA_FOLDER, categories: bool = False):
+    """
+    Loads one sheet type from the typed files as a pandas DataFrame.
+
+    semesters (list[str]): only these semesters (default: every semester written so far).
+    columns (list[str]): only read these columns. Add "semester" to get the semester
+        of each row as a column.
+    categories (bool): see to_pandas.
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(os.path.join(typed_folder, type), format="parquet", partitioning="hive")
+    row_filter = ds.field("semester").isin(list(semesters)) if semesters else None
+    return to_pandas(dataset.to_table(columns=columns, filter=row_filter), categories)
@@ -1,9 +1,22 @@
+import base64
+import importlib.util
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
-import plotly.express as px
+import plotly.colors
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import plotly.io as pio
 from collections import Counter
 
+import profiling
+from uc_typed import clean_file_parts, typed_path_for, read_typed_file
+from viz_aggregates import AGGREGATES, aggregate_path
+from viz_bundle import ensure_bundle
+
 """
 This script contains a function to make each of the visualizations on the site.
 Each function takes a filepath as input and a name as input to be prefixed to the Plotly file name.
@@ -11,13 +24,514 @@ Each function takes a filepath as input and a name as input to be prefixed to th
 These scripts were originally written by Carlo, Violet and David for DATA303
 They have been refactored into standalone functions using ChatGPT
 
-TODO
-lots of repeating, copy pasted code that could be fixed with helper functions / proper globals
-however it is nice that each of these functions works standalone
-with continued development / introduction of a lot more viz, it might be best to rethink this
+Each chart is declared with @register_chart (what data it needs and what files it writes) on a
+function that returns the figure as a plain dict. The shared formatting lives in one plotly
+template (_house_style), so a chart only sets what's different about it. Every chart function
+still works standalone: _table_game_rentals_pie_chart(filepath, semester_name) etc.
 """
 
-def run_all_visualizations(semester_name: str = "f23", output_path: str = "../resources/viz/f23") -> None:
+#set to False to only write the HTML files (no browser tabs / notebook output), see viz_render.py
+SHOW_FIGURES = True
+
+#True: write the figure dicts as they are, skipping go.Figure's check of every property (batch builds, see viz_render.py)
+#False: build a go.Figure from each one first, so a mistake in a chart fails loudly
+FAST_FIGURES = False
+
+
+#True: charts load one shared plotly-<version>.min.js from the folder they're written to (see viz_bundle.py)
+#False: every chart HTML embeds its own copy of plotly.js (write_html's default)
+SHARED_PLOTLY_JS = True
+
+#also save each figure as <chart>.json next to its HTML, so viz_pages.py can put a page's charts in one document
+WRITE_FIGURE_SPECS = True
+
+
+#how the strip + box charts (durations by console, by pool table) are drawn:
+#"full": every rental is its own SVG point and the box gets every duration (fine for one semester)
+#"scalable": the box statistics are computed here and sent as a handful of numbers, and the
+#    points are a deterministic sample of at most STRIP_POINT_BUDGET rentals drawn with WebGL
+#"auto": "scalable" once there are more than STRIP_POINT_BUDGET rentals
+STRIP_MODE = "auto"
+STRIP_POINT_BUDGET = 5000
+
+
+def _show(fig) -> None:
+    if SHOW_FIGURES:
+        go.Figure(fig).show() if isinstance(fig, dict) else fig.show()
+
+
+#every file _write_html wrote in this process, so viz_render can tell which files a chart made
+WRITTEN_FILES = []
+
+
+def _use_scalable_strips(num_points: int) -> bool:
+    return STRIP_MODE == "scalable" or (STRIP_MODE == "auto" and num_points > STRIP_POINT_BUDGET)
+
+
+def _sample_strip(values: pd.Series, groups: pd.Series, budget: int) -> pd.Series:
+    """
+    At most budget of values, shared between the groups by size (at least one each).
+    Within a group the values are sorted and picked evenly from smallest to largest, so
+    the sample has the same shape as the group, always includes its extremes, and is the
+    same on every run.
+    """
+    sampled = []
+    for _, group in values.groupby(groups, observed=True, sort=False):
+        count = min(len(group), max(1, round(budget * len(group) / len(values))))
+        ordered = group.sort_values(kind="stable")
+        sampled.append(ordered.iloc[np.linspace(0, len(ordered) - 1, count).round().astype(int)])
+    return pd.concat(sampled) if sampled else values.iloc[:0]
+
+
+def _scalable_strip_box(data: pd.DataFrame, x: str, y: str, stats: pd.DataFrame, positions: dict) -> list:
+    """
+    Strip + box traces that stay small at any data size (STRIP_MODE "scalable").
+
+    stats (DataFrame): viz_aggregates.duration_stats for the same rows, one row per x value.
+    positions (dict): x value -> its position on a numeric x axis.
+
+    One box trace per x value with its precomputed quartiles and whiskers, and one scattergl
+    trace with a jittered sample of the points (fixed seed, so the file only changes with the data).
+    """
+    traces = []
+    for _, row in stats.iterrows():
+        if row[x] not in positions:
+            continue
+        traces.append({
+            'type': 'box', 'x': [positions[row[x]]], 'q1': [row["Q1"]], 'median': [row["Median"]], 'q3': [row["Q3"]],
+            'lowerfence': [row["LowerFence"]], 'upperfence': [row["UpperFence"]], 'mean': [row["Mean"]],
+            'boxpoints': False, 'hoverinfo': 'skip', 'marker': {'opacity': 0.5, 'color': 'green'},
+        })
+
+    data = data[data[x].isin(list(positions))]
+    sample = _sample_strip(data[y], data[x], STRIP_POINT_BUDGET)
+    jitter = np.random.default_rng(0).uniform(-0.3, 0.3, len(sample))
+    traces.append({
+        'type': 'scattergl',
+        'x': _array(data.loc[sample.index, x].map(positions).to_numpy(dtype=float) + jitter),
+        'y': _array(sample),
+        'mode': 'markers',
+        'marker': {'color': 'blue', 'opacity': 0.3},
+        'hovertemplate': f'{y}=%{{y}}<extra></extra>',
+        'name': 'strip',
+    })
+    return traces
+
+
+def _write_html(fig, output_filename: str) -> None:
+    # fig is a go.Figure, or a figure dict that's written without checking it (FAST_FIGURES)
+    validate = not isinstance(fig, dict)
+    if SHARED_PLOTLY_JS:
+        bundle = ensure_bundle(os.path.dirname(output_filename) or ".")
+        pio.write_html(fig, output_filename, include_plotlyjs=bundle, validate=validate)
+    else:
+        pio.write_html(fig, output_filename, validate=validate)
+    WRITTEN_FILES.append(output_filename)
+    if WRITE_FIGURE_SPECS:
+        pio.write_json(fig, os.path.splitext(output_filename)[0] + ".json", validate=validate)
+        WRITTEN_FILES.append(os.path.splitext(output_filename)[0] + ".json")
+
+
+#the types every chart can count on, whether the data came from the CSV or the typed copy
+CATEGORY_COLUMNS = ["Console", "Game", "Table Game", "Day"]
+INT_COLUMNS = ["Unique ID", "Duration (minutes)", "Headcount"]
+DATE_COLUMNS = ["Date"]
+#older sheets named some columns differently (s24 occupancy has "Head Count")
+COLUMN_ALIASES = {"Head Count": "Headcount"}
+
+#(path, mtime, size) -> (the columns of the dataset parsed so far, whether that's all of them),
+#shared by every chart function
+_dataset_cache = {}
+_dataset_cache_lock = threading.Lock()
+_dataset_path_locks = {}
+#(path, mtime, size) -> {table name: DataFrame}, see load_aggregate
+_aggregate_cache = {}
+
+
+def _source_file(filepath: str) -> str:
+    """The file that actually gets read: the typed copy if it's at least as new as the CSV, else the CSV."""
+    typed_filepath = typed_path_for(filepath)
+    if typed_filepath and os.path.exists(typed_filepath) and (
+            not os.path.exists(filepath) or os.path.getmtime(typed_filepath) >= os.path.getmtime(filepath)) \
+            and importlib.util.find_spec("pyarrow") is not None:
+        return typed_filepath
+    return filepath
+
+
+def _rename_aliases(data: pd.DataFrame) -> pd.DataFrame:
+    return data.rename(columns={old: new for old, new in COLUMN_ALIASES.items() if new not in data.columns})
+
+
+def _file_columns(source: str) -> list[str]:
+    if source.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.read_schema(source).names
+    return list(pd.read_csv(source, nrows=0).columns)
+
+
+def _parse_dataset(source: str, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Reads a dataset with explicit types instead of letting read_csv guess them.
+    Only the given columns are read at all (default: all of them), under their new names
+    if the file still has an old one (COLUMN_ALIASES).
+    """
+    header = _file_columns(source)
+    if columns is not None:
+        old_names = {new: old for old, new in COLUMN_ALIASES.items() if old in header and new not in header}
+        header = [old_names.get(col, col) for col in columns]
+
+    if source.endswith(".parquet"):
+        data = _rename_aliases(read_typed_file(source, header if columns is not None else None, categories=True))
+    else:
+        data = pd.read_csv(source,
+                           usecols=header if columns is not None else None,
+                           dtype={col: "category" for col in CATEGORY_COLUMNS if col in header},
+                           parse_dates=[col for col in DATE_COLUMNS if col in header])
+        data = _rename_aliases(data)
+        for col in INT_COLUMNS:
+            if col in data.columns:
+                try:
+                    data[col] = data[col].astype("int64")
+                except (ValueError, TypeError):
+                    print(f"Column '{col}' in {source} isn't all integers, leaving it as is.")
+
+    for col in CATEGORY_COLUMNS:
+        if col in data.columns:
+            # alphabetical categories, so groupby orders them the same way it orders plain strings
+            data[col] = data[col].cat.reorder_categories(sorted(data[col].cat.categories))
+    return data
+
+
+def load_clean_data(filepath: str, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Loads a cleaned dataset for a chart.
+
+    Each file's columns are parsed once and kept in memory, keyed by (path, mtime, size),
+    so all the charts of one sheet share them, and a re-cleaned file is picked up on the
+    next call. Only the columns a chart asks for are read; columns a later chart needs
+    that aren't cached yet are read then and added. The typed Parquet copy (see
+    uc_typed.py) is read instead of the CSV when it is at least as new.
+
+    The types are the same either way: Console, Game, Table Game and Day are categoricals,
+    Unique ID, Duration and Headcount are ints, and Date is a datetime.
+
+    columns (list[str]): only these columns (default: all of them).
+
+    The returned frame shares its data with the cache, but adding or changing columns on
+    it never touches the cached copy (pandas copy-on-write). Safe to call from several
+    threads at once.
+    """
+    source = _source_file(filepath)
+    stat = os.stat(source)
+    key = (os.path.abspath(source), stat.st_mtime_ns, stat.st_size)
+
+    with _dataset_cache_lock:
+        path_lock = _dataset_path_locks.setdefault(key[0], threading.RLock())
+    # one lock per file, so two charts asking for the same file wait on one parse
+    with path_lock:
+        data, complete = _dataset_cache.get(key, (None, False))
+        missing = [] if complete or columns is None else [col for col in columns if data is None or col not in data]
+        if not complete and (columns is None or missing):
+            if columns is None:
+                data, complete = _parse_dataset(source), True
+            elif data is None:
+                data = _parse_dataset(source, missing)
+            else:
+                data = pd.concat([data, _parse_dataset(source, missing)], axis=1)
+            with _dataset_cache_lock:
+                for old_key in [k for k in _dataset_cache if k[0] == key[0]]:
+                    del _dataset_cache[old_key]  # the file changed since it was cached
+                _dataset_cache[key] = (data, complete)
+
+    return (data[columns] if columns is not None else data).copy(deep=False)
+
+
+def _save_aggregates(filepath: str, tables: dict) -> dict:
+    """Writes a file's summary tables to clean_data/aggregates/ and returns them as read back from CSV."""
+    loaded = {}
+    for name, table in tables.items():
+        text = table.to_csv(index=False)
+        saved = aggregate_path(filepath, name)
+        try:
+            os.makedirs(os.path.dirname(saved), exist_ok=True)
+            temp_path = f"{saved}.{os.getpid()}.tmp"
+            with open(temp_path, mode='w', newline='') as file:
+                file.write(text)
+            os.replace(temp_path, saved)
+        except OSError as error:
+            print("Couldn't save summary table:", error)
+        # read back from the CSV text, so a fresh table has the same types as a saved one
+        loaded[name] = pd.read_csv(io.StringIO(text), float_precision="round_trip")
+    return loaded
+
+
+def load_aggregate(filepath: str, type: str, name: str) -> pd.DataFrame:
+    """
+    One of the summary tables in viz_aggregates.py (e.g. "rentals" for "video_games") for a cleaned file.
+
+    All the tables for a file are computed together the first time one is asked for, and
+    saved to clean_data/aggregates/. Later runs read the saved table as long as it is at
+    least as new as the data. Cached in memory like load_clean_data.
+    """
+    source = _source_file(filepath)
+    stat = os.stat(source)
+    key = (os.path.abspath(source), stat.st_mtime_ns, stat.st_size)
+
+    with _dataset_cache_lock:
+        path_lock = _dataset_path_locks.setdefault(key[0], threading.RLock())
+    # the same lock as load_clean_data (an RLock, since computing the tables calls it)
+    with path_lock:
+        tables = _aggregate_cache.get(key)
+        if tables is None or name not in tables:
+            saved = aggregate_path(filepath, name)
+            if os.path.exists(saved) and os.path.getmtime(saved) >= stat.st_mtime:
+                tables = {**(tables or {}), name: pd.read_csv(saved, float_precision="round_trip")}
+            else:
+                tables = _save_aggregates(filepath, AGGREGATES[type](load_clean_data(filepath)))
+            with _dataset_cache_lock:
+                for old_key in [k for k in _aggregate_cache if k[0] == key[0] and k != key]:
+                    del _aggregate_cache[old_key]
+                _aggregate_cache[key] = tables
+
+    return tables[name].copy(deep=False)
+
+
+def clear_dataset_cache() -> None:
+    """Forgets every cached dataset and summary table (they are reloaded when next asked for)."""
+    with _dataset_cache_lock:
+        _dataset_cache.clear()
+        _aggregate_cache.clear()
+        _semesters_cache.clear()
+
+
+#semester letters in calendar order within a year: s24 comes before f24
+SEASON_ORDER = {"w": 0, "s": 1, "su": 2, "f": 3}
+#the cross-semester charts show weeks 1 to SEMESTER_WEEKS (a semester is about 16 weeks plus finals)
+SEMESTER_WEEKS = 18
+
+#(type, columns, semesters) -> (the files' (path, mtime, size) keys, combined DataFrame), see load_semesters
+_semesters_cache = {}
+
+
+def semester_sort_key(semester: str) -> tuple:
+    """Sorts semester names like "f23", "s24", "f24" in calendar order."""
+    season, year = semester[:-2], int(semester[-2:])
+    return (year, SEASON_ORDER.get(season, len(SEASON_ORDER)), season)
+
+
+def _with_week(data: pd.DataFrame) -> pd.DataFrame:
+    # week 1 is the Monday-to-Sunday week of the semester's first day with data, not counting the
+    # odd mistyped date (s24 occupancy has a few from 2022), which end up with a week <= 0
+    first_day = data["Date"].quantile(0.01).normalize()
+    first_monday = first_day - pd.Timedelta(days=first_day.weekday())
+    return data.assign(Week=(data["Date"] - first_monday).dt.days // 7 + 1)
+
+
+def load_semesters(type: str, columns: list[str] | None = None, clean_data_folder: str = "../clean_data",
+                   semesters: list[str] | None = None) -> pd.DataFrame:
+    """
+    One sheet type ("video_games", "occupancy", ...) for every semester in clean_data_folder, in one frame.
+
+    Adds two columns:
+    - "Semester": the semester name, as an ordered categorical in calendar order (f23 < s24 < f24)
+    - "Week": week of the semester, 1 being the week of its first day with data (weeks start on Monday).
+      Rows with mistyped dates can fall outside the semester's weeks, see SEMESTER_WEEKS.
+
+    columns (list[str]): only these columns (plus Date, needed for Week).
+    semesters (list[str]): only these semesters (default: every one with a cleaned file).
+
+    The files go through load_clean_data on a few threads, so each one is only ever parsed
+    once; the combined frame is kept until one of the files changes. Adding a semester
+    parses just that one file.
+    """
+    found = {}
+    for file_name in os.listdir(clean_data_folder):
+        parts = clean_file_parts(file_name)
+        if parts and parts[1] == type and (not semesters or parts[0] in semesters):
+            found[parts[0]] = os.path.join(clean_data_folder, file_name)
+    if not found:
+        raise FileNotFoundError(f"No {type} files in {clean_data_folder}")
+    names = sorted(found, key=semester_sort_key)
+
+    if columns is not None and "Date" not in columns:
+        columns = ["Date", *columns]
+    file_keys = []
+    for name in names:
+        stat = os.stat(_source_file(found[name]))
+        file_keys.append((os.path.abspath(found[name]), stat.st_mtime_ns, stat.st_size))
+    cache_key = (type, tuple(columns) if columns else None, tuple(names))
+
+    with _dataset_cache_lock:
+        cached = _semesters_cache.get(cache_key)
+    if cached is not None and cached[0] == file_keys:
+        return cached[1].copy(deep=False)
+
+    with ThreadPoolExecutor(max_workers=min(len(names), os.cpu_count() or 1)) as executor:
+        frames = list(executor.map(lambda name: _with_week(load_clean_data(found[name], columns)), names))
+    data = pd.concat(frames, keys=names, names=["Semester", None]).reset_index(level="Semester")
+    data["Semester"] = pd.Categorical(data["Semester"], categories=names, ordered=True)
+    for col in CATEGORY_COLUMNS:
+        if col in data.columns:
+            # the semesters' categories differ, so concat gave plain strings back
+            data[col] = data[col].astype(pd.CategoricalDtype(sorted(data[col].dropna().unique())))
+    data = data.reset_index(drop=True)
+
+    with _dataset_cache_lock:
+        _semesters_cache[cache_key] = (file_keys, data)
+    return data.copy(deep=False)
+
+
+#the site's chart style, which every chart used to copy in as BASE_FORMAT, AXIS_FORMAT and TITLE_FORMAT
+def _house_style() -> dict:
+    return {
+        'font': {'family': 'Droid Serif', 'color': 'black'},
+        'hoverlabel': {'font': {'color': 'white'}, 'bgcolor': 'black'},
+        'title': {'x': 0.5, 'xanchor': 'center', 'y': 0.85, 'font': {'size': 22}},
+        'xaxis': {'tickfont': {'size': 16}, 'title': {'font': {'size': 18}}},
+        'yaxis': {'tickfont': {'size': 16}, 'title': {'font': {'size': 18}}, 'gridcolor': 'rgba(128, 128, 128, 0.5)'},
+        'legend': {'tracegroupgap': 0},
+        'plot_bgcolor': 'white',
+        'paper_bgcolor': 'white',
+    }
+
+
+#template name -> the template as a plain dict, see _template
+_templates = {}
+
+
+def _template(name: str) -> dict:
+    """
+    A plotly template as a plain dict, built (and validated) once per process and then shared
+    by every figure. "uc" is plotly's default template plus _house_style (also registered as
+    pio.templates["uc"], for notebooks); any other name is one of plotly's own templates.
+    """
+    if name not in _templates:
+        if name == "uc":
+            template = go.layout.Template(pio.templates["plotly"])
+            template.layout.update(_house_style())
+            pio.templates["uc"] = template
+        else:
+            template = pio.templates[name]
+        _templates[name] = template.to_plotly_json()
+    return _templates[name]
+
+
+def _array(values):
+    """
+    Values for a trace in a figure dict. Numbers go out as base64 typed arrays, the way
+    go.Figure sends them, so big traces stay small. Anything else (names, dates) is a list.
+    """
+    values = values if isinstance(values, pd.Series) else pd.Series(values)
+    if not pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+        return values.tolist()
+    if pd.api.types.is_float_dtype(values.dtype) or values.isna().any():
+        array = values.to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        array = values.to_numpy(dtype="int64")
+        # plotly.js has no 64-bit integers, so use the smallest type that fits
+        for dtype in ("int8", "int16", "int32", "float64"):
+            if dtype == "float64" or (len(array) == 0 or np.iinfo(dtype).min <= array.min() <= array.max() <= np.iinfo(dtype).max):
+                array = array.astype(dtype)
+                break
+    return {'dtype': array.dtype.str[1:], 'bdata': base64.b64encode(array.astype(array.dtype.newbyteorder("<")).tobytes()).decode("ascii")}
+
+
+#chart function name -> how to build it (see register_chart), in the order they're defined below
+CHART_REGISTRY = {}
+#the sheet types with per-semester charts, in the order run_all_visualizations makes them
+SEMESTER_TYPES = ["video_games", "table_games", "board_games", "occupancy"]
+
+
+def register_chart(type, outputs: list[str], columns: list[str] | None = None, aggregates: list[str] = (),
+                   across_semesters: bool = False, template: str = "uc"):
+    """
+    Declares a chart. Put it on a figure builder:
+
+        @register_chart("table_games", ["table_games_pie_chart"], aggregates=["game_counts"])
+        def _table_game_rentals_pie_chart(game_counts):
+            return {'data': [...], 'layout': {...}}
+
+    and the name becomes the usual chart function, _table_game_rentals_pie_chart(filepath, semester_name),
+    which loads the data, builds the figure, shows it and saves <semester_name>_<output>.html.
+
+    type: the sheet type the data comes from ("video_games", "occupancy", ...)
+        (a list of them for an across_semesters chart)
+    outputs: the output file names, without the prefix and .html: one per figure the builder returns
+    columns: columns of the cleaned data the builder gets as `rows` (None: it doesn't need the rows)
+    aggregates: summary tables (see viz_aggregates.py) the builder gets as arguments of the same name
+    across_semesters: `rows` is every semester (load_semesters), and filepath is the clean data folder.
+        With several types, `rows` is a dict type -> data
+    template: the template the figures start from (see _template)
+
+    The builder returns a figure dict {'data': [...], 'layout': {...}}, or a list of them when there
+    are several outputs. It only sets what differs from the template.
+    """
+    def register(build):
+        spec = {"type": type, "outputs": outputs, "columns": columns, "aggregates": list(aggregates),
+                "across_semesters": across_semesters, "template": template, "build": build}
+        CHART_REGISTRY[build.__name__] = spec
+
+        def chart_function(filepath: str, semester_name: str = "") -> None:
+            _make_chart(spec, filepath, semester_name)
+
+        chart_function.__name__ = chart_function.__qualname__ = build.__name__
+        chart_function.__doc__ = build.__doc__
+        return chart_function
+
+    return register
+
+
+def _make_chart(spec: dict, filepath: str, semester_name: str = "") -> None:
+    with profiling.stage(f"{spec['build'].__name__} {os.path.basename(semester_name) or os.path.basename(filepath)}"):
+        # load what the chart asked for
+        data = {}
+        if spec["columns"] is not None:
+            with profiling.stage("load") as record:
+                if not spec["across_semesters"]:
+                    data["rows"] = load_clean_data(filepath, columns=spec["columns"])
+                    record["rows_out"] = len(data["rows"])
+                elif isinstance(spec["type"], list):
+                    data["rows"] = {type: load_semesters(type, spec["columns"], filepath) for type in spec["type"]}
+                    record["rows_out"] = sum(map(len, data["rows"].values()))
+                else:
+                    data["rows"] = load_semesters(spec["type"], spec["columns"], filepath)
+                    record["rows_out"] = len(data["rows"])
+        if spec["aggregates"]:
+            with profiling.stage("aggregate") as record:
+                for name in spec["aggregates"]:
+                    data[name] = load_aggregate(filepath, spec["type"], name)
+                record["rows_out"] = sum(len(data[name]) for name in spec["aggregates"])
+
+        with profiling.stage("build"):
+            figures = spec["build"](**data)
+            if isinstance(figures, dict):
+                figures = [figures]
+            for i, figure in enumerate(figures):
+                figure["layout"]["template"] = _template(spec["template"])
+                if not FAST_FIGURES:
+                    figures[i] = go.Figure(figure)  # checks every property, so a typo in a builder fails here
+
+        filename_prefix = f"{semester_name}_" if semester_name else ""
+        for figure, output in zip(figures, spec["outputs"]):
+            if SHOW_FIGURES:
+                with profiling.stage("show"):
+                    _show(figure)
+
+            # Save the visualization
+            output_filename = f"{filename_prefix}{output}.html"
+            with profiling.stage("write_html"):
+                _write_html(figure, output_filename)
+            print(f"Visualization saved as {output_filename}")
+
+
+def _run_charts(type: str, filepath: str, semester_name: str = "") -> None:
+    for spec in CHART_REGISTRY.values():
+        if spec["type"] == type and not spec["across_semesters"]:
+            _make_chart(spec, filepath, semester_name)
+
+
+def run_all_visualizations(semester_name: str = "f23", output_path: str = "../resources/viz/f23",
+                           parallel: bool = False, max_workers: int | None = None) -> None:
     """
     Runs all visualizations for video games, table games, board games, and occupancy.
     This function assumes all of the data is in ../clean_data/
@@ -26,13 +540,22 @@ def run_all_visualizations(semester_name: str = "f23", output_path: str = "../re
 
     since we put our viz in a different folder, you can tweak the output_path in this function too
     this is actually just the semester name, which is why it's "../resources/viz/f23" and not "../resources/viz/"
+
+    parallel=True builds the charts in a process pool without showing them (see viz_render.py),
+    max_workers is the size of that pool
     """
+    if parallel:
+        from viz_render import chart_jobs, render_jobs
+        render_jobs([(chart, filepath, output_path) for chart, filepath, _ in chart_jobs([semester_name], "../clean_data", types=SEMESTER_TYPES)],
+                    max_workers)
+        return
+
     print("\nStarting All Visualizations...\n")
 
-    run_video_game_visualizations("../clean_data/" + semester_name + "_video_games_cleaned.csv", output_path)
-    run_table_game_visualizations("../clean_data/" + semester_name + "_table_games_cleaned.csv", output_path)
-    run_board_game_visualizations("../clean_data/" + semester_name + "_board_games_cleaned.csv", output_path)
-    run_occupancy_visualizations("../clean_data/" + semester_name + "_occupancy_cleaned.csv", output_path)
+    for type in SEMESTER_TYPES:
+        print(f"\nRunning {type.replace('_', ' ').title()} Visualizations...")
+        _run_charts(type, "../clean_data/" + semester_name + f"_{type}_cleaned.csv", output_path)
+        print(f"{type.replace('_', ' ').title()} Visualizations Complete!\n")
 
     print("All Visualizations Complete!")
 
@@ -41,9 +564,7 @@ def run_video_game_visualizations(filepath: str, semester_name: str = "") -> Non
     Runs all video game-related visualizations.
     """
     print("\nRunning Video Game Visualizations...")
-    _rental_duration_by_console(filepath, semester_name)
-    _controllers_by_top_games(filepath, semester_name)
-    _video_game_rentals_pie_chart(filepath, semester_name)
+    _run_charts("video_games", filepath, semester_name)
     print("Video Game Visualizations Complete!\n")
 
 
@@ -52,9 +573,7 @@ def run_table_game_visualizations(filepath: str, semester_name: str = "") -> Non
     Runs all table game-related visualizations.
     """
     print("\nRunning Table Game Visualizations...")
-    _pool_table_duration_by_table(filepath, semester_name)
-    _table_game_rentals_pie_chart(filepath, semester_name)
-    _table_game_duration_distributions(filepath, semester_name)
+    _run_charts("table_games", filepath, semester_name)
     print("Table Game Visualizations Complete!\n")
 
 
@@ -63,8 +582,7 @@ def run_board_game_visualizations(filepath: str, semester_name: str = "") -> Non
     Runs all board game-related visualizations.
     """
     print("\nRunning Board Game Visualizations...")
-    _board_game_duration_distribution(filepath, semester_name)
-    _board_game_frequency_vs_duration(filepath, semester_name)
+    _run_charts("board_games", filepath, semester_name)
     print("Board Game Visualizations Complete!\n")
 
 
@@ -73,89 +591,61 @@ def run_occupancy_visualizations(filepath: str, semester_name: str = "") -> None
     Runs all occupancy-related visualizations.
     """
     print("\nRunning Occupancy Visualizations...")
-    _weekly_occupancy_trend(filepath, semester_name)
-    _occupancy_by_month_and_weekday(filepath, semester_name)
+    _run_charts("occupancy", filepath, semester_name)
     print("Occupancy Visualizations Complete!\n")
 
 
-def _rental_duration_by_console(filepath: str, semester_name: str = "") -> None:
+def _strip_box(data: pd.DataFrame, x: str, y: str) -> list:
+    # every duration as a point (what px.strip draws) plus a box over the same durations
+    return [
+        {'type': 'box', 'x': _array(data[x]), 'y': _array(data[y]), 'x0': ' ', 'y0': ' ',
+         'boxpoints': 'all', 'pointpos': 0, 'hoveron': 'points', 'fillcolor': 'rgba(255,255,255,0)',
+         'line': {'color': 'rgba(255,255,255,0)'}, 'marker': {'color': '#636efa', 'opacity': 0.3},
+         'hovertemplate': f'{x}=%{{x}}<br>{y}=%{{y}}<extra></extra>', 'name': '', 'showlegend': False,
+         'alignmentgroup': 'True', 'offsetgroup': '', 'legendgroup': '', 'orientation': 'v'},
+        {'type': 'box', 'x': _array(data[x]), 'y': _array(data[y]), 'hoverinfo': 'skip',
+         'marker': {'opacity': 0.5, 'color': 'green'}},
+    ]
+
+
+@register_chart("video_games", ["video_duration_by_console"], columns=["Console", "Duration (minutes)"],
+                aggregates=["console_durations"], template="plotly")
+def _rental_duration_by_console(rows, console_durations):
     """
     Generates a visualization of rental duration by console,
     """
-    # Load the CSV data
-    data = pd.read_csv(filepath)
-
     # Clean the data: remove rows with missing or invalid durations
-    data = data.dropna(subset=["Console", "Duration (minutes)"])  # Ensure required columns are not null
+    data = rows.dropna(subset=["Console", "Duration (minutes)"])  # Ensure required columns are not null
     data = data[data["Duration (minutes)"] > 0]  # Keep only positive durations
 
-    # Define graph configurations
-    xaxis_format = {
-        'title': None,
-        'tickmode': 'array',
-    }
-    yaxis_format = {
-        'title': 'Duration (minutes)',
-        'gridcolor': 'rgba(128, 128, 128, 0.4)',
-    }
-    FIG_SIZE = {'width': 600, 'height': 400}
-    BASE_FORMAT = {}  # Define your BASE_FORMAT if applicable
-    TITLE_FORMAT = {}  # Define your TITLE_FORMAT if applicable
-    PLOT_COLOR = 'rgba(255,255,255,1)'  # Default background color
-    PAPER_COLOR = 'rgba(255,255,255,1)'  # Default paper color
-
-    # Create the strip plot
-    fig = px.strip(
-        **FIG_SIZE,
-        data_frame=data,
-        x='Console',
-        y='Duration (minutes)',
-        stripmode='overlay',
-        title='Rental Duration by Console',  # Title is now generic
-    )
-    fig.update_traces(marker=dict(opacity=0.3))
-
-    # Add a box plot trace
-    box = go.Box(
-        x=data['Console'],
-        y=data['Duration (minutes)'],
-        hoverinfo='skip',
-        marker={'opacity': 0.5, 'color': 'green'},
-    )
-    fig.add_trace(box)
-
-    # Update trace and layout
-    fig.update_traces(marker={'color': 'blue'}, selector={'name': 'strip'})
-    fig.update_layout(
-        **BASE_FORMAT,
-        **FIG_SIZE,
-        xaxis=xaxis_format,
-        yaxis=yaxis_format,
-        title=TITLE_FORMAT,
-        plot_bgcolor=PLOT_COLOR,
-        paper_bgcolor=PAPER_COLOR,
-        showlegend=False,
-    )
-
-    # Show the figure
-    fig.show()
-
-    # Save the visualization
-    filename_prefix = f"{semester_name}_" if semester_name else ""
-    output_filename = f"{filename_prefix}video_duration_by_console.html"
-    fig.write_html(output_filename)
-    print(f"Visualization saved as {output_filename}")
-
-
-
-def _controllers_by_top_games(filepath: str, semester_name: str = "") -> None:
+    xaxis_format = {'tickmode': 'array'}
+    if _use_scalable_strips(len(data)):
+        # precomputed boxes + a sampled WebGL strip, consoles in order of first rental like the full chart
+        consoles = list(data['Console'].unique())
+        traces = _scalable_strip_box(data, 'Console', 'Duration (minutes)', console_durations,
+                                     {console: i for i, console in enumerate(consoles)})
+        xaxis_format.update(tickvals=list(range(len(consoles))), ticktext=consoles)
+    else:
+        traces = _strip_box(data, 'Console', 'Duration (minutes)')
+
+    return {'data': traces, 'layout': {
+        'title': {'text': 'Rental Duration by Console'},
+        'width': 600, 'height': 400,
+        'xaxis': xaxis_format,
+        'yaxis': {'title': {'text': 'Duration (minutes)'}, 'gridcolor': 'rgba(128, 128, 128, 0.4)'},
+        'boxmode': 'overlay',
+        'plot_bgcolor': 'rgba(255,255,255,1)',
+        'paper_bgcolor': 'rgba(255,255,255,1)',
+        'showlegend': False,
+        'legend': {'tracegroupgap': 0},
+    }}
+
+
+@register_chart("video_games", ["controller_by_top_game"], aggregates=["rentals"], template="plotly")
+def _controllers_by_top_games(rentals):
     """
     Generates a bar chart of controllers rented for the top 5 most rented games.
     """
-    # Load the CSV data
-    data = pd.read_csv(filepath)
-
-    # Clean and preprocess data
     # Convert '# of Controllers' to integers where possible, and label non-integer values as "Other"
     def parse_controllers(value):
         try:
@@ -163,73 +653,55 @@ def _controllers_by_top_games(filepath: str, semester_name: str = "") -> None:
         except ValueError:
             return "Other"
 
-    data['# of Controllers'] = data['# of Controllers'].apply(parse_controllers)
+    data = rentals.assign(**{'# of Controllers': rentals['# of Controllers'].apply(parse_controllers)})
 
     # Count the frequency of rentals for each game
-    game_counts = data.groupby(['Game', '# of Controllers']).size().reset_index(name='Frequency')
+    game_counts = data.groupby(['Game', '# of Controllers'])['Rentals'].sum().reset_index(name='Frequency')
 
     # Get the top 5 most rented games
-    top_games = (
-        game_counts.groupby('Game')['Frequency']
-        .sum()
-        .sort_values(ascending=False)
-        .head(5)
-        .index
-    )
-
-    # Filter data for the top 5 games
+    top_games = game_counts.groupby('Game')['Frequency'].sum().sort_values(ascending=False).head(5).index
     top_data = game_counts[game_counts['Game'].isin(top_games)]
 
-    # Plot the data
-    FIG_SIZE = {'width': 600, 'height': 400}
-    BASE_FORMAT = {
-        'font_color': 'black',
-        'hoverlabel': {'font_color': 'white', 'bgcolor': 'black'}
+    colors = plotly.colors.sequential.Plasma_r
+    bar = {'type': 'bar', 'hovertemplate': 'Frequency = %{y}', 'alignmentgroup': 'True', 'orientation': 'v',
+           'textposition': 'auto'}
+    layout = {
+        'title': {'text': 'Controllers Rented, for the top 5 titles', 'x': 0.5, 'xanchor': 'center', 'font': {'size': 22}, 'y': 0.85},
+        'width': 600, 'height': 400,
+        'font': {'family': 'Droid Sans', 'color': 'black'},
+        'hoverlabel': {'font': {'color': 'white'}, 'bgcolor': 'black'},
+        'xaxis': {'title': {'text': ''}},
+        'yaxis': {'title': {'text': 'Frequency'}},
+        'barmode': 'group',
+        'legend': {'tracegroupgap': 0},
     }
-
-    fig = px.bar(
-        **FIG_SIZE,
-        data_frame=top_data,
-        x='Game',
-        y='Frequency',
-        color='# of Controllers',
-        title='Controllers Rented, for the top 5 titles',
-        barmode="group",
-        color_discrete_sequence=px.colors.sequential.Plasma_r
-    )
-
-    fig.update_traces(hovertemplate='Frequency = %{y}')
-    fig.update_layout(
-        **BASE_FORMAT,
-        font_family='Droid Sans',
-        title={'x': 0.5, 'xanchor': 'center', 'font_size': 22, 'y': 0.85}
-    )
-    fig.update_xaxes(title='')
-    fig.update_layout(barmode='group')  # Change to side-by-side bars
-
-    # Show the figure
-    fig.show()
-
-    # Save the visualization
-    filename_prefix = f"{semester_name}_" if semester_name else ""
-    output_filename = f"{filename_prefix}controller_by_top_game.html"
-    fig.write_html(output_filename)
-    print(f"Visualization saved as {output_filename}")
-
-
-
-
-
-def _video_game_rentals_pie_chart(filepath: str, semester_name: str = "") -> None:
+    if pd.api.types.is_numeric_dtype(top_data['# of Controllers']):
+        # numbers only: one trace, colored on a continuous scale
+        traces = [{**bar, 'x': _array(top_data['Game']), 'y': _array(top_data['Frequency']), 'name': '',
+                   'marker': {'color': _array(top_data['# of Controllers']), 'coloraxis': 'coloraxis'},
+                   'offsetgroup': '', 'legendgroup': '', 'showlegend': False}]
+        # (the scale is the template's sequential one, like px.bar picks for numbers)
+        layout['coloraxis'] = {'colorbar': {'title': {'text': '# of Controllers'}}}
+    else:
+        # an "Other" in there: one trace per number of controllers, like px does
+        traces = []
+        for i, (controllers, group) in enumerate(top_data.groupby('# of Controllers', sort=False)):
+            traces.append({**bar, 'x': _array(group['Game']), 'y': _array(group['Frequency']), 'name': str(controllers),
+                           'marker': {'color': colors[i % len(colors)]}, 'offsetgroup': str(controllers),
+                           'legendgroup': str(controllers), 'showlegend': True})
+        layout['legend']['title'] = {'text': '# of Controllers'}
+    return {'data': traces, 'layout': layout}
+
+
+@register_chart("video_games", ["games_pie_chart_divided"], aggregates=["rentals"], template="plotly")
+def _video_game_rentals_pie_chart(rentals):
     """
     Generates pie charts of video game rentals by console (Xbox and Wii).
     """
-    # Load data
-    data = pd.read_csv(filepath)
-
-    # Initialize Counters to count occurrences of each video game for each console
-    xbox_rentals = Counter(data.loc[data['Console'] == 'Xbox', 'Game'])
-    wii_rentals = Counter(data.loc[data['Console'] == 'Wii', 'Game'])
+    # Count the rentals of each video game for each console (games in order of first rental)
+    def console_counts(console):
+        games = rentals[rentals['Console'] == console].groupby('Game', sort=False, dropna=False)['Rentals'].sum()
+        return Counter({game: int(count) for game, count in games.items()})
 
     # Helper function to group "Other" games
     def process_counts(counter):
@@ -244,761 +716,325 @@ def _video_game_rentals_pie_chart(filepath: str, semester_name: str = "") -> Non
             final_counts['Other'] = other_count
         return final_counts
 
-    # Process counts for Xbox and Wii
-    xbox_final_counts = process_counts(xbox_rentals)
-    wii_final_counts = process_counts(wii_rentals)
-
-    # Create a subplot with 1 row and 2 columns for pie charts
-    fig = make_subplots(
-        rows=1, cols=2, specs=[[{'type': 'domain'}, {'type': 'domain'}]],
-        subplot_titles=(f"Xbox Rentals ({sum(xbox_final_counts.values())} total)",
-                        f"Wii Rentals ({sum(wii_final_counts.values())} total)")
-    )
-
-    # Add Xbox pie chart
-    fig.add_trace(go.Pie(
-        labels=list(xbox_final_counts.keys()), 
-        values=list(xbox_final_counts.values()),
-        text=[f"{game}<br>{count} rentals" for game, count in xbox_final_counts.items()],
-        textinfo='text+percent',
-        textfont=dict(size=15),
-        textposition='inside'
-    ), row=1, col=1)
-
-    # Add Wii pie chart
-    fig.add_trace(go.Pie(
-        labels=list(wii_final_counts.keys()), 
-        values=list(wii_final_counts.values()),
-        text=[f"{game}<br>{count} rentals" for game, count in wii_final_counts.items()],
-        textinfo='text+percent',
-        textfont=dict(size=15),
-        textposition='inside'
-    ), row=1, col=2)
-
-    # Update layout
-    fig.update_layout(
-        font_family='Droid Serif',
-        font_color='black',
-        hoverlabel=dict(font_color='white', bgcolor='black'),
-        title_text='Video Game Rentals by Console',
-        width=850,
-        height=500,
-        title_font_size=30,
-        showlegend=False,
-        margin=dict(l=20, r=20, t=140, b=20)
-    )
-
-    fig.add_annotation(
-        text="The \"Other\" category combines games rented less than five times.",
-        align='left',
-        showarrow=False,
-        xref='paper',
-        yref='paper',
-        x=0.026,
-        y=1.19,
-        font=dict(size=18)
-    )
-
-    # Show the figure
-    fig.show()
-
-    # Save the visualization
-    filename_prefix = f"{semester_name}_" if semester_name else ""
-    output_filename = f"{filename_prefix}games_pie_chart_divided.html"
-    fig.write_html(output_filename)
-    print(f"Visualization saved as {output_filename}")
-
-
-
-def _board_game_duration_distribution(filepath: str, semester_name: str = "") -> None:
+    # One pie per console, side by side (the domains and titles make_subplots would give them)
+    traces, annotations = [], []
+    for console, domain in [('Xbox', [0.0, 0.45]), ('Wii', [0.55, 1.0])]:
+        counts = process_counts(console_counts(console))
+        traces.append({
+            'type': 'pie',
+            'labels': list(counts.keys()),
+            'values': list(counts.values()),
+            'text': [f"{game}<br>{count} rentals" for game, count in counts.items()],
+            'textinfo': 'text+percent',
+            'textfont': {'size': 15},
+            'textposition': 'inside',
+            'domain': {'x': domain, 'y': [0.0, 1.0]},
+        })
+        annotations.append({'text': f"{console} Rentals ({sum(counts.values())} total)", 'font': {'size': 16},
+                            'showarrow': False, 'x': sum(domain) / 2, 'xanchor': 'center', 'xref': 'paper',
+                            'y': 1.0, 'yanchor': 'bottom', 'yref': 'paper'})
+    annotations.append({'text': "The \"Other\" category combines games rented less than five times.",
+                        'align': 'left', 'showarrow': False, 'xref': 'paper', 'yref': 'paper',
+                        'x': 0.026, 'y': 1.19, 'font': {'size': 18}})
+
+    return {'data': traces, 'layout': {
+        'title': {'text': 'Video Game Rentals by Console', 'font': {'size': 30}},
+        'width': 850, 'height': 500,
+        'font': {'family': 'Droid Serif', 'color': 'black'},
+        'hoverlabel': {'font': {'color': 'white'}, 'bgcolor': 'black'},
+        'showlegend': False,
+        'margin': {'l': 20, 'r': 20, 't': 140, 'b': 20},
+        'annotations': annotations,
+    }}
+
+
+@register_chart("board_games", ["board_game_duration_distribution"], columns=["Duration (minutes)"])
+def _board_game_duration_distribution(rows):
     """
     Generates a histogram of board game usage durations.
     """
-    # Load data
-    data = pd.read_csv(filepath)
-
     # Clean and preprocess data: remove rows with invalid or missing durations
-    data = data.dropna(subset=["Duration (minutes)"])  # Ensure no missing durations
+    data = rows.dropna(subset=["Duration (minutes)"])  # Ensure no missing durations
     data = data[data["Duration (minutes)"] > 0]  # Keep only positive durations
 
-    # Define configurations
-    FIG_SIZE = {'width': 600, 'height': 400}
-    TICK_SIZE = 16
-    LABEL_SIZE = 18
-    TITLE_SIZE = 22
-
-    PLOT_COLOR = 'white'
-    PAPER_COLOR = 'white'
-
-    BASE_FORMAT = {'font_family': 'Droid Serif',
-                   'font_color': 'black',
-                   'hoverlabel': {'font_color': 'white', 'bgcolor': 'black'}
-                  }
-
-    AXIS_FORMAT = {'tickfont_size': TICK_SIZE,
-                   'title_font_size': LABEL_SIZE
-                  }
-
-    TITLE_FORMAT = {'x': 0.5,
-                    'xanchor': 'center',
-                    'font_size': TITLE_SIZE,
-                    'y': 0.85
-                   }
-
-    xaxis_format = {**AXIS_FORMAT,
-                    'title': 'Duration (minutes)',
-                    'tickmode': 'array',
-                    'tickvals': list(range(0, int(data['Duration (minutes)'].max()), 25))
-                   }
-
-    yaxis_format = {**AXIS_FORMAT,
-                    'title': '# of Checkouts',
-                    'gridcolor': 'rgba(128, 128, 128, 0.5)'
-                   }
-
-    # Create the histogram
-    fig = px.histogram(
-        **FIG_SIZE,
-        data_frame=data,
-        x='Duration (minutes)',
-        title='Board Game Usage Time Trend'
-    )
-
-    # Update layout
-    fig.update_layout(
-        **BASE_FORMAT,
-        **FIG_SIZE,
-        xaxis=xaxis_format,
-        yaxis=yaxis_format,
-        title=TITLE_FORMAT,
-        plot_bgcolor=PLOT_COLOR,
-        paper_bgcolor=PAPER_COLOR,
-        bargap=0.1,
-        showlegend=False
-    )
-
-    # Show the figure
-    fig.show()
-
-    # Save the visualization
-    filename_prefix = f"{semester_name}_" if semester_name else ""
-    output_filename = f"{filename_prefix}board_game_duration_distribution.html"
-    fig.write_html(output_filename)
-    print(f"Visualization saved as {output_filename}")
-
-
-
-def _board_game_frequency_vs_duration(filepath: str, semester_name: str = "") -> None:
+    return {'data': [{
+        'type': 'histogram', 'x': _array(data['Duration (minutes)']), 'bingroup': 'x',
+        'hovertemplate': 'Duration (minutes)=%{x}<br>count=%{y}<extra></extra>',
+        'marker': {'color': '#636efa'}, 'name': '', 'showlegend': False, 'orientation': 'v',
+    }], 'layout': {
+        'title': {'text': 'Board Game Usage Time Trend'},
+        'width': 600, 'height': 400,
+        'xaxis': {'title': {'text': 'Duration (minutes)'}, 'tickmode': 'array',
+                  'tickvals': list(range(0, int(data['Duration (minutes)'].max()), 25))},
+        'yaxis': {'title': {'text': '# of Checkouts'}},
+        'bargap': 0.1,
+        'showlegend': False,
+    }}
+
+
+@register_chart("board_games", ["board_game_frequency_vs_avr_duration"], aggregates=["game_durations"])
+def _board_game_frequency_vs_duration(game_durations):
     """
     Generates a scatter plot showing the frequency and average duration of each board game.
     """
-    # Load data
-    data = pd.read_csv(filepath)
-
-    # Clean and preprocess data
-    data = data.dropna(subset=["Game", "Duration (minutes)"])  # Remove rows with missing values
-    data = data[data["Duration (minutes)"] > 0]  # Keep only positive durations
-
-    # Calculate frequency and average duration per game
-    aggregated_data = (
-        data.groupby("Game")["Duration (minutes)"]
-        .agg(Frequency="count", Average_Duration="mean")
-        .reset_index()
-    )
-
-    # Define configurations
-    FIG_SIZE = {'width': 600, 'height': 500}
-    TICK_SIZE = 14
-    LABEL_SIZE = 18
-    TITLE_SIZE = 22
-
-    PLOT_COLOR = 'white'
-    PAPER_COLOR = 'white'
-
-    BASE_FORMAT = {'font_family': 'Droid Serif',
-                   'font_color': 'black',
-                   'hoverlabel': {'font_color': 'white', 'bgcolor': 'black'}
-                  }
-
-    AXIS_FORMAT = {'tickfont_size': TICK_SIZE,
-                   'title_font_size': LABEL_SIZE
-                  }
-
-    TITLE_FORMAT = {'x': 0.49,
-                    'xanchor': 'center',
-                    'font_size': TITLE_SIZE,
-                    'y': 0.94
-                   }
-
-    xaxis_format = {**AXIS_FORMAT,
-                    'title': 'Average Duration (minutes)'
-                   }
-
-    yaxis_format = {**AXIS_FORMAT,
-                    'title': 'Frequency (log scale)',
-                    'type': 'log',
-                    'gridcolor': 'rgba(128, 128, 128, 0.5)'
-                   }
-
-    # Create scatter plot
-    fig = px.scatter(
-        width=FIG_SIZE['width'],
-        height=FIG_SIZE['height'],
-        data_frame=aggregated_data,
-        x='Average_Duration',
-        y='Frequency',
-        color='Game',
-        hover_name='Game',
-        color_discrete_sequence=['blue', 'red', 'green', 'purple', 'orange', 'cyan', 'magenta', 'yellow', 'lime', 'pink', 'teal', 'lavender', 'brown', 'grey', 'olive']
-    )
-
-    fig.update_traces(marker=dict(size=20))
-
-    # Update layout
-    fig.update_layout(
-        **BASE_FORMAT,
-        **FIG_SIZE,
-        xaxis=xaxis_format,
-        yaxis=yaxis_format,
-        title={'text': 'Frequency and Average Duration of Each Game', **TITLE_FORMAT},
-        plot_bgcolor=PLOT_COLOR,
-        paper_bgcolor=PAPER_COLOR,
-        showlegend=True
-    )
-
-    # Show the figure
-    fig.show()
-
-    # Save the visualization
-    filename_prefix = f"{semester_name}_" if semester_name else ""
-    output_filename = f"{filename_prefix}board_game_frequency_vs_avr_duration.html"
-    fig.write_html(output_filename)
-    print(f"Visualization saved as {output_filename}")
+    # Frequency and average duration per game (positive durations only)
+    colors = ['blue', 'red', 'green', 'purple', 'orange', 'cyan', 'magenta', 'yellow', 'lime', 'pink', 'teal', 'lavender', 'brown', 'grey', 'olive']
+    traces = []
+    for i, row in enumerate(game_durations.itertuples(index=False)):
+        traces.append({
+            'type': 'scatter', 'mode': 'markers', 'x': [row.Mean], 'y': [row.Rentals], 'hovertext': [row.Game],
+            'hovertemplate': f'<b>%{{hovertext}}</b><br><br>Game={row.Game}<br>Average_Duration=%{{x}}<br>Frequency=%{{y}}<extra></extra>',
+            'name': row.Game, 'legendgroup': row.Game, 'showlegend': True, 'orientation': 'v',
+            'marker': {'color': colors[i % len(colors)], 'symbol': 'circle', 'size': 20},
+        })
 
+    return {'data': traces, 'layout': {
+        'title': {'text': 'Frequency and Average Duration of Each Game', 'x': 0.49, 'y': 0.94},
+        'width': 600, 'height': 500,
+        'margin': {'t': 60},
+        'xaxis': {'title': {'text': 'Average Duration (minutes)'}, 'tickfont': {'size': 14}},
+        'yaxis': {'title': {'text': 'Frequency (log scale)'}, 'tickfont': {'size': 14}, 'type': 'log'},
+        'legend': {'title': {'text': 'Game'}},
+        'showlegend': True,
+    }}
 
 
-def _pool_table_duration_by_table(filepath: str, semester_name: str = "") -> None:
+@register_chart("table_games", ["pool_duration_by_table_number"], columns=["Table Game", "Pool Table #", "Duration (minutes)"],
+                aggregates=["pool_table_durations"])
+def _pool_table_duration_by_table(rows, pool_table_durations):
     """
     Generates a visualization of Pool Table rental durations by table number.
     """
-    # Load data
-    data = pd.read_csv(filepath)
-
     # Filter data for Pool games only
-    pool_data = data[data["Table Game"] == "Pool"]
-
-    # Add "Adjusted Duration" column (for log scale, add 1 to all durations if needed)
-    pool_data = pool_data.copy()
-    pool_data["Adjusted Duration"] = pool_data["Duration (minutes)"]
-
-    # Define configurations
-    FIG_SIZE = {'width': 800, 'height': 400}
-    TICK_SIZE = 16
-    LABEL_SIZE = 18
-    TITLE_SIZE = 22
-
-    PLOT_COLOR = 'white'
-    PAPER_COLOR = 'white'
-
-    BASE_FORMAT = {'font_family': 'Droid Serif',
-                   'font_color': 'black',
-                   'hoverlabel': {'font_color': 'white', 'bgcolor': 'black'}
-                  }
-
-    AXIS_FORMAT = {'tickfont_size': TICK_SIZE,
-                   'title_font_size': LABEL_SIZE
-                  }
-
-    TITLE_FORMAT = {'x': 0.5,
-                    'xanchor': 'center',
-                    'font_size': TITLE_SIZE,
-                    'y': 0.85
-                   }
-
-    xaxis_format = {**AXIS_FORMAT,
-                    'title': None,
-                    'tickmode': 'array',
-                    'tickvals': pool_data['Pool Table #'].unique(),
-                    'ticktext': ['Table {}'.format(num) for num in pool_data['Pool Table #'].unique()]
-                   }
-
-    yaxis_format = {**AXIS_FORMAT,
-                    'title': 'Duration (log scale)',
-                    'gridcolor': 'rgba(128, 128, 128, 0.4)'
-                   }
-
-    # Create the strip plot
-    fig = px.strip(
-        **FIG_SIZE,
-        data_frame=pool_data,
-        x='Pool Table #',
-        y='Adjusted Duration',
-        stripmode='overlay',
-        title='Pool Table Rental Duration'
-    )
-
-    fig.update_traces(marker=dict(opacity=0.3))
-
-    # Add a box plot trace
-    box = go.Box(
-        x=pool_data['Pool Table #'],
-        y=pool_data['Adjusted Duration'],
-        hoverinfo='skip',
-        marker={'opacity': 0.5, 'color': 'green'}
-    )
-
-    fig.add_trace(box)
-
-    # Update trace and layout
-    fig.update_traces(marker={'color': 'blue'}, selector={'name': 'strip'})
-    fig.update_layout(
-        **BASE_FORMAT,
-        **FIG_SIZE,
-        xaxis=xaxis_format,
-        yaxis=yaxis_format,
-        title=TITLE_FORMAT,
-        plot_bgcolor=PLOT_COLOR,
-        paper_bgcolor=PAPER_COLOR,
-        showlegend=False
-    )
-
-    fig.update_yaxes(type='log')  # Set y-axis to log scale
-
-    # Show the figure
-    fig.show()
-
-    # Save the visualization
-    filename_prefix = f"{semester_name}_" if semester_name else ""
-    output_filename = f"{filename_prefix}pool_duration_by_table_number.html"
-    fig.write_html(output_filename)
-    print(f"Visualization saved as {output_filename}")
-
-
-def _table_game_rentals_pie_chart(filepath: str, semester_name: str = "") -> None:
+    pool_data = rows[rows["Table Game"] == "Pool"].rename(columns={"Duration (minutes)": "Adjusted Duration"})
+    tables = pool_data['Pool Table #'].unique()
+
+    if _use_scalable_strips(len(pool_data)):
+        # precomputed boxes + a sampled WebGL strip; the table numbers are already numeric positions
+        # (the boxes only count positive durations, which are all a log axis can show anyway)
+        traces = _scalable_strip_box(pool_data, 'Pool Table #', 'Adjusted Duration', pool_table_durations,
+                                     {num: num for num in pool_data['Pool Table #'].dropna().unique()})
+    else:
+        traces = _strip_box(pool_data, 'Pool Table #', 'Adjusted Duration')
+
+    return {'data': traces, 'layout': {
+        'title': {'text': 'Pool Table Rental Duration'},
+        'width': 800, 'height': 400,
+        'xaxis': {'tickmode': 'array', 'tickvals': _array(tables), 'ticktext': ['Table {}'.format(num) for num in tables]},
+        'yaxis': {'title': {'text': 'Duration (log scale)'}, 'type': 'log'},
+        'boxmode': 'overlay',
+        'showlegend': False,
+    }}
+
+
+@register_chart("table_games", ["table_games_pie_chart"], aggregates=["game_counts"])
+def _table_game_rentals_pie_chart(game_counts):
     """
     Generates a pie chart of table game rentals by game type.
     """
-    # Load data
-    data = pd.read_csv(filepath)
-
-    # Aggregate the counts of each game
-    game_counts = data['Table Game'].value_counts()
-
-    # Creating custom text for each slice
-    custom_text = [f"{game}<br>{count} rentals" for game, count in game_counts.items()]
-
-    # Plotting the pie chart
-    fig = go.Figure(data=[go.Pie(
-        labels=game_counts.index, 
-        values=game_counts.values,
-        text=custom_text,  # Use custom text for each slice
-        textinfo='text+percent',  # Display custom text and percent
-        textfont=dict(size=15),  # Specify the text font size
-    )])
-
-    # Define configurations
-    FIG_SIZE = {'width': 600, 'height': 400}
-    TITLE_SIZE = 22
-
-    PLOT_COLOR = 'white'
-    PAPER_COLOR = 'white'
-
-    BASE_FORMAT = {'font_family': 'Droid Serif',
-                   'font_color': 'black',
-                   'hoverlabel': {'font_color': 'white', 'bgcolor': 'black'}
-                  }
-
-    TITLE_FORMAT = {'x': 0.4,
-                    'xanchor': 'center',
-                    'font_size': TITLE_SIZE,
-                    'y': 0.91
-                   }
-
-    # Update layout with provided formatting parameters
-    fig.update_layout(
-        **BASE_FORMAT,
-        **FIG_SIZE,
-        title={**TITLE_FORMAT, 'text': 'Table Game Rentals by Game Type'},
-        plot_bgcolor=PLOT_COLOR,
-        paper_bgcolor=PAPER_COLOR,
-        showlegend=False,
-        margin=dict(l=20, r=20, t=100, b=20)  # Adjust margins if necessary
-    )
-
-    # Show the pie chart
-    fig.show()
-
-    # Save the visualization
-    filename_prefix = f"{semester_name}_" if semester_name else ""
-    output_filename = f"{filename_prefix}table_games_pie_chart.html"
-    fig.write_html(output_filename)
-    print(f"Visualization saved as {output_filename}")
-
-
-
-
-
-# def _table_game_duration_distributions(filepath: str, semester_name: str = "") -> None:
-#     """
-#     Generates histogram-like bar charts for Air Hockey, Foosball, and Shuffleboard.
-#     Manually bins data into fixed 5-minute intervals (0-4, 5-9, ..., 125-129).
-#     """
-#     # Load data
-#     data = pd.read_csv(filepath)
-
-#     # Filter for the specific games
-#     table_games = ["Air Hockey", "Foosball", "Shuffleboard"]
-
-#     # Define bins: Fixed width of 5 minutes
-#     bins = list(range(0, 130, 5))  # Bin edges: 0, 5, 10, ..., 125, 130
-#     bin_labels = [f"{i}-{i+4}" for i in range(0, 125, 5)]  # Labels: 0-4, 5-9, ..., 125-129
-
-#     # Visualization parameters
-#     FIG_SIZE = {'width': 600, 'height': 400}
-#     TICK_SIZE = 16
-#     LABEL_SIZE = 18
-#     TITLE_SIZE = 22
-
-#     BASE_FORMAT = {'font_family': 'Droid Serif',
-#                    'font_color': 'black',
-#                    'hoverlabel': {'font_color': 'white', 'bgcolor': 'black'}}
-
-#     AXIS_FORMAT = {'tickfont_size': TICK_SIZE, 'title_font_size': LABEL_SIZE}
-#     TITLE_FORMAT = {'x': 0.5, 'xanchor': 'center', 'font_size': TITLE_SIZE, 'y': 0.85}
-
-#     for game in table_games:
-#         # Filter and copy data for the specific game
-#         game_data = data[data["Table Game"] == game].copy()
-
-#         # Bin the data using pd.cut
-#         game_data["Duration Bin"] = pd.cut(
-#             game_data["Duration (minutes)"], bins=bins, labels=bin_labels, include_lowest=True, right=False
-#         )
-
-#         # Aggregate counts for each bin
-#         bin_counts = game_data["Duration Bin"].value_counts().sort_index()
-
-#         # Convert to DataFrame for plotting
-#         plot_data = pd.DataFrame({
-#             "Duration Bin": bin_counts.index,
-#             "# of Checkouts": bin_counts.values
-#         })
-
-#         # Create bar chart
-#         fig = px.bar(
-#             plot_data,
-#             x="Duration Bin",
-#             y="# of Checkouts",
-#             title=f"{game} Usage Time Trend",
-#             **FIG_SIZE
-#         )
-
-#         # Customize layout
-#         fig.update_layout(
-#             **BASE_FORMAT,
-#             xaxis={
-#                 **AXIS_FORMAT,
-#                 'tickmode': 'array',
-#                 'tickvals': [0, 25, 50, 75, 100, 125],  # Custom ticks
-#                 'ticktext': ['0', '25', '50', '75', '100', '125'],  # Labels
-#                 'title': {'text': 'Duration (minutes)', 'font_size': LABEL_SIZE}
-#             },
-#             yaxis={
-#                 **AXIS_FORMAT,
-#                 'gridcolor': 'rgba(128, 128, 128, 0.5)',
-#                 'title': {'text': '# of Checkouts', 'font_size': LABEL_SIZE}
-#             },
-#             title=TITLE_FORMAT,
-#             bargap=0.1,
-#             plot_bgcolor="white",
-#             paper_bgcolor="white",
-#             showlegend=False
-#         )
-
-#         # Show and save the chart
-#         fig.show()
-#         filename_prefix = f"{semester_name}_" if semester_name else ""
-#         output_filename = f"{filename_prefix}{game.lower().replace(' ', '_')}_usage_trend.html"
-#         fig.write_html(output_filename)
-#         print(f"Visualization saved as {output_filename}")
-
-
-import pandas as pd
-import plotly.express as px
-
-def _table_game_duration_distributions(filepath: str, semester_name: str = "") -> None:
+    # Counts of each game, most rented first
+    return {'data': [{
+        'type': 'pie',
+        'labels': _array(game_counts['Table Game']),
+        'values': _array(game_counts['Rentals']),
+        'text': [f"{game}<br>{count} rentals" for game, count in zip(game_counts['Table Game'], game_counts['Rentals'])],
+        'textinfo': 'text+percent',  # Display custom text and percent
+        'textfont': {'size': 15},
+    }], 'layout': {
+        'title': {'text': 'Table Game Rentals by Game Type', 'x': 0.4, 'y': 0.91},
+        'width': 600, 'height': 400,
+        'showlegend': False,
+        'margin': {'l': 20, 'r': 20, 't': 100, 'b': 20},
+    }}
+
+
+TABLE_GAMES_BY_DURATION = ['Air Hockey', 'Foosball', 'Shuffleboard']
+
+
+@register_chart("table_games", [f"{game.lower().replace(' ', '_')}_usage_trend" for game in TABLE_GAMES_BY_DURATION],
+                aggregates=["rentals_by_duration"])
+def _table_game_duration_distributions(rentals_by_duration):
     """
     Generates THREE histogram visualizations for game duration distributions.
     """
-    # Visualization parameters
-    FIG_SIZE = {'width': 600, 'height': 400}
-    TICK_SIZE = 16
-    LABEL_SIZE = 18
-    TITLE_SIZE = 22
-    PLOT_COLOR = 'white'
-    PAPER_COLOR = 'white'
-    
-    BASE_FORMAT = {
-        'font_family': 'Droid Serif',
-        'font_color': 'black',
-        'hoverlabel': {
-            'font_color': 'white',
-            'bgcolor': 'black'
-        }
-    }
-    
-    AXIS_FORMAT = {
-        'tickfont_size': TICK_SIZE,
-        'title_font_size': LABEL_SIZE
-    }
-    
-    TITLE_FORMAT = {
-        'x': 0.5,
-        'xanchor': 'center',
-        'font_size': TITLE_SIZE,
-        'y': 0.85
-    }
-    
-    # Load data
-    data = pd.read_csv(filepath)
-    
-    # List of games to process
-    games = ['Air Hockey', 'Foosball', 'Shuffleboard']
-    
     # Define consistent bin edges
     bin_edges = list(range(0, 130, 5))
     bin_labels = [f'{start}-{start+4}' for start in range(0, 125, 5)]
-    
-    for game in games:
-        # Filter data for the specific game and create a copy
-        game_data = data[data['Table Game'] == game].copy()
-        
-        # Bin the durations, filtering out outliers
-        game_data.loc[:, 'Binned Duration'] = pd.cut(
-            game_data['Duration (minutes)'], 
-            bins=bin_edges, 
-            labels=bin_labels, 
-            right=False
-        )
-        
-        # Count occurrences in each bin
-        binned_counts = game_data['Binned Duration'].value_counts().sort_index()
-        
-        # Create DataFrame for plotting
-        plot_data = pd.DataFrame({
-            'Duration': binned_counts.index,
-            'Count': binned_counts.values
-        })
-        
-        # Create bar plot instead of histogram to have more control
-        fig = px.bar(
-            plot_data, 
-            x='Duration', 
-            y='Count',
-            title=f'{game} Usage Time Trend',
-            labels={'Duration': 'Duration (minutes)', 'Count': '# of Checkouts'}
-        )
-        
-        # Customize layout
-        fig.update_layout(
-            **BASE_FORMAT,
-            **FIG_SIZE,
-            bargap=0.1,
-            xaxis={
-                **AXIS_FORMAT,
+
+    figures = []
+    for game in TABLE_GAMES_BY_DURATION:
+        game_data = rentals_by_duration[rentals_by_duration['Table Game'] == game]
+
+        # Bin the durations, filtering out outliers, and count rentals in each bin
+        bins = pd.cut(game_data['Duration (minutes)'], bins=bin_edges, labels=bin_labels, right=False)
+        binned_counts = game_data['Rentals'].groupby(bins, observed=False).sum()
+
+        # Bars instead of a histogram, to have more control
+        figures.append({'data': [{
+            'type': 'bar', 'x': list(binned_counts.index), 'y': _array(binned_counts),
+            'hovertemplate': 'Duration (minutes)=%{x}<br># of Checkouts=%{y}<extra></extra>',
+            'marker': {'color': '#636efa'}, 'name': '', 'showlegend': False, 'orientation': 'v', 'textposition': 'auto',
+        }], 'layout': {
+            'title': {'text': f'{game} Usage Time Trend'},
+            'width': 600, 'height': 400,
+            'bargap': 0.1,
+            'xaxis': {
                 'categoryorder': 'array',
                 'categoryarray': bin_labels,
                 'tickmode': 'array',
                 'tickvals': ['0-4', '20-24', '45-49', '70-74', '95-99', '120-124'],
                 'ticktext': ['0', '25', '50', '75', '100', '125'],
-                'title': {'text': 'Duration (minutes)', 'font_size': LABEL_SIZE}
-            },
-            yaxis={
-                **AXIS_FORMAT,
-                'gridcolor': 'rgba(128, 128, 128, 0.5)',
-                'title': {'text': '# of Checkouts', 'font_size': LABEL_SIZE}
+                'title': {'text': 'Duration (minutes)'},
             },
-            title=TITLE_FORMAT,
-            plot_bgcolor=PLOT_COLOR,
-            paper_bgcolor=PAPER_COLOR,
-            showlegend=False
-        )
-        
-        # Generate filename
-        filename_prefix = f"{semester_name}_" if semester_name else ""
-        output_filename = f"{filename_prefix}{game.lower().replace(' ', '_')}_usage_trend.html"
-        
-        # Save and show figure
-        fig.write_html(output_filename)
-        print(f"Visualization saved as {output_filename}")
-        
-        # Optional: display the figure (comment out if not needed)
-        fig.show()
-
+            'yaxis': {'title': {'text': '# of Checkouts'}},
+            'showlegend': False,
+        }})
+    return figures
 
 
-def _weekly_occupancy_trend(filepath: str, semester_name: str = "") -> None:
+@register_chart("occupancy", ["occupancy_by_weekday"], aggregates=["headcount_by_date"])
+def _weekly_occupancy_trend(headcount_by_date):
     """
     Generates a bar chart showing the weekly trend of total occupancy.
     """
-    # Load data
-    data = pd.read_csv(filepath)
-
-    # Aggregate total headcount by day of the week
-    weekly_trend = data.groupby("Day")["Headcount"].sum()
-
-    # Ensure the days are in the correct order
+    # Total headcount by day of the week, in order
     day_order = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-    weekly_trend = weekly_trend.reindex(day_order).fillna(0)
-
-    # Create a bar trace
-    trace = go.Bar(
-        x=weekly_trend.index,  # Days of the week
-        y=weekly_trend.values,  # Total occupancy per day
-        marker=dict(color='rgb(26, 118, 255)'),  # Color of the bars
-    )
-
-    # Layout
-    TITLE_SIZE = 22
-    LABEL_SIZE = 18
-    TICK_SIZE = 16
-    PLOT_COLOR = 'white'
-    PAPER_COLOR = 'white'
-    BASE_FORMAT = {'font_family': 'Droid Serif', 'font_color': 'black'}
-
-    layout = go.Layout(
-        title={
-            'text': 'Weekly Trend of Total Occupancy',
-            'x': 0.5,
-            'xanchor': 'center',
-            'font': {'size': TITLE_SIZE}
-        },
-        xaxis={
-            'title': {
-                'text': 'Day of the Week',
-                'font': {'size': LABEL_SIZE}
-            },
-            'tickmode': 'array',
-            'categoryorder': 'array',
-            'categoryarray': day_order,
-            'tickfont': {'size': TICK_SIZE}
-        },
-        yaxis={
-            'title': {
-                'text': 'Total Occupancy',
-                'font': {'size': LABEL_SIZE}
-            },
-            'gridcolor': 'rgba(128, 128, 128, 0.4)',
-            'tickfont': {'size': TICK_SIZE}
-        },
-        plot_bgcolor=PLOT_COLOR,
-        paper_bgcolor=PAPER_COLOR,
-        font={
-            'family': BASE_FORMAT['font_family'],
-            'color': BASE_FORMAT['font_color']
-        },
-        width=600,
-        height=400
+    weekly_trend = headcount_by_date.groupby("Day")["Headcount"].sum().reindex(day_order).fillna(0)
+
+    return {'data': [{
+        'type': 'bar',
+        'x': list(weekly_trend.index),  # Days of the week
+        'y': _array(weekly_trend),  # Total occupancy per day
+        'marker': {'color': 'rgb(26, 118, 255)'},
+    }], 'layout': {
+        'title': {'text': 'Weekly Trend of Total Occupancy'},
+        'width': 600, 'height': 400,
+        'xaxis': {'title': {'text': 'Day of the Week'}, 'tickmode': 'array',
+                  'categoryorder': 'array', 'categoryarray': day_order},
+        'yaxis': {'title': {'text': 'Total Occupancy'}},
+    }}
+
+
+@register_chart("occupancy", ["occupancy_by_month"], aggregates=["headcount_by_date"])
+def _occupancy_by_month_and_weekday(headcount_by_date):
+    """
+    Generates a grouped bar chart showing occupancy by weekday and month.
+    """
+    day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    data = headcount_by_date.assign(
+        Month=pd.to_datetime(headcount_by_date['Date'], format="mixed").dt.strftime('%B'),
+        Day=pd.Categorical(headcount_by_date['Day'], categories=day_order, ordered=True),
     )
 
-    # Create Figure object
-    fig = go.Figure(data=[trace], layout=layout)
-
-    # Show interactive plot
-    fig.show()
+    # Aggregate headcount by Month and Day of the Week
+    aggregated_data = data.groupby(['Month', 'Day'], observed=True)['Headcount'].sum().reset_index()
 
-    # Save the visualization
-    filename_prefix = f"{semester_name}_" if semester_name else ""
-    output_filename = f"{filename_prefix}occupancy_by_weekday.html"
-    fig.write_html(output_filename)
-    print(f"Visualization saved as {output_filename}")
+    # One group of bars per month
+    colors = plotly.colors.sequential.Plasma_r
+    traces = []
+    for i, (month, group) in enumerate(aggregated_data.groupby('Month', sort=False)):
+        traces.append({
+            'type': 'bar', 'x': _array(group['Day']), 'y': _array(group['Headcount']),
+            'hovertemplate': 'Headcount = %{y}', 'name': month, 'legendgroup': month, 'offsetgroup': month,
+            'alignmentgroup': 'True', 'marker': {'color': colors[i % len(colors)]}, 'showlegend': True,
+            'orientation': 'v', 'textposition': 'auto',
+        })
 
+    return {'data': traces, 'layout': {
+        'title': {'text': 'Occupancy by Month and Weekday'},
+        'width': 600, 'height': 400,
+        'barmode': 'group',
+        'xaxis': {'title': {'text': 'Day of the week'}, 'tickmode': 'array',
+                  'categoryorder': 'array', 'categoryarray': day_order},
+        'yaxis': {'title': {'text': 'Headcount'}},
+        'legend': {'title': {'text': 'Month'}},
+        'showlegend': True,
+    }}
 
 
-def _occupancy_by_month_and_weekday(filepath: str, semester_name: str = "") -> None:
+def run_trend_visualizations(clean_data_folder: str = "../clean_data", semester_name: str = "trends") -> None:
     """
-    Generates a grouped bar chart showing occupancy by weekday and month.
+    Runs the year-over-year visualizations, which compare every semester in clean_data_folder.
+    semester_name is the file name prefix, like for the other run_* functions.
     """
-    # Load data
-    data = pd.read_csv(filepath)
+    print("\nRunning Cross-Semester Visualizations...")
+    for spec in CHART_REGISTRY.values():
+        if spec["across_semesters"]:
+            _make_chart(spec, clean_data_folder, semester_name)
+    print("Cross-Semester Visualizations Complete!\n")
 
-    # Extract the month name from the Date column
-    data['Month'] = pd.to_datetime(data['Date'], format = "mixed").dt.strftime('%B')  # Converts to month names
-    data['Day'] = pd.Categorical(data['Day'], categories=["Monday", "Tuesday", "Wednesday", 
-                                                          "Thursday", "Friday", "Saturday", 
-                                                          "Sunday"], ordered=True)
 
-    # Aggregate headcount by Month and Day of the Week
-    aggregated_data = data.groupby(['Month', 'Day'], observed=True)['Headcount'].sum().reset_index()
+def _semester_traces(data: pd.DataFrame, x: str, y: str, trace: dict) -> list:
+    # one trace per semester, in calendar order (colors come from the template's colorway)
+    traces = []
+    for semester, group in data.groupby("Semester", observed=True):
+        traces.append({**trace, 'x': _array(group[x]), 'y': _array(group[y]), 'name': semester, 'legendgroup': semester,
+                       'hovertemplate': f'Semester={semester}<br>{x}=%{{x}}<br>{y}=%{{y}}<extra></extra>'})
+    return traces
 
-    # Define configurations
-    FIG_SIZE = {'width': 600, 'height': 400}
-    TICK_SIZE = 16
-    LABEL_SIZE = 18
-    TITLE_SIZE = 22
-    PLOT_COLOR = 'white'
-    PAPER_COLOR = 'white'
-
-    BASE_FORMAT = {
-        'font_family': 'Droid Serif',
-        'font_color': 'black',
-        'hoverlabel': {'font_color': 'white', 'bgcolor': 'black'}
-    }
-
-    AXIS_FORMAT = {
-        'tickfont_size': TICK_SIZE,
-        'title_font_size': LABEL_SIZE
-    }
 
-    TITLE_FORMAT = {
-        'x': 0.5,
-        'xanchor': 'center',
-        'font_size': TITLE_SIZE,
-        'y': 0.85
-    }
+@register_chart(["video_games", "board_games", "table_games"], ["rentals_per_week_by_semester"], columns=["Date"],
+                across_semesters=True)
+def _rentals_per_week_by_semester(rows):
+    """
+    Generates a line chart of total rentals (video, board and table games) per week of the semester,
+    one line per semester.
+    """
+    # Count rentals per (semester, week) for every rental sheet, then add them up
+    weekly = []
+    for data in rows.values():
+        data = data[data["Week"].between(1, SEMESTER_WEEKS)]
+        weekly.append(data.groupby(["Semester", "Week"], observed=True).size())
+    weekly_rentals = pd.concat(weekly, axis=1).fillna(0).sum(axis=1).astype(int).reset_index(name="Rentals")
+
+    return {'data': _semester_traces(weekly_rentals, 'Week', 'Rentals', {'type': 'scatter', 'mode': 'lines+markers'}),
+            'layout': {
+        'title': {'text': 'Rentals per Week, by Semester'},
+        'width': 800, 'height': 450,
+        'xaxis': {'title': {'text': 'Week of the Semester'}, 'dtick': 1},
+        'yaxis': {'title': {'text': 'Rentals'}},
+        'legend': {'title': {'text': 'Semester'}},
+    }}
+
+
+@register_chart("occupancy", ["headcount_by_weekday_by_semester"], columns=["Day", "Headcount"], across_semesters=True)
+def _headcount_by_weekday_by_semester(rows):
+    """
+    Generates a grouped bar chart of the average headcount per log for each day of the week,
+    one bar per semester (averages, so a longer semester doesn't look busier).
+    """
+    day_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    average_headcount = rows.groupby(["Semester", "Day"], observed=True)["Headcount"].mean().round(1).reset_index()
 
-    # Create the bar chart
-    fig = px.bar(
-        **FIG_SIZE,
-        data_frame=aggregated_data,
-        x='Day',
-        y='Headcount',
-        color='Month',
-        color_discrete_sequence=px.colors.sequential.Plasma_r,
-        category_orders={"Day": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]},
-        title='Occupancy by Month and Weekday',
-        barmode="group"
-    )
+    return {'data': _semester_traces(average_headcount, 'Day', 'Headcount', {'type': 'bar'}), 'layout': {
+        'title': {'text': 'Average Headcount by Day of the Week, by Semester'},
+        'width': 800, 'height': 450,
+        'barmode': 'group',
+        'xaxis': {'categoryorder': 'array', 'categoryarray': day_order},
+        'yaxis': {'title': {'text': 'Average Headcount'}},
+        'legend': {'title': {'text': 'Semester'}},
+    }}
 
-    # Customize hover template
-    fig.update_traces(hovertemplate='Headcount = %{y}')
-
-    # Update layout
-    fig.update_layout(
-        **BASE_FORMAT,
-        title=TITLE_FORMAT,
-        xaxis={
-            'title': {'text': 'Day of the week', 'font_size': LABEL_SIZE},
-            'tickmode': 'array',
-            'tickfont': {'size': TICK_SIZE},
-            'categoryorder': 'array',
-            'categoryarray': ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        },
-        yaxis={
-            'title': {'text': 'Headcount', 'font_size': LABEL_SIZE},
-            'tickfont': {'size': TICK_SIZE},
-            'gridcolor': 'rgba(128, 128, 128, 0.5)'
-        },
-        plot_bgcolor=PLOT_COLOR,
-        paper_bgcolor=PAPER_COLOR,
-        showlegend=True
-    )
 
-    # Show the figure
-    fig.show()
+@register_chart("table_games", ["table_game_share_by_semester"], columns=["Table Game"], across_semesters=True)
+def _table_game_share_by_semester(rows):
+    """
+    Generates a stacked bar chart of each table game's share of table game rentals, per semester.
+    """
+    counts = rows.groupby(["Semester", "Table Game"], observed=True).size().reset_index(name="Rentals")
+    counts["Share"] = counts["Rentals"] / counts.groupby("Semester", observed=True)["Rentals"].transform("sum")
+
+    traces = []
+    for game, group in counts.groupby("Table Game", observed=True):
+        traces.append({'type': 'bar', 'x': _array(group['Semester']), 'y': _array(group['Share']),
+                       'customdata': _array(group['Rentals']), 'name': game,
+                       'hovertemplate': '%{fullData.name}: %{y:.1%} (%{customdata} rentals)<extra></extra>'})
+
+    return {'data': traces, 'layout': {
+        'title': {'text': 'Table Game Share of Rentals, by Semester'},
+        'width': 700, 'height': 450,
+        'barmode': 'stack',
+        'yaxis': {'title': {'text': 'Share of Rentals'}, 'tickformat': '.0%'},
+        'legend': {'title': {'text': 'Table Game'}},
+    }}
 
-    # Save the visualization
-    filename_prefix = f"{semester_name}_" if semester_name else ""
-    output_filename = f"{filename_prefix}occupancy_by_month.html"
-    fig.write_html(output_filename)
-    print(f"Visualization saved as {output_filename}")
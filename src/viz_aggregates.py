@@ -0,0 +1,100 @@
+import os
+
+import pandas as pd
+
+"""
+Small per-semester summary tables for the charts.
+
+Most charts only need a few counts or sums (rentals per game, headcount per day, ...)
+but each one used to compute them from every raw row. The functions here compute those
+summaries once per cleaned file, vectorized:
+- video games: rentals per (console, game, # of controllers), duration stats per console
+- board games: duration stats and quartiles per game (the box plot numbers, see duration_stats)
+- table games: rentals per table game, rentals per (table game, duration), duration stats
+  per pool table
+- occupancy: headcount (and number of logs) per date
+
+update_viz.load_aggregate computes them from the cleaned data the first time a chart asks,
+saves them to clean_data/aggregates/, and reads the saved copy while the cleaned file
+hasn't changed since. The tables are a few hundred rows at most, however big the
+semester is, so the charts that use them cost the same for any amount of data.
+
+Groups are kept in order of first appearance (sort=False) unless noted, so a chart
+that walks a table sees the games in the same order it would have seen the raw rows.
+"""
+
+#bump when a table changes, so the saved copies get recomputed
+AGGREGATES_VERSION = 2
+
+AGGREGATE_FOLDER_NAME = "aggregates"
+
+
+def duration_stats(data: pd.DataFrame, by: str) -> pd.DataFrame:
+    """
+    Rentals, mean, min, quartiles and max of the positive durations for each value of by (sorted),
+    and the box plot whisker ends: the furthest durations within 1.5 IQR of the quartiles
+    (what plotly's go.Box draws).
+    """
+    data = data.dropna(subset=[by, "Duration (minutes)"])
+    data = data[data["Duration (minutes)"] > 0]
+    durations = data.groupby(by, observed=True)["Duration (minutes)"]
+    stats = durations.agg(Rentals="count", Mean="mean", Min="min", Max="max")
+    quartiles = durations.quantile([0.25, 0.5, 0.75]).unstack()
+    quartiles.columns = ["Q1", "Median", "Q3"]
+
+    # each row's group quartiles, to find the whisker ends in one pass
+    q1, q3 = durations.transform("quantile", 0.25), durations.transform("quantile", 0.75)
+    inside = data["Duration (minutes)"].between(q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1))
+    fences = data[inside].groupby(by, observed=True)["Duration (minutes)"].agg(LowerFence="min", UpperFence="max")
+
+    columns = ["Rentals", "Mean", "Min", "Q1", "Median", "Q3", "Max", "LowerFence", "UpperFence"]
+    return stats.join(quartiles).join(fences)[columns].reset_index()
+
+
+def _rentals(data: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    return data.groupby(columns, sort=False, dropna=False, observed=True).size().reset_index(name="Rentals")
+
+
+def video_game_aggregates(data: pd.DataFrame) -> dict:
+    return {
+        "rentals": _rentals(data, ["Console", "Game", "# of Controllers"]),
+        "console_durations": duration_stats(data, "Console"),
+    }
+
+
+def board_game_aggregates(data: pd.DataFrame) -> dict:
+    return {
+        "game_durations": duration_stats(data, "Game"),
+    }
+
+
+def table_game_aggregates(data: pd.DataFrame) -> dict:
+    return {
+        # value_counts order: most rented first
+        "game_counts": data["Table Game"].value_counts().rename_axis("Table Game").reset_index(name="Rentals"),
+        "rentals_by_duration": _rentals(data, ["Table Game", "Duration (minutes)"]),
+        "pool_table_durations": duration_stats(data[data["Table Game"] == "Pool"], "Pool Table #"),
+    }
+
+
+def occupancy_aggregates(data: pd.DataFrame) -> dict:
+    return {
+        "headcount_by_date": data.groupby(["Date", "Day"], sort=False, observed=True)["Headcount"]
+                                 .agg(Headcount="sum", Logs="count").reset_index(),
+    }
+
+
+AGGREGATES = {
+    "video_games": video_game_aggregates,
+    "board_games": board_game_aggregates,
+    "table_games": table_game_aggregates,
+    "occupancy": occupancy_aggregates,
+}
+
+
+def aggregate_path(clean_filepath: str, name: str) -> str:
+    """clean_data/f24_video_games_cleaned.csv, "rentals" -> clean_data/aggregates/f24_video_games_rentals.v2.csv"""
+    stem = os.path.basename(clean_filepath)
+    stem = stem[:-len("_cleaned.csv")] if stem.endswith("_cleaned.csv") else os.path.splitext(stem)[0]
+    folder = os.path.join(os.path.dirname(os.path.abspath(clean_filepath)), AGGREGATE_FOLDER_NAME)
+    return os.path.join(folder, f"{stem}_{name}.v{AGGREGATES_VERSION}.csv")
@@ -0,0 +1,149 @@
+import argparse
+import os
+import re
+
+"""
+One shared copy of plotly.js for all the chart HTML files.
+
+fig.write_html embeds the whole plotly.js library (several MB) in every file by default,
+and pages like occupancy.html load several charts, so the browser downloads and parses
+the same library once per chart. Instead, update_viz writes each chart with
+    <script src="plotly-<version>.min.js"></script>
+and ensure_bundle puts that one file next to the charts (resources/viz/). The version is
+in the file name, so a chart always loads the plotly.js it was built with, and the browser
+can cache the bundle for good.
+
+check_bundles finds charts whose bundle is missing or isn't the version its name says.
+migrate swaps the inline library in charts built before this for the shared file
+(keeping whichever version was embedded).
+
+Run from src/:
+    python viz_bundle.py --check
+    python viz_bundle.py --migrate
+"""
+
+VIZ_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "resources", "viz")
+
+#the banner plotly.js starts with: "/**\n* plotly.js v2.35.2\n..."
+VERSION_PATTERN = re.compile(r"^/\*\*\s*\*\s*plotly\.js v(\d+\.\d+\.\d+)")
+#a chart that points at a shared bundle
+BUNDLE_SCRIPT_PATTERN = re.compile(r'<script[^>]*\ssrc="(plotly-[^"]+\.min\.js)"')
+#a chart with the whole library inline (what write_html does by default)
+INLINE_SCRIPT_PATTERN = re.compile(r'<script(?: type="text/javascript")?>(/\*\*\s*\*\s*plotly\.js v.*?)</script>', re.S)
+
+
+def bundle_name(version: str) -> str:
+    return f"plotly-{version}.min.js"
+
+
+def bundle_version(bundle_filepath: str) -> str | None:
+    """The plotly.js version in a bundle's banner, or None if the file is missing or isn't plotly.js."""
+    if not os.path.exists(bundle_filepath):
+        return None
+    with open(bundle_filepath, mode='r', encoding='utf-8') as file:
+        match = VERSION_PATTERN.match(file.read(200))
+    return match.group(1) if match else None
+
+
+def _write_bundle(js: str, bundle_filepath: str) -> None:
+    # temp file first, so parallel renderers never see half a bundle
+    temp_path = f"{bundle_filepath}.{os.getpid()}.tmp"
+    with open(temp_path, mode='w', encoding='utf-8') as file:
+        file.write(js)
+    os.replace(temp_path, bundle_filepath)
+
+
+def ensure_bundle(folder: str) -> str:
+    """
+    Makes sure folder has the installed plotly.js as plotly-<version>.min.js
+    (writing it if it's missing or broken) and returns the file name.
+    """
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    version = get_plotlyjs_version()
+    bundle_filepath = os.path.join(folder, bundle_name(version))
+    if bundle_version(bundle_filepath) != version:
+        if os.path.exists(bundle_filepath):
+            print(f"{bundle_filepath} isn't plotly.js v{version}, rewriting it.")
+        _write_bundle(get_plotlyjs(), bundle_filepath)
+    return bundle_name(version)
+
+
+def check_bundles(folder: str = VIZ_FOLDER) -> list[str]:
+    """
+    Checks every chart in folder: returns a message for each one that references a missing or
+    mismatched bundle (or still embeds plotly.js). An empty list means everything is fine.
+    """
+    problems = []
+    for file_name in sorted(os.listdir(folder)):
+        if not file_name.endswith(".html"):
+            continue
+        with open(os.path.join(folder, file_name), mode='r', encoding='utf-8') as file:
+            html = file.read()
+        for bundle in set(BUNDLE_SCRIPT_PATTERN.findall(html)):
+            expected = bundle[len("plotly-"):-len(".min.js")]
+            found = bundle_version(os.path.join(folder, bundle))
+            if found is None:
+                problems.append(f"{file_name}: {bundle} is missing")
+            elif found != expected:
+                problems.append(f"{file_name}: {bundle} is plotly.js v{found}")
+        if INLINE_SCRIPT_PATTERN.search(html):
+            problems.append(f"{file_name}: embeds its own copy of plotly.js (run viz_bundle.py --migrate)")
+    return problems
+
+
+def migrate(folder: str = VIZ_FOLDER) -> int:
+    """
+    Rewrites charts in folder that embed plotly.js to use the shared bundle of the same
+    version (written from the embedded copy if it doesn't exist yet). Returns how many
+    files were rewritten.
+    """
+    migrated = 0
+    saved_bytes = 0
+    for file_name in sorted(os.listdir(folder)):
+        if not file_name.endswith(".html"):
+            continue
+        html_filepath = os.path.join(folder, file_name)
+        with open(html_filepath, mode='r', encoding='utf-8') as file:
+            html = file.read()
+        match = INLINE_SCRIPT_PATTERN.search(html)
+        if match is None:
+            continue
+
+        js = match.group(1)
+        version = VERSION_PATTERN.match(js).group(1)
+        bundle_filepath = os.path.join(folder, bundle_name(version))
+        if bundle_version(bundle_filepath) != version:
+            _write_bundle(js, bundle_filepath)
+            print("Saved shared bundle:", bundle_filepath)
+
+        new_html = html[:match.start()] + f'<script charset="utf-8" src="{bundle_name(version)}"></script>' + html[match.end():]
+        with open(html_filepath, mode='w', encoding='utf-8') as file:
+            file.write(new_html)
+        migrated += 1
+        saved_bytes += len(html) - len(new_html)
+
+    print(f"Migrated {migrated} charts in {folder} ({saved_bytes / 1e6:.1f}MB smaller)")
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or migrate the charts' shared plotly.js bundle.")
+    parser.add_argument("--folder", default=VIZ_FOLDER, help="folder with the chart HTML files")
+    parser.add_argument("--migrate", action="store_true", help="switch charts that embed plotly.js to the shared bundle")
+    parser.add_argument("--check", action="store_true", help="report charts with a missing or mismatched bundle")
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate(args.folder)
+    if args.check or not args.migrate:
+        problems = check_bundles(args.folder)
+        for problem in problems:
+            print(problem)
+        if problems:
+            raise SystemExit(1)
+        print("All charts have their plotly.js bundle.")
+
+
+if __name__ == "__main__":
+    main()
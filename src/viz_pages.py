@@ -0,0 +1,143 @@
+import argparse
+import glob
+import html
+import os
+import re
+
+from viz_bundle import ensure_bundle
+
+"""
+Puts all the charts of a site page into the page itself.
+
+Pages like occupancy.html show each chart in its own
+    <iframe src="resources/viz/f24_occupancy_by_weekday.html" ...>
+which is a separate document with its own copy of the plotly runtime. bundle_page
+replaces every such iframe with a div holding the figure's JSON (the <chart>.json that
+update_viz writes next to each chart HTML), loads plotly.js once at the end of the page
+and draws each chart only when it is scrolled into view (IntersectionObserver).
+
+The div keeps the chart's path in data-src, so running this again on a bundled page
+refreshes the figures after the charts are rebuilt. A chart without a .json file stays
+an iframe.
+
+Run from src/ after building the charts:
+    python viz_pages.py                     # every page in the site folder
+    python viz_pages.py ../occupancy.html
+"""
+
+SITE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+#an iframe chart as written by hand in the pages
+IFRAME_PATTERN = re.compile(
+    r'<iframe src="(?P<src>[^"]*resources/viz/[^"]+\.html)" height="(?P<height>\d+)" width="(?P<width>\d+)"></iframe>')
+#a chart this script already put in the page
+CHART_DIV_PATTERN = re.compile(
+    r'<div class="uc-chart" data-src="(?P<src>[^"]+)" style="height:(?P<height>\d+)px;width:(?P<width>\d+)px">'
+    r'<script type="application/json">.*?</script></div>', re.S)
+#the plotly.js + loader scripts this script adds before </body>
+SCRIPTS_PATTERN = re.compile(r'\s*<!-- uc-chart scripts -->.*?<!-- /uc-chart scripts -->', re.S)
+
+#draws each chart the first time it comes within 200px of the screen
+LOADER_JS = """(function () {
+    function render(div) {
+        var spec = div.querySelector('script[type="application/json"]');
+        if (!spec) return;
+        var figure = JSON.parse(spec.textContent);
+        div.removeChild(spec);
+        Plotly.newPlot(div, figure.data, figure.layout, {responsive: true});
+    }
+    var charts = document.querySelectorAll('.uc-chart');
+    if (!('IntersectionObserver' in window)) {
+        charts.forEach(render);
+        return;
+    }
+    var observer = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                render(entry.target);
+            }
+        });
+    }, {rootMargin: '200px'});
+    charts.forEach(function (div) { observer.observe(div); });
+})();"""
+
+
+def _chart_div(src: str, height: str, width: str, spec: str) -> str:
+    # "</" can't appear inside a <script> element; "<\/" means the same thing in JSON
+    spec = spec.replace("</", "<\\/")
+    return (f'<div class="uc-chart" data-src="{html.escape(src)}" style="height:{height}px;width:{width}px">'
+            f'<script type="application/json">{spec}</script></div>')
+
+
+def bundle_page(page_filepath: str) -> int:
+    """
+    Rewrites one page so its charts are inline instead of iframes (see above).
+    Returns how many charts it holds now.
+    """
+    site_folder = os.path.dirname(os.path.abspath(page_filepath))
+    with open(page_filepath, mode='r', encoding='utf-8') as file:
+        page = file.read()
+
+    viz_srcs = []
+
+    def inline(match):
+        src = html.unescape(match["src"])
+        spec_filepath = os.path.join(site_folder, os.path.splitext(src)[0] + ".json")
+        if not os.path.exists(spec_filepath):
+            if match[0].startswith("<div"):
+                viz_srcs.append(src)  # inlined before: keep the figure we have
+            print(f"{os.path.basename(page_filepath)}: no {os.path.relpath(spec_filepath, site_folder)}, "
+                  "leaving that chart as it is.")
+            return match[0]
+        with open(spec_filepath, mode='r', encoding='utf-8') as file:
+            spec = file.read()
+        viz_srcs.append(src)
+        return _chart_div(src, match["height"], match["width"], spec)
+
+    page = CHART_DIV_PATTERN.sub(inline, page)
+    page = IFRAME_PATTERN.sub(inline, page)
+    page = SCRIPTS_PATTERN.sub("", page)
+
+    if viz_srcs:
+        viz_folder = os.path.dirname(viz_srcs[0])
+        bundle = ensure_bundle(os.path.join(site_folder, viz_folder))
+        scripts = (f'\n    <!-- uc-chart scripts -->\n'
+                   f'    <script charset="utf-8" src="{viz_folder}/{bundle}"></script>\n'
+                   f'    <script>\n{LOADER_JS}\n    </script>\n'
+                   f'    <!-- /uc-chart scripts -->')
+        page = page.replace("</body>", scripts + "\n</body>", 1)
+
+    with open(page_filepath, mode='w', encoding='utf-8') as file:
+        file.write(page)
+    return len(viz_srcs)
+
+
+def find_pages(site_folder: str = SITE_FOLDER) -> list[str]:
+    """Every page in the site folder that shows at least one chart."""
+    pages = []
+    for page_filepath in sorted(glob.glob(os.path.join(site_folder, "*.html"))):
+        with open(page_filepath, mode='r', encoding='utf-8') as file:
+            page = file.read()
+        if IFRAME_PATTERN.search(page) or CHART_DIV_PATTERN.search(page):
+            pages.append(page_filepath)
+    return pages
+
+
+def bundle_pages(pages=None, site_folder: str = SITE_FOLDER) -> None:
+    """Runs bundle_page on the given pages (default: every page with charts)."""
+    for page_filepath in pages or find_pages(site_folder):
+        num_charts = bundle_page(page_filepath)
+        print(f"{os.path.basename(page_filepath)}: {num_charts} charts inline")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline each page's charts into one document instead of iframes.")
+    parser.add_argument("pages", nargs="*", help="pages to rewrite (default: every page in the site folder with charts)")
+    parser.add_argument("--site", default=SITE_FOLDER, help="folder with the site's pages")
+    args = parser.parse_args()
+    bundle_pages(args.pages, args.site)
+
+
+if __name__ == "__main__":
+    main()
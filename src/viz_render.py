@@ -0,0 +1,381 @@
+import argparse
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import profiling
+import uc_times
+import uc_typed
+import update_viz
+import viz_aggregates
+import viz_bundle
+from uc_typed import clean_file_parts
+from viz_bundle import check_bundles
+
+"""
+Builds every chart for every semester at once, without opening a browser.
+
+update_viz's chart functions each build one figure, fig.show() it and write it to HTML,
+one after the other. Here every chart is its own job in a process pool: the workers
+skip show() (update_viz.SHOW_FIGURES = False), build the figure dict, and write the HTML
+file in parallel without running it through go.Figure (update_viz.FAST_FIGURES = True).
+A chart that fails is reported and the rest keep going.
+Afterwards every chart's plotly.js bundle is checked (see viz_bundle.py).
+
+Charts whose inputs haven't changed are skipped. The build cache (.build_cache.json in
+the output folder) keeps a fingerprint of every chart it built:
+- the sha256 of the cleaned CSV
+- the sha256 of the chart function's source, and of the whole source of update_viz and
+  the modules it uses (SHARED_MODULES), so no helper a chart calls can be missed
+- the plotly and plotly.js versions
+- the output prefix and the update_viz settings that change the output
+and the files the chart wrote. A chart is rebuilt if any of those changed or an output
+file is gone, so refreshing the site only pays for the current semester. --explain
+prints why each chart was rebuilt or skipped, --force rebuilds everything.
+
+The biggest datasets are started first, so a full rebuild takes about as long as the
+slowest chart instead of the sum of all of them (given enough CPUs).
+
+Output files have the same names as run_all_visualizations:
+    clean_data/<sem>_<type>_cleaned.csv -> resources/viz/<sem>_<chart>.html
+    clean_data/ (every semester)        -> resources/viz/trends_<chart>.html
+
+Run from src/:
+    python viz_render.py
+    python viz_render.py --semesters f24 --workers 4
+    python viz_render.py --pages            # and inline the charts into the pages
+    python viz_render.py --explain          # say why each chart is rebuilt or skipped
+    python viz_render.py --profile profile.json  # time every chart's load/aggregate/build/write (see profiling.py)
+    python viz_render.py --profile profile.json --trace-memory  # and their peak memory
+"""
+
+SRC_FOLDER = os.path.dirname(os.path.abspath(__file__))
+CLEAN_DATA_FOLDER = os.path.join(SRC_FOLDER, "..", "clean_data")
+VIZ_FOLDER = os.path.join(SRC_FOLDER, "..", "resources", "viz")
+
+BUILD_CACHE_NAME = ".build_cache.json"
+#bump to throw away every build cache (e.g. when the fingerprint changes shape)
+BUILD_CACHE_VERSION = 1
+#the modules a chart's output comes from. Changing any of their code rebuilds every chart: a
+#list of the helpers each chart calls would have to be kept up to date by hand, and go stale
+SHARED_MODULES = [update_viz, viz_aggregates, uc_typed, uc_times, viz_bundle]
+
+#sheet type -> the update_viz charts made from it (from update_viz.CHART_REGISTRY, in run_all_visualizations order)
+CHARTS = {type: [chart for chart, spec in update_viz.CHART_REGISTRY.items()
+                 if spec["type"] == type and not spec["across_semesters"]]
+          for type in update_viz.SEMESTER_TYPES}
+#charts comparing every semester (run_trend_visualizations); their input is the whole clean data folder
+TREND_CHARTS = [chart for chart, spec in update_viz.CHART_REGISTRY.items() if spec["across_semesters"]]
+TREND_PREFIX = "trends"
+
+
+def find_semesters(clean_data_folder: str = CLEAN_DATA_FOLDER) -> list[str]:
+    """Every semester that has at least one cleaned file in clean_data_folder."""
+    semesters = {parts[0] for parts in map(clean_file_parts, os.listdir(clean_data_folder)) if parts}
+    return sorted(semesters)
+
+
+def _init_worker(profile: bool = False, trace_memory: bool = False) -> None:
+    update_viz.SHOW_FIGURES = False
+    # the figure dicts go straight to HTML; update_viz run by hand still checks them
+    update_viz.FAST_FIGURES = True
+    if profile:
+        profiling.enable(trace_memory=trace_memory)
+
+
+def render_chart(chart: str, filepath: str, output_prefix: str) -> dict:
+    """
+    Builds and writes one chart (this runs inside a worker process).
+
+    The chart's printing is captured and returned as "log", like batch_clean.clean_one.
+    "outputs" lists the files it wrote, "profile" its timed stages when profiling is on (see profiling.py).
+    """
+    result = {"chart": chart, "filepath": filepath, "seconds": 0.0, "error": None, "log": "", "outputs": [], "profile": []}
+    log = io.StringIO()
+    num_written = len(update_viz.WRITTEN_FILES)
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            getattr(update_viz, chart)(filepath, output_prefix)
+    except Exception:
+        result["error"] = traceback.format_exc(limit=3)
+    result["seconds"] = time.perf_counter() - start
+    result["log"] = log.getvalue()
+    result["outputs"] = update_viz.WRITTEN_FILES[num_written:]
+    result["profile"] = profiling.take_records()
+    return result
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_hash(file_path: str) -> str | None:
+    """
+    sha256 of a file's bytes, None if it doesn't exist.
+    For a folder (the trend charts' input), a hash of every cleaned file's name and hash in it.
+    """
+    if not os.path.exists(file_path):
+        return None
+    if os.path.isdir(file_path):
+        file_names = sorted(name for name in os.listdir(file_path) if name.endswith("_cleaned.csv"))
+        return _sha256("".join(f"{name}:{file_hash(os.path.join(file_path, name))}\n" for name in file_names))
+    digest = hashlib.sha256()
+    with open(file_path, mode='rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def chart_fingerprint(chart: str, filepath: str, output_prefix: str, input_hash: str | None = None) -> dict:
+    """Everything a chart's output depends on (see the top of this file)."""
+    import plotly
+    from plotly.offline import get_plotlyjs_version
+
+    return {
+        "version": BUILD_CACHE_VERSION,
+        "input": input_hash or file_hash(filepath),
+        "code": _sha256(inspect.getsource(update_viz.CHART_REGISTRY[chart]["build"])),
+        "shared_code": _sha256("".join(inspect.getsource(module) for module in SHARED_MODULES)),
+        "plotly": f"plotly {plotly.__version__}, plotly.js {get_plotlyjs_version()}",
+        "settings": {"output_prefix": os.path.basename(output_prefix),
+                     "shared_plotly_js": update_viz.SHARED_PLOTLY_JS,
+                     "figure_specs": update_viz.WRITE_FIGURE_SPECS,
+                     "strip_mode": update_viz.STRIP_MODE,
+                     "strip_point_budget": update_viz.STRIP_POINT_BUDGET},
+    }
+
+
+#fingerprint field -> how --explain says it changed
+CHANGE_REASONS = {
+    "version": "build cache format changed",
+    "input": "input data changed",
+    "code": "chart code changed",
+    "shared_code": "update_viz (or a module it uses) changed",
+    "plotly": "plotly version changed",
+    "settings": "output settings changed",
+}
+
+
+def rebuild_reason(entry: dict | None, fingerprint: dict, output_folder: str) -> str | None:
+    """Why a chart has to be rebuilt, or None if its cached outputs are still good."""
+    if fingerprint["input"] is None:
+        return "input file is missing"
+    if entry is None:
+        return "not built before"
+    for field, reason in CHANGE_REASONS.items():
+        if entry["fingerprint"].get(field) != fingerprint[field]:
+            return reason
+    for output in entry["outputs"]:
+        if not os.path.exists(os.path.join(output_folder, output)):
+            return f"{output} is missing"
+    return None
+
+
+def build_cache_path(output_folder: str) -> str:
+    return os.path.join(output_folder, BUILD_CACHE_NAME)
+
+
+def load_build_cache(output_folder: str) -> dict:
+    cache_path = build_cache_path(output_folder)
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, mode='r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_build_cache(cache: dict, output_folder: str) -> None:
+    # temp file first, like uc_incremental's checkpoints
+    cache_path = build_cache_path(output_folder)
+    with open(cache_path + ".tmp", mode='w') as file:
+        json.dump(cache, file, indent=1, sort_keys=True)
+    os.replace(cache_path + ".tmp", cache_path)
+
+
+def _cache_key(chart: str, output_prefix: str) -> str:
+    return f"{os.path.basename(output_prefix)}:{chart}"
+
+
+def _input_size(file_path: str) -> int:
+    # a folder counts as all its cleaned files together
+    if os.path.isdir(file_path):
+        return sum(_input_size(os.path.join(file_path, name)) for name in os.listdir(file_path)
+                   if name.endswith("_cleaned.csv"))
+    return os.path.getsize(file_path) if os.path.exists(file_path) else 0
+
+
+def chart_jobs(semesters, clean_data_folder: str = CLEAN_DATA_FOLDER, output_folder: str = VIZ_FOLDER,
+               types=None) -> list[tuple[str, str, str]]:
+    """
+    (chart, cleaned file, output prefix) for every chart of every semester, biggest files first.
+    Without a types filter this includes the trend charts, which always cover every semester.
+    """
+    jobs = []
+    if not types:
+        jobs += [(chart, clean_data_folder, os.path.join(output_folder, TREND_PREFIX)) for chart in TREND_CHARTS]
+    for semester in semesters:
+        for type, charts in CHARTS.items():
+            if types and type not in types:
+                continue
+            filepath = os.path.join(clean_data_folder, f"{semester}_{type}_cleaned.csv")
+            jobs += [(chart, filepath, os.path.join(output_folder, semester)) for chart in charts]
+    # the slowest charts are the ones with the most rows, so start those first
+    return sorted(jobs, key=lambda job: _input_size(job[1]), reverse=True)
+
+
+def print_summary(results: list[dict], wall_seconds: float) -> None:
+    """Prints one line per chart with how long it took."""
+    print(f"{'Data':<34} {'Chart':<36} {'Seconds':>8}  Status")
+    for result in sorted(results, key=lambda r: (r["filepath"], r["chart"])):
+        status = "FAILED" if result["error"] is not None else "skipped" if result.get("skipped") else "ok"
+        print(f"{os.path.basename(result['filepath']):<34} {result['chart']:<36} {result['seconds']:>8.2f}  {status}")
+    slowest = max((r["seconds"] for r in results), default=0.0)
+    print(f"{len(results)} charts in {wall_seconds:.2f}s wall time "
+          f"({sum(r['seconds'] for r in results):.2f}s of rendering, slowest chart {slowest:.2f}s)")
+
+
+def render_all(semesters=None,
+               clean_data_folder: str = CLEAN_DATA_FOLDER,
+               output_folder: str = VIZ_FOLDER,
+               types=None,
+               max_workers: int | None = None,
+               force: bool = False,
+               explain: bool = False,
+               profile_filepath: str | None = None,
+               trace_memory: bool = False,
+               ) -> list[dict]:
+    """
+    Renders every chart for the given semesters in parallel and prints a summary table.
+
+    semesters (list[str]): default is every semester with data in clean_data_folder.
+    types (list[str]): only these sheet types (keys of CHARTS).
+    max_workers (int): size of the process pool. Defaults to the number of CPUs,
+        and never more than the number of charts.
+    force (bool): rebuild every chart, even the ones the build cache says are up to date.
+    explain (bool): print why each chart is rebuilt or skipped.
+    profile_filepath (str): time each chart's load, aggregate, build and write_html in the workers,
+        print them as a tree and save them to this .json / .csv / .folded file (see profiling.py).
+    trace_memory (bool): with profile_filepath, also record each stage's peak memory (slower).
+
+    Returns one dict per chart with seconds and error (None if it worked), skipped charts included.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    jobs = chart_jobs(semesters or find_semesters(clean_data_folder), clean_data_folder, output_folder, types)
+    results = render_jobs(jobs, max_workers, force, explain, profile_filepath, trace_memory)
+
+    # a chart pointing at a plotly.js bundle that isn't there would render as a blank frame
+    for problem in check_bundles(output_folder):
+        print("Bundle problem:", problem)
+    return results
+
+
+def render_jobs(jobs: list[tuple[str, str, str]], max_workers: int | None = None, force: bool = False,
+                explain: bool = False, profile_filepath: str | None = None, trace_memory: bool = False) -> list[dict]:
+    """Runs (chart, cleaned file, output prefix) jobs in a process pool, skipping up to date ones (see render_all)."""
+    if not jobs:
+        print("No charts to render.")
+        return []
+
+    start = time.perf_counter()
+    caches = {}  # output folder -> build cache
+    input_hashes = {}
+    fingerprints = {}
+    skipped = []
+    to_build = []
+    for chart, filepath, output_prefix in jobs:
+        output_folder = os.path.dirname(output_prefix) or "."
+        cache = caches.setdefault(output_folder, load_build_cache(output_folder))
+        if filepath not in input_hashes:
+            input_hashes[filepath] = file_hash(filepath)
+        fingerprint = chart_fingerprint(chart, filepath, output_prefix, input_hashes[filepath])
+        fingerprints[(chart, output_prefix)] = fingerprint
+
+        reason = "--force" if force else rebuild_reason(cache.get(_cache_key(chart, output_prefix)), fingerprint, output_folder)
+        if explain:
+            print(f"{'rebuild' if reason else 'skip':<8} {os.path.basename(output_prefix)} {chart}: {reason or 'unchanged'}")
+        if reason is None:
+            skipped.append({"chart": chart, "filepath": filepath, "seconds": 0.0, "error": None, "log": "",
+                            "outputs": [], "skipped": True})
+        else:
+            to_build.append((chart, filepath, output_prefix))
+
+    results = []
+    if to_build:
+        max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(to_build)))
+        print(f"Rendering {len(to_build)} charts with {max_workers} workers ({len(skipped)} up to date)...")
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(profile_filepath is not None, trace_memory)) as executor:
+            futures = {executor.submit(render_chart, *job): job for job in to_build}
+            for future in as_completed(futures):
+                chart, filepath, output_prefix = futures[future]
+                try:
+                    result = future.result()
+                except Exception:
+                    # the worker itself died (out of memory, ...): still only this chart fails
+                    result = {"chart": chart, "filepath": filepath, "seconds": 0.0,
+                              "error": traceback.format_exc(limit=3), "log": "", "outputs": []}
+                results.append(result)
+
+                output_folder = os.path.dirname(output_prefix) or "."
+                key = _cache_key(chart, output_prefix)
+                if result["error"] is None:
+                    caches[output_folder][key] = {
+                        "fingerprint": fingerprints[(chart, output_prefix)],
+                        "outputs": sorted({os.path.relpath(output, output_folder) for output in result["outputs"]}),
+                    }
+                else:
+                    caches[output_folder].pop(key, None)  # try again next time
+                    print(f"\n{chart} ({os.path.basename(filepath)}) failed:")
+                    print(result["log"])
+                    print(result["error"])
+        for output_folder, cache in caches.items():
+            save_build_cache(cache, output_folder)
+    else:
+        print(f"All {len(skipped)} charts are up to date.")
+    wall_seconds = time.perf_counter() - start
+
+    print_summary(results + skipped, wall_seconds)
+    if profile_filepath:
+        stage_records = [record for result in results for record in result.get("profile", [])]
+        print()
+        profiling.print_summary(stage_records)
+        profiling.save_report(profile_filepath, stage_records)
+    return results + skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render every chart for every semester in parallel, without showing them.")
+    parser.add_argument("--clean-data", default=CLEAN_DATA_FOLDER, help="folder with the <sem>_<type>_cleaned.csv files")
+    parser.add_argument("--output", default=VIZ_FOLDER, help="folder to write the <sem>_<chart>.html files to")
+    parser.add_argument("--semesters", nargs="*", help="only these semesters, e.g. f23 s24 (default: all)")
+    parser.add_argument("--types", nargs="*", choices=list(CHARTS), help="only these sheet types")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--pages", action="store_true", help="then put the charts inline in the site's pages (see viz_pages.py)")
+    parser.add_argument("--force", action="store_true", help="rebuild every chart, even unchanged ones")
+    parser.add_argument("--explain", action="store_true", help="print why each chart is rebuilt or skipped")
+    parser.add_argument("--profile", default=None, help="time every chart's stages and save the report here (.json, .csv or .folded)")
+    parser.add_argument("--trace-memory", action="store_true", help="with --profile, also record each stage's peak memory (slower)")
+    args = parser.parse_args()
+    if args.trace_memory and not args.profile:
+        parser.error("--trace-memory needs --profile")
+
+    results = render_all(args.semesters, args.clean_data, args.output, args.types, args.workers, args.force, args.explain,
+                         args.profile, args.trace_memory)
+    if args.pages:
+        from viz_pages import bundle_pages
+        bundle_pages()
+    if any(result["error"] is not None for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()